@@ -0,0 +1,127 @@
+"""
+Process pool for the CPU-bound ingestion stages.
+
+In the default ingest mode everything CPU-bound (HTML cleaning, JSON-LD
+parsing, content hashing, MinHash signatures and SentenceTransformer.encode)
+runs in threads of one process and is serialised by the GIL. With a CpuPool:
+
+    prepare_page()   cleaning, JSON-LD, content hash and MinHash signature
+                     of one page, in a single worker call so the HTML is
+                     pickled once
+    encode_texts()   the transformer forward pass for cache misses; the
+                     embedding cache stays in the main process
+
+Fetching, LLM calls and Chroma/SQLite writes stay on the asyncio loop and
+its threads.
+
+Encoder modes:
+
+    per_worker   every worker loads its own model (lazily, on its first
+                 encode) and runs torch with 1 thread; a batch is split
+                 across all workers (at least ENCODE_MIN_CHUNK texts each)
+    shared       one dedicated encoder process loads the only model and
+                 runs torch with half the pool's cores; the other workers
+                 only prepare pages. Uses less memory.
+
+Workers are started with "spawn" (torch is not fork-safe). A spawned
+worker imports this module, html_cleaning, crawl_state, near_duplicates and
+embeddings, and also re-imports the script that started the run as
+__mp_main__. Start pooled runs with run_ingest.py / run_recrawl.py, which
+import nothing at module level. Run directly, ingest_jobs.py and recrawl.py
+make every worker import chromadb and google.adk and build the agents.
+"""
+
+import os
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import embeddings
+from html_cleaning import clean_html, extract_jsonld_job
+from crawl_state import posting_hash
+from near_duplicates import minhash_signature
+
+
+CPU_WORKERS = os.cpu_count() or 1
+ENCODER_MODES = ("per_worker", "shared")
+
+# Smallest slice of a batch sent to one worker in per_worker mode.
+ENCODE_MIN_CHUNK = 8
+
+
+def _init_worker(num_threads: int):
+    embeddings.configure(num_threads=num_threads)
+
+
+def prepare_page(html: str) -> dict:
+    """
+    All CPU work on one fetched page: {"jsonld": JobPosting dict or None,
+    "clean_text": cleaned main text, "content_hash": ..., "signature": MinHash}.
+    """
+    jsonld = extract_jsonld_job(html)
+    clean_text = clean_html(html)
+    return {
+        "jsonld": jsonld,
+        "clean_text": clean_text,
+        "content_hash": posting_hash(jsonld, clean_text),
+        "signature": minhash_signature(clean_text),
+    }
+
+
+def encode_texts(texts: list[str], batch_size: int) -> np.ndarray:
+    return embeddings.get_model().encode(texts, batch_size=batch_size, convert_to_numpy=True)
+
+
+class CpuPool:
+    """
+    Process pools for prepare_page() and encode_texts() (see module docstring).
+    """
+
+    def __init__(self, workers: int = CPU_WORKERS, encoder_mode: str = "per_worker"):
+        if encoder_mode not in ENCODER_MODES:
+            raise ValueError(f"encoder_mode must be one of {ENCODER_MODES}")
+        ctx = multiprocessing.get_context("spawn")
+        self.workers = max(1, workers)
+        self.encoder_mode = encoder_mode
+
+        if encoder_mode == "shared":
+            self.cpu = ProcessPoolExecutor(max(1, self.workers - 1), mp_context=ctx,
+                                           initializer=_init_worker, initargs=(1,))
+            self.encoder = ProcessPoolExecutor(1, mp_context=ctx,
+                                               initializer=_init_worker, initargs=(max(1, self.workers // 2),))
+        else:
+            self.cpu = ProcessPoolExecutor(self.workers, mp_context=ctx,
+                                           initializer=_init_worker, initargs=(1,))
+            self.encoder = self.cpu
+
+        print(f"[INFO] CPU pool: {self.workers} processes, encoder mode {encoder_mode}")
+
+    async def prepare(self, html: str) -> dict:
+        return await asyncio.get_running_loop().run_in_executor(self.cpu, prepare_page, html)
+
+    def encode(self, texts: list[str], batch_size: int = embeddings.EMBEDDING_BATCH_SIZE) -> np.ndarray:
+        """
+        Blocking; call from a worker thread (JobWriter.flush already is one).
+        """
+        if self.encoder_mode == "shared":
+            return self.encoder.submit(encode_texts, texts, batch_size).result()
+
+        size = max(ENCODE_MIN_CHUNK, -(-len(texts) // self.workers))
+        futures = [
+            self.encoder.submit(encode_texts, texts[i:i + size], batch_size)
+            for i in range(0, len(texts), size)
+        ]
+        return np.concatenate([f.result() for f in futures])
+
+    def close(self):
+        self.cpu.shutdown()
+        if self.encoder is not self.cpu:
+            self.encoder.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
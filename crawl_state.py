@@ -0,0 +1,231 @@
+"""
+Per-job freshness tracking for the JobPilot ingestion pipeline.
+
+Every job stored in Chroma has a row in a SQLite table with:
+
+    url            the posting URL the job was extracted from
+    content_hash   hash of the posting content (see content_hash())
+    first_seen     when the job was first stored
+    last_seen      last time the posting was found alive (search hit,
+                   200 or 304 on re-fetch)
+    last_changed   last time the content hash changed
+    interval       current re-crawl interval in seconds
+    next_due       when the posting should be re-fetched
+    failures       consecutive failed re-fetches
+    status         "active" or "expired"
+
+The re-crawl interval starts at RECRAWL_MIN_INTERVAL_SECONDS, doubles every
+time a re-fetch finds the posting unchanged (up to the max), and drops back
+to the minimum when it changes. recrawl.py drives the re-fetches.
+"""
+
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+from html_cleaning import clean_html, extract_jsonld_job
+
+
+CRAWL_STATE_PATH = "/kaggle/working/jobpilot_crawl_state.db"
+
+RECRAWL_MIN_INTERVAL_SECONDS = 24 * 3600
+RECRAWL_MAX_INTERVAL_SECONDS = 7 * 24 * 3600
+RECRAWL_BACKOFF = 2.0
+
+# Consecutive failed re-fetches after which a posting is expired.
+MAX_FETCH_FAILURES = 3
+
+
+def posting_hash(job: dict | None, clean_text: str) -> str:
+    text = json.dumps(job, sort_keys=True) if job is not None else clean_text
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def content_hash(html: str) -> str:
+    """
+    Hash of what the posting says, not of the raw page: the JSON-LD
+    JobPosting if there is one, otherwise the cleaned main text. Rotating
+    ads, tracking scripts and CSRF tokens do not change it.
+    """
+    job = extract_jsonld_job(html)
+    return posting_hash(job, clean_html(html) if job is None else "")
+
+
+class CrawlStateStore:
+    """
+    SQLite table of per-job crawl state (see module docstring).
+    """
+
+    def __init__(self, path: str = CRAWL_STATE_PATH):
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS crawl_state (
+                job_id TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                content_hash TEXT,
+                first_seen REAL NOT NULL,
+                last_seen REAL NOT NULL,
+                last_changed REAL NOT NULL,
+                interval REAL NOT NULL,
+                next_due REAL NOT NULL,
+                failures INTEGER NOT NULL DEFAULT 0,
+                status TEXT NOT NULL DEFAULT 'active'
+            )
+        """)
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS crawl_state_next_due ON crawl_state (status, next_due)"
+        )
+        self.conn.commit()
+
+    def _write(self, sql: str, rows: list):
+        if not rows:
+            return
+        with self._lock:
+            self.conn.executemany(sql, rows)
+            self.conn.commit()
+
+    def record_stored(self, entries: list[tuple[str, str, str | None]], now: float | None = None):
+        """
+        Records jobs that were just written to Chroma, as (job_id, url,
+        content_hash). first_seen is kept for jobs already tracked.
+        """
+        now = now or time.time()
+        self._write(
+            """
+            INSERT INTO crawl_state
+                (job_id, url, content_hash, first_seen, last_seen, last_changed,
+                 interval, next_due, failures, status)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, 0, 'active')
+            ON CONFLICT(job_id) DO UPDATE SET
+                url = excluded.url,
+                content_hash = excluded.content_hash,
+                last_seen = excluded.last_seen,
+                last_changed = excluded.last_changed,
+                interval = excluded.interval,
+                next_due = excluded.next_due,
+                failures = 0,
+                status = 'active'
+            """,
+            [
+                (job_id, url, h, now, now, now, RECRAWL_MIN_INTERVAL_SECONDS,
+                 now + RECRAWL_MIN_INTERVAL_SECONDS)
+                for job_id, url, h in entries
+            ]
+        )
+
+    def mark_seen(self, job_ids: list[str], now: float | None = None):
+        """
+        The posting showed up again (e.g. in search results).
+        """
+        now = now or time.time()
+        self._write(
+            "UPDATE crawl_state SET last_seen = ? WHERE job_id = ?",
+            [(now, job_id) for job_id in job_ids]
+        )
+
+    def mark_unchanged(self, job_id: str, content_hash: str | None, now: float | None = None):
+        """
+        Re-fetch found the same content: back off the interval.
+        """
+        now = now or time.time()
+        with self._lock:
+            self.conn.execute(
+                """
+                UPDATE crawl_state SET
+                    content_hash = COALESCE(?, content_hash),
+                    last_seen = ?,
+                    interval = MIN(interval * ?, ?),
+                    next_due = ? + MIN(interval * ?, ?),
+                    failures = 0
+                WHERE job_id = ?
+                """,
+                (content_hash, now,
+                 RECRAWL_BACKOFF, RECRAWL_MAX_INTERVAL_SECONDS,
+                 now, RECRAWL_BACKOFF, RECRAWL_MAX_INTERVAL_SECONDS,
+                 job_id)
+            )
+            self.conn.commit()
+
+    def mark_failed(self, job_id: str, gone: bool = False, now: float | None = None):
+        """
+        Re-fetch failed. gone=True (404/410, empty posting) expires the job
+        at once; otherwise it expires after MAX_FETCH_FAILURES in a row.
+        """
+        now = now or time.time()
+        with self._lock:
+            self.conn.execute(
+                """
+                UPDATE crawl_state SET
+                    failures = failures + 1,
+                    next_due = ? + ?,
+                    status = CASE WHEN ? OR failures + 1 >= ? THEN 'expired' ELSE status END
+                WHERE job_id = ?
+                """,
+                (now, RECRAWL_MIN_INTERVAL_SECONDS, gone, MAX_FETCH_FAILURES, job_id)
+            )
+            self.conn.commit()
+
+    def due(self, now: float | None = None, limit: int | None = None) -> list[dict]:
+        """
+        Active jobs whose next_due has passed, most overdue first.
+        """
+        now = now or time.time()
+        rows = self.conn.execute(
+            "SELECT * FROM crawl_state WHERE status = 'active' AND next_due <= ? "
+            "ORDER BY next_due LIMIT ?",
+            (now, -1 if limit is None else limit)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def expired(self, expire_after: float, now: float | None = None) -> list[str]:
+        """
+        job_ids marked expired, or not seen alive for expire_after seconds.
+        """
+        now = now or time.time()
+        rows = self.conn.execute(
+            "SELECT job_id FROM crawl_state WHERE status = 'expired' OR last_seen < ?",
+            (now - expire_after,)
+        ).fetchall()
+        return [row["job_id"] for row in rows]
+
+    def urls(self, job_ids: list[str]) -> dict[str, str]:
+        """
+        job_id → URL the job was extracted from.
+        """
+        out = {}
+        for job_id in job_ids:
+            row = self.conn.execute("SELECT url FROM crawl_state WHERE job_id = ?", (job_id,)).fetchone()
+            if row is not None:
+                out[job_id] = row["url"]
+        return out
+
+    def tracked_ids(self) -> set[str]:
+        return {row["job_id"] for row in self.conn.execute("SELECT job_id FROM crawl_state")}
+
+    def delete(self, job_ids: list[str]):
+        self._write("DELETE FROM crawl_state WHERE job_id = ?", [(job_id,) for job_id in job_ids])
+
+    def report(self) -> dict:
+        rows = self.conn.execute(
+            "SELECT status, COUNT(*) AS n FROM crawl_state GROUP BY status"
+        ).fetchall()
+        counts = {row["status"]: row["n"] for row in rows}
+        (due,) = self.conn.execute(
+            "SELECT COUNT(*) FROM crawl_state WHERE status = 'active' AND next_due <= ?",
+            (time.time(),)
+        ).fetchone()
+        return {"active": counts.get("active", 0), "expired": counts.get("expired", 0), "due": due}
+
+
+_store = None
+
+
+def get_crawl_state() -> CrawlStateStore:
+    global _store
+    if _store is None:
+        _store = CrawlStateStore()
+    return _store
@@ -0,0 +1,285 @@
+"""
+Shared local embedding model for JobPilot.
+
+main.py and ingest_jobs.py both embed with the same SentenceTransformer.
+The model (and torch) is loaded lazily on the first encode() call and then
+cached for the rest of the process, so importing either module is cheap.
+
+Device and thread count can be set with configure() before first use, or via
+the JOBPILOT_EMBEDDING_DEVICE / JOBPILOT_EMBEDDING_THREADS environment
+variables.
+
+Vectors are cached on disk (SQLite) keyed by (model name, sha256 of text),
+so repeated query texts and re-indexed documents skip the transformer.
+"""
+
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+
+import numpy as np
+
+
+EMBEDDING_MODEL_NAME = "all-MiniLM-L6-v2"
+EMBEDDING_BATCH_SIZE = 64
+
+EMBEDDING_CACHE_PATH = "/kaggle/working/jobpilot_embedding_cache.db"
+EMBEDDING_CACHE_MAX_ENTRIES = 200_000
+
+EMBEDDING_CONFIG = {
+    "device": os.environ.get("JOBPILOT_EMBEDDING_DEVICE") or None,   # None → auto
+    "num_threads": int(os.environ.get("JOBPILOT_EMBEDDING_THREADS", "0")),  # 0 → torch default
+    "cache": os.environ.get("JOBPILOT_EMBEDDING_CACHE", "1") != "0",
+    "cache_dtype": "float16",   # "float16" halves the cache size, "float32" is lossless
+}
+
+EMBEDDING_STATS = {
+    "load_seconds": None,
+    "encode_calls": 0,
+    "texts_encoded": 0,
+    "encode_seconds": 0.0,
+    "cache_hits": 0,
+    "cache_misses": 0,
+}
+
+_model = None
+_model_lock = threading.Lock()
+_cache = None
+
+
+class EmbeddingCache:
+    """
+    Persistent LRU cache of embedding vectors.
+
+    Rows are keyed by (model, sha256(text)) and store the vector as raw
+    float16/float32 bytes. When the table grows past max_entries, the least
+    recently used rows are evicted.
+    """
+
+    def __init__(
+        self,
+        path: str = EMBEDDING_CACHE_PATH,
+        max_entries: int = EMBEDDING_CACHE_MAX_ENTRIES,
+        dtype: str = "float16"
+    ):
+        self.max_entries = max_entries
+        self.dtype = np.dtype(dtype)
+        self._lock = threading.Lock()
+        self._writes_since_evict = 0
+
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                dtype TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (model, text_hash)
+            )
+        """)
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)"
+        )
+        self.conn.commit()
+
+    @staticmethod
+    def text_hash(text: str) -> str:
+        return hashlib.sha256(text.encode()).hexdigest()
+
+    def get_many(self, model: str, hashes: list[str]) -> dict:
+        found = {}
+        now = time.time()
+        with self._lock:
+            for i in range(0, len(hashes), 500):
+                chunk = hashes[i:i + 500]
+                marks = ",".join("?" * len(chunk))
+                rows = self.conn.execute(
+                    f"SELECT text_hash, dtype, vector FROM embeddings "
+                    f"WHERE model = ? AND text_hash IN ({marks})",
+                    [model, *chunk]
+                ).fetchall()
+                for text_hash, dtype, blob in rows:
+                    found[text_hash] = np.frombuffer(blob, dtype=dtype).astype(np.float32)
+
+            if found:
+                self.conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE model = ? AND text_hash = ?",
+                    [(now, model, h) for h in found]
+                )
+                self.conn.commit()
+        return found
+
+    def put_many(self, model: str, items: dict):
+        now = time.time()
+        rows = [
+            (model, h, self.dtype.name, np.asarray(v, dtype=self.dtype).tobytes(), now)
+            for h, v in items.items()
+        ]
+        with self._lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?, ?)", rows
+            )
+            self.conn.commit()
+
+            self._writes_since_evict += len(rows)
+            if self._writes_since_evict >= 1000:
+                self._evict()
+
+    def _evict(self):
+        self._writes_since_evict = 0
+        (count,) = self.conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            self.conn.execute(
+                "DELETE FROM embeddings WHERE rowid IN "
+                "(SELECT rowid FROM embeddings ORDER BY last_used LIMIT ?)",
+                (excess,)
+            )
+            self.conn.commit()
+
+
+def get_cache() -> EmbeddingCache | None:
+    global _cache
+    if not EMBEDDING_CONFIG["cache"]:
+        return None
+    if _cache is None:
+        with _model_lock:
+            if _cache is None:
+                _cache = EmbeddingCache(dtype=EMBEDDING_CONFIG["cache_dtype"])
+    return _cache
+
+
+def configure(device: str | None = None, num_threads: int | None = None):
+    """
+    Sets the device ("cpu", "cuda", "mps", ...) and torch thread count.
+    Only has an effect before the model is loaded.
+    """
+    if _model is not None:
+        print("[WARN] Embedding model already loaded; configure() ignored.")
+        return
+    if device is not None:
+        EMBEDDING_CONFIG["device"] = device
+    if num_threads is not None:
+        EMBEDDING_CONFIG["num_threads"] = num_threads
+
+
+def get_model():
+    """
+    Returns the process-wide SentenceTransformer, loading it on first use.
+    """
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                start = time.perf_counter()
+
+                import torch
+                from sentence_transformers import SentenceTransformer
+
+                if EMBEDDING_CONFIG["num_threads"]:
+                    torch.set_num_threads(EMBEDDING_CONFIG["num_threads"])
+
+                _model = SentenceTransformer(
+                    EMBEDDING_MODEL_NAME,
+                    device=EMBEDDING_CONFIG["device"]
+                )
+
+                EMBEDDING_STATS["load_seconds"] = time.perf_counter() - start
+                print(f"[INFO] Loaded embedding model {EMBEDDING_MODEL_NAME} "
+                      f"on {_model.device} in {EMBEDDING_STATS['load_seconds']:.1f}s")
+    return _model
+
+
+def _encode_uncached(texts: list[str], batch_size: int, encoder=None) -> np.ndarray:
+    start = time.perf_counter()
+    if encoder is not None:
+        vectors = np.asarray(encoder(texts, batch_size))
+    else:
+        vectors = get_model().encode(texts, batch_size=batch_size, convert_to_numpy=True)
+    elapsed = time.perf_counter() - start
+
+    EMBEDDING_STATS["encode_calls"] += 1
+    EMBEDDING_STATS["texts_encoded"] += len(texts)
+    EMBEDDING_STATS["encode_seconds"] += elapsed
+
+    return vectors
+
+
+def encode(
+    texts: list[str] | str,
+    batch_size: int = EMBEDDING_BATCH_SIZE,
+    encoder=None
+) -> list[list[float]]:
+    """
+    Embeds a batch of texts.
+
+    Cached vectors are served from the embedding cache; the remaining texts
+    are embedded with a single SentenceTransformer.encode call, or with
+    encoder(texts, batch_size) if given (e.g. a process pool, see cpu_pool.py).
+    """
+    if isinstance(texts, str):
+        texts = [texts]
+    if not texts:
+        return []
+
+    cache = get_cache()
+    if cache is None:
+        return _encode_uncached(texts, batch_size, encoder).tolist()
+
+    hashes = [EmbeddingCache.text_hash(t) for t in texts]
+    found = cache.get_many(EMBEDDING_MODEL_NAME, list(set(hashes)))
+
+    # Each distinct missing text is encoded once.
+    missing = {}
+    for text, h in zip(texts, hashes):
+        if h not in found:
+            missing.setdefault(h, text)
+
+    EMBEDDING_STATS["cache_hits"] += len(texts) - len(missing)
+    EMBEDDING_STATS["cache_misses"] += len(missing)
+
+    if missing:
+        vectors = _encode_uncached(list(missing.values()), batch_size, encoder)
+        computed = dict(zip(missing.keys(), vectors))
+        cache.put_many(EMBEDDING_MODEL_NAME, computed)
+        found.update(computed)
+
+    return [found[h].tolist() for h in hashes]
+
+
+def embedding_report() -> dict:
+    """
+    Load time, encode latency and cache hit rate so far.
+    """
+    calls = EMBEDDING_STATS["encode_calls"]
+    lookups = EMBEDDING_STATS["cache_hits"] + EMBEDDING_STATS["cache_misses"]
+    return {
+        "model": EMBEDDING_MODEL_NAME,
+        "loaded": _model is not None,
+        "load_seconds": EMBEDDING_STATS["load_seconds"],
+        "encode_calls": calls,
+        "texts_encoded": EMBEDDING_STATS["texts_encoded"],
+        "encode_seconds": EMBEDDING_STATS["encode_seconds"],
+        "avg_encode_ms": 1000 * EMBEDDING_STATS["encode_seconds"] / calls if calls else None,
+        "cache_hits": EMBEDDING_STATS["cache_hits"],
+        "cache_misses": EMBEDDING_STATS["cache_misses"],
+        "cache_hit_rate": EMBEDDING_STATS["cache_hits"] / lookups if lookups else None,
+    }
+
+
+class LocalEmbeddingFunction:
+    """
+    Chroma embedding function backed by the shared model.
+    """
+
+    def __call__(self, input):
+        return encode(input)
+
+    def name(self):
+        return "local-mini-lm-l6-v2"
+
+
+embedding_fn = LocalEmbeddingFunction()
@@ -0,0 +1,120 @@
+"""
+Structured job filters for the ChromaDB 'jobs' collection.
+
+At ingest time every job gets two derived metadata fields:
+
+    is_remote            (bool)  posting is remote / telecommute
+    employment_type_key  (str)   normalised employment type, e.g. "full_time"
+
+Jobs stored before these fields existed get them from
+backfill_filter_fields(), once per collection (migrations.py). Chroma drops
+records that lack a filtered key, so without the backfill remote_only and
+employment_types would silently exclude every old job.
+
+At query time build_chroma_filters() turns job preferences and the rejection
+list into a Chroma `where` clause, so non-matching jobs are pruned inside the
+index instead of by the LLM. Location is not filtered here: free-text
+locations ("NYC", "United States") are matched by scoring.location_matches
+in the pre-scorer, which knows aliases and states.
+"""
+
+import re
+
+from migrations import get_migration_log
+from jobs_version import get_jobs_version
+
+
+REMOTE_MARKERS = ["remote", "telecommute", "work from home", "wfh", "anywhere"]
+
+FILTER_FIELDS = ("is_remote", "employment_type_key")
+
+
+def normalise_employment_type(value: str) -> str:
+    """
+    "Full-time", "FULL_TIME", "full time" → "full_time".
+    """
+    return re.sub(r"[^a-z0-9]+", "_", (value or "").lower()).strip("_")
+
+
+def is_remote_job(job_details: dict) -> bool:
+    text = " ".join([
+        job_details.get("location", "") or "",
+        job_details.get("employment_type", "") or "",
+        job_details.get("title", "") or "",
+    ]).lower()
+    return any(marker in text for marker in REMOTE_MARKERS)
+
+
+def add_filter_fields(job_details: dict) -> dict:
+    job_details["is_remote"] = is_remote_job(job_details)
+    job_details["employment_type_key"] = normalise_employment_type(job_details.get("employment_type", ""))
+    return job_details
+
+
+def _any_of(clauses: list[dict], op: str = "$or"):
+    if not clauses:
+        return None
+    if len(clauses) == 1:
+        return clauses[0]
+    return {op: clauses}
+
+
+def backfill_filter_fields(collection, page_size: int = 1000) -> int:
+    """
+    Adds the derived filter fields to stored jobs that lack them. Runs once
+    per collection; returns the number of jobs updated.
+    """
+    log = get_migration_log()
+    if log.done("filter_fields"):
+        return 0
+
+    updated = 0
+    offset = 0
+    while True:
+        page = collection.get(include=["metadatas"], limit=page_size, offset=offset)
+        ids = page.get("ids", [])
+        if not ids:
+            break
+        stale = [(job_id, dict(meta or {})) for job_id, meta in zip(ids, page.get("metadatas") or [])
+                 if any(field not in (meta or {}) for field in FILTER_FIELDS)]
+        if stale:
+            collection.update(
+                ids=[job_id for job_id, _ in stale],
+                metadatas=[add_filter_fields(meta) for _, meta in stale]
+            )
+            updated += len(stale)
+        offset += len(ids)
+
+    log.mark_done("filter_fields")
+    if updated:
+        get_jobs_version().bump()
+        print(f"[INFO] Backfilled filter fields for {updated} stored jobs.")
+    return updated
+
+
+def build_chroma_filters(
+    remote_only: bool = False,
+    employment_types: list[str] | None = None,
+    exclude_job_ids: list[str] | None = None
+) -> dict | None:
+    """
+    Returns the where clause for collection.query().
+
+    - exclude_job_ids   → job_id $nin (rejected jobs never come back)
+    - employment_types  → employment_type_key $in
+    - remote_only       → is_remote == True
+    """
+    where_clauses = []
+
+    if exclude_job_ids:
+        where_clauses.append({"job_id": {"$nin": list(exclude_job_ids)}})
+
+    if employment_types:
+        keys = sorted({normalise_employment_type(t) for t in employment_types if t})
+        if keys:
+            where_clauses.append({"employment_type_key": {"$in": keys}})
+
+    if remote_only:
+        where_clauses.append({"is_remote": True})
+
+    return _any_of(where_clauses, "$and")
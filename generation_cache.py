@@ -0,0 +1,138 @@
+"""
+Content-addressed cache for generated application documents.
+
+Resumes and cover letters only depend on the user profile, the job, the
+agent's instruction and the model. The cache key is a hash of exactly those
+inputs, so an identical request (same profile, same job content, same prompt
+version, same model) is answered from SQLite without an LLM call.
+
+The database lives next to autoapply_sessions.db. The oldest-used entries are
+evicted once the cache grows past GENERATION_CACHE_MAX_ENTRIES.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+
+GENERATION_CACHE_PATH = "/kaggle/working/generation_cache.db"
+GENERATION_CACHE_MAX_ENTRIES = 2000
+
+# Set JOBPILOT_GENERATION_CACHE=0 to bypass the cache for the whole process.
+GENERATION_CACHE_ENABLED = os.environ.get("JOBPILOT_GENERATION_CACHE", "1") != "0"
+
+# Profile fields that change without changing the profile's content.
+VOLATILE_PROFILE_FIELDS = {"update_required", "last_update"}
+
+# Fields added to a job by search/scoring; they do not change the posting.
+VOLATILE_JOB_FIELDS = {"score", "pass", "rationale", "borderline", "similarity"}
+
+
+def _sha256(value) -> str:
+    if not isinstance(value, str):
+        value = json.dumps(value, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(value.encode()).hexdigest()
+
+
+def normalise_profile(profile: dict) -> dict:
+    return {k: v for k, v in (profile or {}).items() if k not in VOLATILE_PROFILE_FIELDS}
+
+
+def job_content_hash(job: dict) -> str:
+    return _sha256({k: v for k, v in (job or {}).items() if k not in VOLATILE_JOB_FIELDS})
+
+
+def generation_key(kind: str, profile: dict, job: dict, instruction: str, model_name: str) -> str:
+    """
+    Hash of (kind, normalised profile, job_id, job content hash,
+    instruction version, model name).
+    """
+    return _sha256({
+        "kind": kind,
+        "profile": _sha256(normalise_profile(profile)),
+        "job_id": (job or {}).get("job_id", ""),
+        "job": job_content_hash(job),
+        "instruction": _sha256(instruction or ""),
+        "model": model_name or "",
+    })
+
+
+class GenerationCache:
+    """
+    SQLite-backed cache of generated documents, with LRU eviction.
+    """
+
+    def __init__(self, path: str = GENERATION_CACHE_PATH, max_entries: int = GENERATION_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.stats = {"hits": 0, "misses": 0}
+        self._lock = threading.Lock()
+
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS generations (
+                key TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                job_id TEXT NOT NULL,
+                output TEXT NOT NULL,
+                created REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS generations_last_used ON generations (last_used)"
+        )
+        self.conn.commit()
+
+    def get(self, key: str) -> dict | None:
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT output FROM generations WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.stats["misses"] += 1
+                return None
+
+            self.conn.execute(
+                "UPDATE generations SET last_used = ? WHERE key = ?", (time.time(), key)
+            )
+            self.conn.commit()
+            self.stats["hits"] += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, kind: str, job_id: str, output: dict):
+        now = time.time()
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO generations VALUES (?, ?, ?, ?, ?, ?)",
+                (key, kind, job_id, json.dumps(output, ensure_ascii=False), now, now)
+            )
+            self.conn.execute(
+                "DELETE FROM generations WHERE key IN ("
+                "SELECT key FROM generations ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+            self.conn.commit()
+
+    def report(self) -> dict:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        (entries,) = self.conn.execute("SELECT COUNT(*) FROM generations").fetchone()
+        return {
+            **self.stats,
+            "entries": entries,
+            "hit_rate": self.stats["hits"] / lookups if lookups else None,
+        }
+
+
+_cache = None
+
+
+def get_generation_cache() -> GenerationCache | None:
+    global _cache
+    if not GENERATION_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        _cache = GenerationCache()
+    return _cache
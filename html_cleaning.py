@@ -0,0 +1,227 @@
+"""
+HTML pre-processing for the JobPilot ingestion pipeline.
+
+Two deterministic steps that run before the LLM extractor:
+
+1. extract_jsonld_job(): if the page embeds a schema.org JobPosting as
+   JSON-LD, map it straight onto JOB_DETAILS_SCHEMA (no LLM call needed).
+2. clean_html(): otherwise strip scripts, styles, navigation and other
+   boilerplate, keep the main job content as plain text and cap its size.
+
+This module only depends on BeautifulSoup so it stays cheap to import.
+"""
+
+import re
+import json
+from bs4 import BeautifulSoup
+
+from schemas import JOB_DETAILS_SCHEMA
+
+
+# Upper bound (in characters) on the cleaned text sent to the extractor.
+CLEAN_TEXT_MAX_CHARS = 20000
+
+# Tags that never contain job content.
+BOILERPLATE_TAGS = [
+    "script", "style", "noscript", "template", "svg", "canvas", "iframe",
+    "form", "button", "input", "select", "nav", "header", "footer", "aside",
+]
+
+# Containers tried in order to locate the main content of the page.
+MAIN_CONTENT_SELECTORS = [
+    "main",
+    "article",
+    "[role=main]",
+    "#job-description",
+    ".job-description",
+    "body",
+]
+
+
+def _soup(html: str) -> BeautifulSoup:
+    return BeautifulSoup(html, "lxml")
+
+
+def clean_html(html: str, max_chars: int = CLEAN_TEXT_MAX_CHARS) -> str:
+    """
+    Reduces a job page to the plain text of its main content.
+    """
+    soup = _soup(html)
+
+    for tag in soup(BOILERPLATE_TAGS):
+        tag.decompose()
+
+    root = None
+    for selector in MAIN_CONTENT_SELECTORS:
+        root = soup.select_one(selector)
+        if root is not None and root.get_text(strip=True):
+            break
+    if root is None:
+        root = soup
+
+    title = soup.title.get_text(strip=True) if soup.title else ""
+    text = root.get_text("\n", strip=True)
+    text = re.sub(r"\n{2,}", "\n", text)
+
+    if title and not text.startswith(title):
+        text = f"{title}\n{text}"
+
+    return text[:max_chars]
+
+
+# ---------------------------------------------------------------------
+# schema.org JobPosting
+# ---------------------------------------------------------------------
+
+def _is_job_posting(node) -> bool:
+    types = node.get("@type")
+    if isinstance(types, str):
+        types = [types]
+    return isinstance(types, list) and "JobPosting" in types
+
+
+def _find_job_posting(data):
+    if isinstance(data, list):
+        for item in data:
+            found = _find_job_posting(item)
+            if found is not None:
+                return found
+    elif isinstance(data, dict):
+        if _is_job_posting(data):
+            return data
+        if "@graph" in data:
+            return _find_job_posting(data["@graph"])
+    return None
+
+
+def _as_list(value, split: bool = False) -> list[str]:
+    """
+    Normalises a JSON-LD value (string, object or list of either) to a list
+    of strings. With split=True, plain strings are split on commas.
+    """
+    if value is None or value == "":
+        return []
+    if isinstance(value, str):
+        value = _strip_tags(value)
+        if split:
+            return [v.strip() for v in value.split(",") if v.strip()]
+        return [value] if value else []
+    if isinstance(value, dict):
+        if "monthsOfExperience" in value:
+            return [f"{value['monthsOfExperience']} months of experience"]
+        text = value.get("name") or value.get("description") or value.get("credentialCategory")
+        return [str(text)] if text else []
+    if isinstance(value, list):
+        out = []
+        for item in value:
+            out.extend(_as_list(item, split=split))
+        return out
+    return [str(value)]
+
+
+def _strip_tags(text: str) -> str:
+    if "<" not in text:
+        return text.strip()
+    text = _soup(text).get_text(" ", strip=True)
+    return re.sub(r"\s+([.,;:!?])", r"\1", text)
+
+
+def _location(posting: dict) -> str:
+    places = posting.get("jobLocation") or []
+    if isinstance(places, dict):
+        places = [places]
+
+    names = []
+    for place in places:
+        address = place.get("address", {}) if isinstance(place, dict) else {}
+        if isinstance(address, str):
+            names.append(address)
+            continue
+        parts = [
+            address.get("addressLocality", ""),
+            address.get("addressRegion", ""),
+            _name(address.get("addressCountry", "")),
+        ]
+        name = ", ".join(p for p in parts if p)
+        if name:
+            names.append(name)
+
+    if posting.get("jobLocationType") == "TELECOMMUTE":
+        names.append("Remote")
+
+    return "; ".join(names)
+
+
+def _name(value) -> str:
+    if isinstance(value, dict):
+        return value.get("name", "")
+    return value or ""
+
+
+def _salary(posting: dict) -> str:
+    salary = posting.get("baseSalary")
+    if not salary:
+        return ""
+    if not isinstance(salary, dict):
+        return str(salary)
+
+    currency = salary.get("currency", "")
+    value = salary.get("value", "")
+    if isinstance(value, dict):
+        unit = value.get("unitText", "")
+        if "minValue" in value or "maxValue" in value:
+            amount = f"{value.get('minValue', '')}-{value.get('maxValue', '')}".strip("-")
+        else:
+            amount = str(value.get("value", ""))
+        return " ".join(p for p in [currency, amount, f"per {unit.lower()}" if unit else ""] if p)
+
+    return " ".join(p for p in [currency, str(value)] if p)
+
+
+def extract_jsonld_job(html: str) -> dict | None:
+    """
+    Returns a JOB_DETAILS_SCHEMA dict built from the page's schema.org
+    JobPosting JSON-LD, or None if there is no usable JobPosting block.
+
+    job_id and apply_url are left empty; the caller fills them in.
+    """
+    if "JobPosting" not in html:
+        return None
+
+    soup = _soup(html)
+    posting = None
+    for script in soup.find_all("script", type="application/ld+json"):
+        try:
+            data = json.loads(script.string or "")
+        except (TypeError, ValueError):
+            continue
+        posting = _find_job_posting(data)
+        if posting is not None:
+            break
+
+    if posting is None:
+        return None
+
+    description = _strip_tags(posting.get("description", "") or "")
+    title = (posting.get("title") or "").strip()
+    if not title or not description:
+        return None
+
+    employment_type = posting.get("employmentType", "")
+    if isinstance(employment_type, list):
+        employment_type = ", ".join(employment_type)
+
+    job = {k: (list(v) if isinstance(v, list) else v) for k, v in JOB_DETAILS_SCHEMA.items()}
+    job.update({
+        "title": title,
+        "company": _name(posting.get("hiringOrganization")),
+        "location": _location(posting),
+        "employment_type": employment_type,
+        "salary": _salary(posting),
+        "job_description": description,
+        "requirements": _as_list(posting.get("experienceRequirements"))
+                        + _as_list(posting.get("educationRequirements")),
+        "qualifications": _as_list(posting.get("qualifications")),
+        "skills_mentioned": _as_list(posting.get("skills"), split=True),
+    })
+    return job
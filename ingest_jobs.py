@@ -2,29 +2,97 @@
 JobPilot — Autonomous Job Ingestion Pipeline (FINAL VERSION)
 
 Pipeline:
-1. Use ADK Google Search to discover job URLs
-2. Fetch raw HTML for each URL
-3. Extract structured job details using LLM
-4. Insert into ChromaDB using SentenceTransformer embeddings
-5. Print summary
+1. Use ADK Google Search to discover job URLs for every DISCOVERY_QUERIES
+   entry; canonical URLs go into a persistent frontier (url_frontier.py)
+2. Fetch raw HTML for pending frontier URLs, highest priority first; the
+   frontier journals each URL's stage so interrupted runs resume
+3. Skip near-duplicates of stored jobs (near_duplicates.py)
+4. Extract structured job details using LLM
+5. Insert into ChromaDB using SentenceTransformer embeddings
+6. Print summary
 
 This script matches main.py perfectly.
 """
 
 import os
+import gzip
+import json
+import time
+import asyncio
+import argparse
 import hashlib
+from urllib.parse import urlparse
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.request import ACCEPT_ENCODING
 import chromadb
-from sentence_transformers import SentenceTransformer
 from chromadb.utils import embedding_functions
 
+from embeddings import embedding_fn, embedding_report, encode
+from filters import add_filter_fields
+from html_cleaning import clean_html, extract_jsonld_job, CLEAN_TEXT_MAX_CHARS
+from crawl_state import CrawlStateStore, get_crawl_state, content_hash
+from url_frontier import URLFrontier, get_frontier, canonicalize_url
+from near_duplicates import NearDuplicateIndex, get_near_duplicate_index, page_signature, DEDUP_STATS
+from cpu_pool import CpuPool, CPU_WORKERS, ENCODER_MODES
+from jobs_version import get_jobs_version
+from migrations import get_migration_log
+
 
 CHROMA_DB_PATH = "/kaggle/working/jobpilot_chroma_db"   
 
+# Raw posting HTML is kept out of Chroma, gzip-compressed, one file per job_id.
+HTML_BLOB_PATH = "/kaggle/working/jobpilot_html_blobs"
+
+# On-disk HTTP cache used for ETag / Last-Modified revalidation.
+HTTP_CACHE_PATH = "/kaggle/working/jobpilot_http_cache"
+
+# ACCEPT_ENCODING includes "br" when the Brotli package is installed.
 HEADERS = {
-    "User-Agent": "Mozilla/5.0 (X11; Linux x86_64)"
+    "User-Agent": "Mozilla/5.0 (X11; Linux x86_64)",
+    "Accept-Encoding": ACCEPT_ENCODING,
 }
 
+# Concurrency limits for ingest_async(). Fetching is network-bound and cheap,
+# extraction is an LLM call and is kept lower to stay inside Gemini quotas.
+FETCH_CONCURRENCY = 8
+EXTRACT_CONCURRENCY = 4
+
+# Politeness: at most PER_HOST_CONCURRENCY requests in flight per host, and at
+# least HOST_DELAY_SECONDS between two requests to the same host.
+PER_HOST_CONCURRENCY = 2
+HOST_DELAY_SECONDS = 1.0
+
+# Search queries run on every ingest; results are merged in the URL frontier.
+DISCOVERY_QUERIES = [
+    "machine learning engineer remote",
+    "data scientist remote",
+    "software engineer python remote",
+    "ml ops engineer",
+    "ai engineer llm",
+    "data engineer remote",
+]
+SEARCH_RESULTS_PER_QUERY = 15
+
+# Maximum frontier URLs fetched per ingest run (None → all pending).
+FRONTIER_BATCH_LIMIT = 200
+
+# Parsed jobs are buffered and written to Chroma in batches of this size.
+WRITE_BATCH_SIZE = 64
+
+# Fields, in order, that make up the document embedded for each job.
+# all-MiniLM-L6-v2 truncates at 256 tokens, so the most discriminative fields
+# go first and the long description last.
+EMBEDDING_TEXT_FIELDS = [
+    "title",
+    "company",
+    "location",
+    "skills_mentioned",
+    "requirements",
+    "job_description",
+]
+EMBEDDING_TEXT_MAX_CHARS = 2000
+
 JOB_DETAILS_SCHEMA = {
     "job_id": "",
     "title": "",
@@ -40,19 +108,55 @@ JOB_DETAILS_SCHEMA = {
 }
 
 
-class LocalEmbeddingFunction:
-    def __init__(self):
-        self.model = SentenceTransformer("all-MiniLM-L6-v2")
+def build_embedding_text(
+    job_details: dict,
+    fields: list[str] = EMBEDDING_TEXT_FIELDS,
+    max_chars: int = EMBEDDING_TEXT_MAX_CHARS
+) -> str:
+    """
+    Builds the compact text that is stored and embedded as the Chroma document.
+    List fields are joined with commas; empty fields are left out.
+    """
+    lines = []
+    for field in fields:
+        value = job_details.get(field)
+        if isinstance(value, list):
+            value = ", ".join(str(v) for v in value if v)
+        if value:
+            label = field.replace("_", " ").capitalize()
+            lines.append(f"{label}: {value}")
+
+    return "\n".join(lines)[:max_chars]
+
+
+class HtmlBlobStore:
+    """
+    Compressed on-disk store for raw posting HTML, keyed by job_id.
+    """
+
+    def __init__(self, path: str = HTML_BLOB_PATH):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
 
-    def __call__(self, input):
-        if isinstance(input, str):
-            input = [input]
-        return self.model.encode(input, convert_to_numpy=True).tolist()
+    def _file(self, job_id: str) -> str:
+        return os.path.join(self.path, f"{job_id}.html.gz")
 
-    def name(self):
-        return "local-mini-lm-l6-v2"
+    def put(self, job_id: str, html: str):
+        with gzip.open(self._file(job_id), "wt", encoding="utf-8") as f:
+            f.write(html)
 
-embedding_fn = LocalEmbeddingFunction()
+    def get(self, job_id: str) -> str | None:
+        try:
+            with gzip.open(self._file(job_id), "rt", encoding="utf-8") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def delete(self, job_id: str):
+        try:
+            os.remove(self._file(job_id))
+        except FileNotFoundError:
+            pass
 
 
 def connect_to_chromadb():
@@ -92,7 +196,7 @@ job_link_search_tool_adk = FunctionTool(func=job_link_search)
 
 
 
-def get_job_urls(query="machine learning engineer remote", n_results=15):
+def get_job_urls(query="machine learning engineer remote", n_results=SEARCH_RESULTS_PER_QUERY):
     """
     Uses ADK tool to discover real job posting URLs.
     """
@@ -106,16 +210,147 @@ def get_job_urls(query="machine learning engineer remote", n_results=15):
     return urls
 
 
+def discover(
+    frontier: URLFrontier,
+    crawl_state: CrawlStateStore,
+    queries: list[str] | None = None,
+    n_results: int = SEARCH_RESULTS_PER_QUERY
+) -> int:
+    """
+    Runs every discovery query and adds the canonicalised results to the
+    frontier. Returns the number of URLs not seen in any earlier query or run.
+    """
+    queries = queries or DISCOVERY_QUERIES
+    session = get_http_session()
+    new = 0
+    for query in queries:
+        urls = get_job_urls(query=query, n_results=n_results)
+        new += frontier.add(urls, query, session=session)
+        # Stored postings that show up in search again are still alive. The
+        # session resolves redirect links (already cached by frontier.add).
+        canonical = [canonicalize_url(url, session) for url in urls]
+        legacy = frontier.legacy_job_ids(canonical)
+        crawl_state.mark_seen([make_job_id(url) for url in canonical] + list(legacy.values()))
+    print(f"[INFO] Discovery: {len(queries)} queries, {new} new URLs in the frontier.")
+    return new
+
+
+
+class HttpCache:
+    """
+    On-disk cache of fetched pages with their validators.
+
+    Each entry is a gzip-compressed JSON file holding the ETag, the
+    Last-Modified date and the page text, keyed by sha256(url).
+    """
+
+    def __init__(self, path: str = HTTP_CACHE_PATH):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    def _file(self, url: str) -> str:
+        return os.path.join(self.path, hashlib.sha256(url.encode()).hexdigest() + ".json.gz")
+
+    def get(self, url: str) -> dict | None:
+        try:
+            with gzip.open(self._file(url), "rt", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError, OSError):
+            return None
+
+    def put(self, url: str, resp: requests.Response):
+        entry = {
+            "etag": resp.headers.get("ETag"),
+            "last_modified": resp.headers.get("Last-Modified"),
+            "text": resp.text,
+        }
+        if not entry["etag"] and not entry["last_modified"]:
+            return
+        with gzip.open(self._file(url), "wt", encoding="utf-8") as f:
+            json.dump(entry, f)
+
+    def conditional_headers(self, entry: dict | None) -> dict:
+        if not entry:
+            return {}
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+
+# Counters for the fetch stage, reported in the ingest summary.
+FETCH_STATS = {
+    "requests": 0,
+    "not_modified": 0,
+    "bytes_fetched": 0,
+}
+
+_http_session = None
+_http_cache = None
+
+
+def get_http_session() -> requests.Session:
+    """
+    Returns the process-wide requests.Session so connections are pooled and
+    kept alive across the whole run. The pool is sized for FETCH_CONCURRENCY.
+    """
+    global _http_session
+    if _http_session is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=FETCH_CONCURRENCY, pool_maxsize=FETCH_CONCURRENCY)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        session.headers.update(HEADERS)
+        _http_session = session
+    return _http_session
+
+
+def get_http_cache() -> HttpCache:
+    global _http_cache
+    if _http_cache is None:
+        _http_cache = HttpCache()
+    return _http_cache
+
+
+def fetch_page(url: str) -> tuple[int | None, str | None]:
+    """
+    Fetches a page through the pooled session and returns (status, text).
+
+    If the page was fetched before, the request is conditional
+    (If-None-Match / If-Modified-Since) and a 304 is served from the cache
+    as (304, cached text). Network errors return (None, None).
+    """
+    cache = get_http_cache()
+    cached = cache.get(url)
 
-def fetch_html(url: str) -> str | None:
     try:
-        resp = requests.get(url, headers=HEADERS, timeout=12)
+        resp = get_http_session().get(
+            url,
+            headers=cache.conditional_headers(cached),
+            timeout=12
+        )
+        FETCH_STATS["requests"] += 1
+
+        if resp.status_code == 304 and cached:
+            FETCH_STATS["not_modified"] += 1
+            return 304, cached["text"]
+
         if resp.status_code == 200:
-            return resp.text
+            FETCH_STATS["bytes_fetched"] += len(resp.content)
+            cache.put(url, resp)
+            return 200, resp.text
+
         print(f"[WARN] Failed {url} — status {resp.status_code}")
+        return resp.status_code, None
     except Exception as e:
         print(f"[ERROR] Fetch error for {url}: {e}")
-    return None
+    return None, None
+
+
+def fetch_html(url: str) -> str | None:
+    return fetch_page(url)[1]
 
 
 
@@ -125,7 +360,8 @@ from google.adk.models.google_llm import Gemini
 HTML_EXTRACTION_INSTRUCTION = """
 You are the Job HTML Extraction Agent.
 
-Given raw HTML and a job URL, extract job details into JOB_DETAILS_SCHEMA.
+Given the cleaned text of a job posting page and its URL, extract job details into JOB_DETAILS_SCHEMA.
+Scripts, styles and navigation have already been removed from the page.
 
 Output EXACTLY this JSON dict:
 
@@ -144,7 +380,7 @@ Output EXACTLY this JSON dict:
 }
 
 RULES:
-- Extract ONLY what appears in the HTML.
+- Extract ONLY what appears in the page text.
 - NEVER hallucinate information.
 - Missing fields → leave empty.
 - All lists MUST be lists of strings.
@@ -156,17 +392,59 @@ gemini_flash = Gemini(model="gemini-2.5-flash")
 html_extractor_agent = LlmAgent(
     model=gemini_flash,
     name="html_extractor_agent",
-    description="Extracts structured job details from raw HTML.",
+    description="Extracts structured job details from cleaned job page text.",
     instruction=HTML_EXTRACTION_INSTRUCTION
 )
 
-def parse_job_html(html: str, url: str) -> dict:
-    job_id = hashlib.sha256(url.encode()).hexdigest()[:16]
+# Running totals for the pre-cleaning stage, reported in the ingest summary.
+EXTRACTION_STATS = {
+    "raw_bytes": 0,
+    "clean_bytes": 0,
+    "jsonld_hits": 0,
+    "llm_calls": 0,
+}
 
-    response = html_extractor_agent.run({
-        "url": url,
-        "html": html
-    })
+
+def make_job_id(url: str) -> str:
+    """
+    Hash of the canonical URL, so tracking parameters and fragments do not
+    create a second job_id for the same posting.
+    """
+    return hashlib.sha256(canonicalize_url(url).encode()).hexdigest()[:16]
+
+
+def parse_job_html(
+    html: str,
+    url: str,
+    max_chars: int = CLEAN_TEXT_MAX_CHARS,
+    prepared: dict | None = None
+) -> dict:
+    """
+    prepared is cpu_pool.prepare_page(html) when the CPU work was already
+    done in the process pool.
+    """
+    job_id = make_job_id(url)
+    raw_bytes = len(html.encode())
+
+    # schema.org JobPosting JSON-LD → no LLM call needed
+    response = prepared["jsonld"] if prepared is not None else extract_jsonld_job(html)
+
+    if response is not None:
+        EXTRACTION_STATS["jsonld_hits"] += 1
+        print(f"[INFO] JSON-LD JobPosting found, skipping LLM: {url}")
+    else:
+        page_text = prepared["clean_text"] if prepared is not None else clean_html(html, max_chars=max_chars)
+        clean_bytes = len(page_text.encode())
+
+        EXTRACTION_STATS["raw_bytes"] += raw_bytes
+        EXTRACTION_STATS["clean_bytes"] += clean_bytes
+        EXTRACTION_STATS["llm_calls"] += 1
+        print(f"[INFO] Cleaned HTML: {raw_bytes:,} → {clean_bytes:,} bytes")
+
+        response = html_extractor_agent.run({
+            "url": url,
+            "page_text": page_text
+        })
 
     # Enforce schema
     response["job_id"] = job_id
@@ -176,6 +454,9 @@ def parse_job_html(html: str, url: str) -> dict:
     for k, v in JOB_DETAILS_SCHEMA.items():
         response.setdefault(k, v)
 
+    # Derived metadata used by chroma_query_tool's where-filters
+    add_filter_fields(response)
+
     return response
 
 
@@ -187,51 +468,627 @@ def job_exists(collection, job_id: str) -> bool:
         return False
 
 
-def insert_job(collection, job_details: dict, raw_html: str):
+def filter_new_urls(collection, urls: list[str]) -> tuple[list[str], list[str]]:
+    """
+    Pre-flight dedup: drops URLs whose job_id is already stored.
+
+    The job_id only depends on the URL, so all candidates are checked with a
+    single collection.get() before anything is fetched or sent to the LLM.
+    Duplicate URLs within the batch are collapsed as well.
+
+    Returns (new_urls, known_job_ids).
+    """
+    by_id = {}
+    for url in urls:
+        by_id.setdefault(make_job_id(url), url)
+
+    if not by_id:
+        return [], []
+
+    try:
+        out = collection.get(ids=list(by_id.keys()), include=[])
+        existing = set(out.get("ids", []))
+    except Exception as e:
+        print(f"[WARN] Pre-flight dedup failed, processing all URLs: {e}")
+        existing = set()
+
+    new_urls = [url for job_id, url in by_id.items() if job_id not in existing]
+    known = [job_id for job_id in by_id if job_id in existing]
+    return new_urls, known
+
+
+def migrate_stored_jobs(
+    collection,
+    frontier: URLFrontier,
+    dedup: NearDuplicateIndex,
+    blob_store: HtmlBlobStore,
+    page_size: int = 1000
+) -> int:
+    """
+    Brings jobs stored before URL canonicalisation and near-duplicate
+    detection up to date:
+
+    - a job whose job_id is not the hash of its canonical URL keeps that id;
+      its canonical URL is recorded in the frontier as known, with the id as
+      legacy_job_id, so discovery does not fetch and extract it again
+    - jobs missing from the near-duplicate index are indexed from their
+      stored HTML, so new copies collapse into them
+
+    Every job stored since then is canonical and indexed when it is written,
+    so the scan runs once per collection (migrations.py); jobs too short to
+    sign are not retried. Returns the number of legacy ids.
+    """
+    log = get_migration_log()
+    if log.done("stored_jobs"):
+        return 0
+
+    legacy_known = set(frontier.legacy_job_ids().values())
+    indexed = dedup.indexed_ids()
+    session = get_http_session()
+    legacy, signed = [], 0
+    offset = 0
+    while True:
+        page = collection.get(include=["metadatas"], limit=page_size, offset=offset)
+        ids = page.get("ids", [])
+        if not ids:
+            break
+        unsigned = []
+        for job_id, meta in zip(ids, page.get("metadatas") or []):
+            url = (meta or {}).get("apply_url")
+            if url and job_id != make_job_id(url) and job_id not in legacy_known:
+                legacy.append((canonicalize_url(url, session), job_id))
+            if job_id not in indexed:
+                unsigned.append(job_id)
+
+        pages = {job_id: blob_store.get(job_id) for job_id in unsigned}
+        # Jobs stored before the blob store kept the raw HTML as their document.
+        no_blob = [job_id for job_id, html in pages.items() if html is None]
+        if no_blob:
+            documents = collection.get(ids=no_blob, include=["documents"])
+            pages.update(zip(documents.get("ids", []), documents.get("documents") or []))
+        for job_id, html in pages.items():
+            if html:
+                signature = page_signature(html)
+                if signature is not None:
+                    dedup.replace(job_id, signature)
+                    signed += 1
+        offset += len(ids)
+
+    frontier.mark_known(legacy)
+    log.mark_done("stored_jobs")
+    if legacy or signed:
+        print(f"[INFO] Migrated stored jobs: {len(legacy)} legacy job_ids, "
+              f"{signed} added to the near-duplicate index.")
+    return len(legacy)
+
+
+def collapse_duplicate(
+    url: str,
+    html: str,
+    dedup: NearDuplicateIndex,
+    frontier: URLFrontier,
+    crawl_state: CrawlStateStore,
+    prepared: dict | None = None
+) -> bool:
+    """
+    Checks a fetched page against the near-duplicate index before extraction.
+    A cross-posted copy is recorded as an alias of the canonical job and
+    skipped; any other page is indexed under its own job_id.
+    """
+    signature = prepared["signature"] if prepared is not None else page_signature(html)
+    duplicate_of, similarity = dedup.find_or_add(make_job_id(url), signature)
+    if duplicate_of is None:
+        return False
+
+    dedup.add_alias(url, duplicate_of, similarity)
+    crawl_state.mark_seen([duplicate_of])
+    frontier.finish([url], status="duplicate")
+    print(f"[INFO] Near-duplicate of {duplicate_of} (similarity {similarity:.2f}), skipping: {url}")
+    return True
+
+
+def insert_job(collection, job_details: dict, raw_html: str, blob_store: HtmlBlobStore | None = None):
+    if blob_store is not None:
+        blob_store.put(job_details["job_id"], raw_html)
+
     collection.add(
         ids=[job_details["job_id"]],
-        documents=[raw_html],
+        documents=[build_embedding_text(job_details)],
         metadatas=[job_details]
     )
+    get_jobs_version().bump()
 
 
+class JobWriter:
+    """
+    Buffered Chroma writer.
 
-def ingest():
-    jobs_collection = connect_to_chromadb()
+    Collects parsed jobs and writes them with one collection.add() per batch,
+    so embeddings are computed with a single batched encode call and the HNSW
+    index is updated once per flush instead of once per job.
 
-    urls = get_job_urls(
-        query="machine learning engineer remote",
-        n_results=15
-    )
+    The stored document is build_embedding_text(job_details); the raw HTML
+    goes to blob_store if one is given. With upsert=True existing job_ids are
+    overwritten (used by the re-crawler). With a crawl_state store, every
+    written job is recorded there with its content hash. With a frontier,
+    each job's URL is advanced to "embedded" and "stored", or its failure
+    counted, in the ingest work queue. encoder replaces the in-process
+    SentenceTransformer for embedding cache misses (see CpuPool.encode).
+    Every successful write bumps the collection version (jobs_version.py).
 
-    inserted = 0
-    skipped = 0
+    Use as a context manager (or call close()) so the last partial batch is
+    flushed on shutdown.
+    """
 
-    for url in urls:
-        print(f"\n[INFO] Processing: {url}")
+    def __init__(
+        self,
+        collection,
+        batch_size: int = WRITE_BATCH_SIZE,
+        blob_store: HtmlBlobStore | None = None,
+        upsert: bool = False,
+        crawl_state: CrawlStateStore | None = None,
+        frontier: URLFrontier | None = None,
+        encoder=None
+    ):
+        self.collection = collection
+        self.batch_size = batch_size
+        self.blob_store = blob_store
+        self.upsert = upsert
+        self.crawl_state = crawl_state
+        self.frontier = frontier
+        self.encoder = encoder
+        self.ids = []
+        self.documents = []
+        self.metadatas = []
+        self.hashes = []
+        self.written = 0
+        self.failed = 0
+        self.dead = []
 
-        html = fetch_html(url)
-        if not html:
-            print("[WARN] Skipping — no HTML")
-            continue
+    def add(self, job_details: dict, raw_html: str, page_hash: str | None = None):
+        if self.blob_store is not None:
+            self.blob_store.put(job_details["job_id"], raw_html)
+        if self.crawl_state is not None and page_hash is None:
+            page_hash = content_hash(raw_html)
+
+        self.ids.append(job_details["job_id"])
+        self.documents.append(build_embedding_text(job_details))
+        self.metadatas.append(job_details)
+        self.hashes.append(page_hash)
+
+        if len(self.ids) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> int:
+        if not self.ids:
+            return 0
+
+        ids, documents, metadatas, hashes = self.ids, self.documents, self.metadatas, self.hashes
+        self.ids, self.documents, self.metadatas, self.hashes = [], [], [], []
+
+        urls = [meta.get("apply_url", "") for meta in metadatas]
+        write = self.collection.upsert if self.upsert else self.collection.add
+        try:
+            embeddings = encode(documents, encoder=self.encoder)
+            if self.frontier is not None:
+                self.frontier.advance_many(urls, "embedded")
+            write(
+                ids=ids,
+                documents=documents,
+                metadatas=metadatas,
+                embeddings=embeddings
+            )
+        except Exception as e:
+            print(f"[ERROR] Batch write of {len(ids)} jobs failed: {e}")
+            self.failed += len(ids)
+            if self.frontier is not None:
+                for job_id, url in zip(ids, urls):
+                    if self.frontier.fail(url, str(e)):
+                        self.dead.append(job_id)
+            return 0
+
+        get_jobs_version().bump()
+        if self.frontier is not None:
+            self.frontier.finish(urls, "stored")
+
+        if self.crawl_state is not None:
+            self.crawl_state.record_stored([
+                (job_id, meta.get("apply_url", ""), h)
+                for job_id, meta, h in zip(ids, metadatas, hashes)
+            ])
+
+        self.written += len(ids)
+        print(f"[SUCCESS] Inserted batch of {len(ids)} jobs.")
+        return len(ids)
 
-        parsed = parse_job_html(html, url)
-        job_id = parsed["job_id"]
+    def close(self):
+        self.flush()
 
-        if job_exists(jobs_collection, job_id):
-            print(f"[INFO] Skipped (already exists): {job_id}")
-            skipped += 1
-            continue
+    def __enter__(self):
+        return self
 
-        insert_job(jobs_collection, parsed, html)
-        print(f"[SUCCESS] Inserted: {job_id}")
-        inserted += 1
+    def __exit__(self, *exc):
+        self.close()
 
+
+
+def print_summary(stats: dict):
     print("\n======== INGEST SUMMARY ========")
-    print(f"Inserted: {inserted}")
-    print(f"Skipped: {skipped}")
+    print(f"Inserted: {stats['inserted']}")
+    print(f"Skipped: {stats['skipped']}")
+    print(f"Failed: {stats['failed']}")
+    if stats.get("resumed"):
+        print(f"Resumed from an earlier run: {stats['resumed']}")
+    if stats.get("dead"):
+        print(f"Dead-lettered (see get_frontier().dead_letters()): {stats['dead']}")
+    if stats.get("duplicates"):
+        print(f"Near-duplicates collapsed: {stats['duplicates']} of {DEDUP_STATS['checked']} pages")
+    if stats.get("candidates"):
+        rate = 100 * stats["skipped"] / stats["candidates"]
+        print(f"Skip rate: {rate:.0f}% of {stats['candidates']} candidate URLs")
+    if FETCH_STATS["requests"]:
+        print(f"HTTP requests: {FETCH_STATS['requests']} "
+              f"({FETCH_STATS['not_modified']} not modified, "
+              f"{FETCH_STATS['bytes_fetched']:,} bytes fetched)")
+    if EXTRACTION_STATS["jsonld_hits"] or EXTRACTION_STATS["llm_calls"]:
+        print(f"JSON-LD extractions: {EXTRACTION_STATS['jsonld_hits']}")
+        print(f"LLM extractions: {EXTRACTION_STATS['llm_calls']}")
+    if EXTRACTION_STATS["raw_bytes"]:
+        saved = 100 * (1 - EXTRACTION_STATS["clean_bytes"] / EXTRACTION_STATS["raw_bytes"])
+        print(f"HTML sent to LLM: {EXTRACTION_STATS['clean_bytes']:,} of "
+              f"{EXTRACTION_STATS['raw_bytes']:,} bytes ({saved:.0f}% removed)")
+    embed = embedding_report()
+    if embed["encode_calls"]:
+        print(f"Embedding: model load {embed['load_seconds']:.1f}s, "
+              f"{embed['texts_encoded']} texts in {embed['encode_calls']} calls "
+              f"({embed['avg_encode_ms']:.0f} ms/call)")
+    if embed["cache_hit_rate"] is not None:
+        print(f"Embedding cache hit rate: {100 * embed['cache_hit_rate']:.0f}% "
+              f"({embed['cache_hits']} hits, {embed['cache_misses']} misses)")
+    if "elapsed" in stats:
+        print(f"Elapsed: {stats['elapsed']:.1f}s")
     print("================================\n")
 
 
+def next_frontier_items(
+    collection,
+    frontier: URLFrontier,
+    limit: int | None = FRONTIER_BATCH_LIMIT
+) -> tuple[list[dict], int]:
+    """
+    Takes the next pending work items from the frontier and drops the ones
+    already stored. Returns (items to process, number of candidates).
+    """
+    candidates = frontier.next_batch(limit)
+    urls, known = filter_new_urls(collection, [item["url"] for item in candidates])
+    print(f"[INFO] Pre-flight dedup: {len(known)} known, {len(urls)} new.")
+
+    # A URL past "discovered" that is already in Chroma was stored by a run
+    # that stopped before journalling it.
+    new = set(urls)
+    done = [item for item in candidates if item["url"] not in new]
+    frontier.finish([item["url"] for item in done if item["stage"] == "discovered"], status="known")
+    frontier.finish([item["url"] for item in done if item["stage"] != "discovered"], status="stored")
+    return [item for item in candidates if item["url"] in new], len(candidates)
+
+
+def resume_item(item: dict, blob_store: HtmlBlobStore) -> str | None:
+    """
+    HTML journalled for a work item that already got past "fetched", or
+    None if it still has to be fetched.
+    """
+    if item["stage"] == "discovered":
+        return None
+    html = blob_store.get(make_job_id(item["url"]))
+    if html is None and item["job"] is None:
+        # Lost blob before extraction: start over from the fetch.
+        item["stage"] = "discovered"
+    return html
+
+
+def fail_item(url: str, error: str, frontier: URLFrontier, dedup: NearDuplicateIndex, stats: dict):
+    stats["failed"] += 1
+    if frontier.fail(url, error):
+        stats["dead"] += 1
+        # Nothing will be stored under this job_id; later copies must not collapse
+        # into it, and copies that already did get their own chance.
+        frontier.requeue_duplicates(dedup.remove([make_job_id(url)]))
+
+
+def ingest(
+    queries: list[str] | None = None,
+    n_results: int = SEARCH_RESULTS_PER_QUERY,
+    limit: int | None = FRONTIER_BATCH_LIMIT,
+    batch_size: int = WRITE_BATCH_SIZE,
+    run_discovery: bool = True
+):
+    jobs_collection = connect_to_chromadb()
+    frontier = get_frontier()
+    crawl_state = get_crawl_state()
+
+    blob_store = HtmlBlobStore()
+    dedup = get_near_duplicate_index()
+
+    start = time.perf_counter()
+    migrate_stored_jobs(jobs_collection, frontier, dedup, blob_store)
+    if run_discovery:
+        discover(frontier, crawl_state, queries, n_results)
+
+    items, candidates = next_frontier_items(jobs_collection, frontier, limit)
+    stats = {"inserted": 0, "skipped": candidates - len(items), "failed": 0, "dead": 0,
+             "duplicates": 0, "candidates": candidates,
+             "resumed": sum(item["stage"] != "discovered" for item in items)}
+
+    # The fetch stage writes the blob, so the writer does not.
+    with JobWriter(jobs_collection, batch_size=batch_size, crawl_state=crawl_state,
+                   frontier=frontier) as writer:
+        for item in items:
+            url = item["url"]
+            print(f"\n[INFO] Processing ({item['stage']}): {url}")
+            html = resume_item(item, blob_store)
+
+            if html is None:
+                html = fetch_html(url)
+                if not html:
+                    print("[WARN] Skipping — no HTML")
+                    fail_item(url, "no HTML", frontier, dedup, stats)
+                    continue
+                if item["stage"] == "discovered" and collapse_duplicate(url, html, dedup, frontier, crawl_state):
+                    stats["duplicates"] += 1
+                    continue
+                blob_store.put(make_job_id(url), html)
+                if item["stage"] == "discovered":
+                    frontier.advance(url, "fetched")
+
+            parsed = item["job"]
+            if parsed is None:
+                try:
+                    parsed = parse_job_html(html, url)
+                except Exception as e:
+                    print(f"[ERROR] Extraction failed for {url}: {e}")
+                    fail_item(url, str(e), frontier, dedup, stats)
+                    continue
+                frontier.advance(url, "extracted", parsed)
+
+            writer.add(parsed, html)
+            print(f"[INFO] Queued for insert: {parsed['job_id']}")
+
+    stats["inserted"] = writer.written
+    stats["failed"] += writer.failed
+    stats["dead"] += len(writer.dead)
+    frontier.requeue_duplicates(dedup.remove(writer.dead))
+    stats["elapsed"] = time.perf_counter() - start
+    print_summary(stats)
+    return stats
+
+
+
+class HostLimiter:
+    """
+    Per-host politeness for concurrent fetching.
+
+    Each host gets its own semaphore (max in-flight requests) and a minimum
+    delay between consecutive requests, independent of the global limits.
+    """
+
+    def __init__(self, per_host: int = PER_HOST_CONCURRENCY, delay: float = HOST_DELAY_SECONDS):
+        self.per_host = per_host
+        self.delay = delay
+        self._semaphores = {}
+        self._locks = {}
+        self._last_request = {}
+
+    def _host(self, url: str) -> str:
+        return urlparse(url).netloc.lower()
+
+    def semaphore(self, url: str) -> asyncio.Semaphore:
+        host = self._host(url)
+        if host not in self._semaphores:
+            self._semaphores[host] = asyncio.Semaphore(self.per_host)
+        return self._semaphores[host]
+
+    async def wait_turn(self, url: str):
+        host = self._host(url)
+        lock = self._locks.setdefault(host, asyncio.Lock())
+        async with lock:
+            elapsed = time.monotonic() - self._last_request.get(host, 0.0)
+            if elapsed < self.delay:
+                await asyncio.sleep(self.delay - elapsed)
+            self._last_request[host] = time.monotonic()
+
+
+async def process_url_async(
+    item: dict,
+    fetch_sem: asyncio.Semaphore,
+    extract_sem: asyncio.Semaphore,
+    write_lock: asyncio.Lock,
+    writer: JobWriter,
+    hosts: HostLimiter,
+    frontier: URLFrontier,
+    dedup: NearDuplicateIndex,
+    crawl_state: CrawlStateStore,
+    blob_store: HtmlBlobStore,
+    stats: dict,
+    pool: CpuPool | None = None
+):
+    """
+    Runs one work item through fetch → near-duplicate check → extract →
+    insert, starting after its last completed stage.
+
+    Known URLs have already been dropped by next_frontier_items().
+
+    The blocking stages run in worker threads; the semaphores bound how many
+    URLs sit in each stage at once. With a pool, the CPU work on the page
+    runs in one of its processes instead.
+    """
+    url = item["url"]
+    html = await asyncio.to_thread(resume_item, item, blob_store)
+    fetched = html is None
+
+    if fetched:
+        # Wait for the host first, so URLs queued behind a slow host do not hold
+        # global fetch slots that other hosts could use.
+        async with hosts.semaphore(url):
+            await hosts.wait_turn(url)
+            async with fetch_sem:
+                html = await asyncio.to_thread(fetch_html, url)
+
+        if not html:
+            print(f"[WARN] Skipping — no HTML: {url}")
+            fail_item(url, "no HTML", frontier, dedup, stats)
+            return
+
+    # A journalled job needs neither parsing nor a near-duplicate check.
+    prepared = await pool.prepare(html) if pool is not None and item["job"] is None else None
+
+    if fetched:
+        if item["stage"] == "discovered" and await asyncio.to_thread(
+            collapse_duplicate, url, html, dedup, frontier, crawl_state, prepared
+        ):
+            stats["duplicates"] += 1
+            return
+        await asyncio.to_thread(blob_store.put, make_job_id(url), html)
+        if item["stage"] == "discovered":
+            frontier.advance(url, "fetched")
+
+    parsed = item["job"]
+    if parsed is None:
+        try:
+            async with extract_sem:
+                parsed = await asyncio.to_thread(
+                    parse_job_html, html, url, CLEAN_TEXT_MAX_CHARS, prepared
+                )
+        except Exception as e:
+            print(f"[ERROR] Extraction failed for {url}: {e}")
+            fail_item(url, str(e), frontier, dedup, stats)
+            return
+        frontier.advance(url, "extracted", parsed)
+
+    # The writer buffer is shared; a full buffer flushes (embeds + writes)
+    # in a worker thread while other URLs keep fetching.
+    page_hash = prepared["content_hash"] if prepared is not None else None
+    async with write_lock:
+        await asyncio.to_thread(writer.add, parsed, html, page_hash)
+
+    print(f"[INFO] Queued for insert: {parsed['job_id']}")
+
+
+async def ingest_async(
+    queries: list[str] | None = None,
+    n_results: int = SEARCH_RESULTS_PER_QUERY,
+    limit: int | None = FRONTIER_BATCH_LIMIT,
+    fetch_concurrency: int = FETCH_CONCURRENCY,
+    extract_concurrency: int = EXTRACT_CONCURRENCY,
+    per_host: int = PER_HOST_CONCURRENCY,
+    host_delay: float = HOST_DELAY_SECONDS,
+    batch_size: int = WRITE_BATCH_SIZE,
+    run_discovery: bool = True,
+    processes: int = 0,
+    encoder_mode: str = "per_worker"
+):
+    """
+    Concurrent version of ingest().
+
+    URLs are processed in parallel with bounded concurrency for fetching and
+    for LLM extraction, plus per-host politeness limits. With processes > 0,
+    the CPU-bound stages run in a CpuPool of that many processes.
+    """
+    jobs_collection = connect_to_chromadb()
+    frontier = get_frontier()
+    crawl_state = get_crawl_state()
+
+    fetch_sem = asyncio.Semaphore(fetch_concurrency)
+    extract_sem = asyncio.Semaphore(extract_concurrency)
+    write_lock = asyncio.Lock()
+    blob_store = HtmlBlobStore()
+    pool = CpuPool(processes, encoder_mode) if processes > 0 else None
+    writer = JobWriter(jobs_collection, batch_size=batch_size, crawl_state=crawl_state,
+                       frontier=frontier, encoder=pool.encode if pool is not None else None)
+    hosts = HostLimiter(per_host=per_host, delay=host_delay)
+    dedup = get_near_duplicate_index()
+
+    start = time.perf_counter()
+    await asyncio.to_thread(migrate_stored_jobs, jobs_collection, frontier, dedup, blob_store)
+    if run_discovery:
+        await asyncio.to_thread(discover, frontier, crawl_state, queries, n_results)
+
+    items, candidates = next_frontier_items(jobs_collection, frontier, limit)
+    stats = {"inserted": 0, "skipped": candidates - len(items), "failed": 0, "dead": 0,
+             "duplicates": 0, "candidates": candidates,
+             "resumed": sum(item["stage"] != "discovered" for item in items)}
+
+    # Frontier order is priority order; the fetch semaphore admits URLs in it.
+    try:
+        await asyncio.gather(*[
+            process_url_async(
+                item, fetch_sem, extract_sem, write_lock, writer, hosts,
+                frontier, dedup, crawl_state, blob_store, stats, pool
+            )
+            for item in items
+        ])
+    finally:
+        await asyncio.to_thread(writer.close)
+        if pool is not None:
+            pool.close()
+
+    stats["inserted"] = writer.written
+    stats["failed"] += writer.failed
+    stats["dead"] += len(writer.dead)
+    frontier.requeue_duplicates(dedup.remove(writer.dead))
+    stats["elapsed"] = time.perf_counter() - start
+    print_summary(stats)
+    return stats
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="JobPilot job ingestion pipeline")
+    parser.add_argument("--query", action="append", dest="queries",
+                        help="Discovery query; repeat for several (default: DISCOVERY_QUERIES).")
+    parser.add_argument("--n-results", type=int, default=SEARCH_RESULTS_PER_QUERY)
+    parser.add_argument("--limit", type=int, default=FRONTIER_BATCH_LIMIT,
+                        help="Maximum frontier URLs to fetch this run (0 = all pending).")
+    parser.add_argument("--no-discovery", action="store_true",
+                        help="Only drain URLs already in the frontier.")
+    parser.add_argument("--requeue-dead", action="store_true",
+                        help="Put dead-lettered URLs back in the queue before running.")
+    parser.add_argument("--concurrent", action="store_true",
+                        help="Use the asyncio pipeline (ingest_async).")
+    parser.add_argument("--processes", type=int, default=0,
+                        help=f"With --concurrent: CPU-bound stages in a process pool of this size "
+                             f"(0 = off, -1 = {CPU_WORKERS} cores).")
+    parser.add_argument("--encoder-mode", choices=ENCODER_MODES, default="per_worker",
+                        help="Embedding model per pool worker, or one shared encoder process.")
+    parser.add_argument("--fetch-concurrency", type=int, default=FETCH_CONCURRENCY)
+    parser.add_argument("--extract-concurrency", type=int, default=EXTRACT_CONCURRENCY)
+    parser.add_argument("--per-host", type=int, default=PER_HOST_CONCURRENCY)
+    parser.add_argument("--host-delay", type=float, default=HOST_DELAY_SECONDS)
+    parser.add_argument("--batch-size", type=int, default=WRITE_BATCH_SIZE,
+                        help="Number of jobs per Chroma write / embedding batch.")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.requeue_dead:
+        print(f"[INFO] Requeued {get_frontier().requeue_dead()} dead-lettered URLs.")
+    if args.concurrent:
+        asyncio.run(ingest_async(
+            queries=args.queries,
+            n_results=args.n_results,
+            limit=args.limit or None,
+            fetch_concurrency=args.fetch_concurrency,
+            extract_concurrency=args.extract_concurrency,
+            per_host=args.per_host,
+            host_delay=args.host_delay,
+            batch_size=args.batch_size,
+            run_discovery=not args.no_discovery,
+            processes=CPU_WORKERS if args.processes < 0 else args.processes,
+            encoder_mode=args.encoder_mode
+        ))
+    else:
+        ingest(queries=args.queries, n_results=args.n_results, limit=args.limit or None,
+               batch_size=args.batch_size, run_discovery=not args.no_discovery)
+
+
 if __name__ == "__main__":
-    ingest()
+    main()
@@ -0,0 +1,52 @@
+"""
+Persisted version number of the ChromaDB 'jobs' collection.
+
+Every write that changes the collection (JobWriter.flush, insert_job,
+recrawl.expire_jobs) bumps the version. main.py's query cache compares it
+instead of the collection's item count, which stays the same when jobs are
+upserted in place or N jobs expire while N new ones arrive.
+
+The counter lives in SQLite, so ingest, re-crawl and the agent process can
+run separately and still see each other's writes.
+"""
+
+import sqlite3
+import threading
+
+
+JOBS_VERSION_PATH = "/kaggle/working/jobpilot_jobs_version.db"
+
+
+class JobsVersion:
+    """
+    Single-row SQLite counter (see module docstring).
+    """
+
+    def __init__(self, path: str = JOBS_VERSION_PATH):
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs_version (id INTEGER PRIMARY KEY CHECK (id = 0), version INTEGER NOT NULL)"
+        )
+        self.conn.execute("INSERT OR IGNORE INTO jobs_version (id, version) VALUES (0, 0)")
+        self.conn.commit()
+
+    def current(self) -> int:
+        (version,) = self.conn.execute("SELECT version FROM jobs_version WHERE id = 0").fetchone()
+        return version
+
+    def bump(self) -> int:
+        with self._lock:
+            self.conn.execute("UPDATE jobs_version SET version = version + 1 WHERE id = 0")
+            self.conn.commit()
+        return self.current()
+
+
+_version = None
+
+
+def get_jobs_version() -> JobsVersion:
+    global _version
+    if _version is None:
+        _version = JobsVersion()
+    return _version
@@ -1,20 +1,22 @@
 import os
+import re
+import copy
 import json
-import hashlib
+import time
+from collections import OrderedDict
 from typing import List, Dict, Any
 from dotenv import load_dotenv
 import asyncio
 import requests
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, OnErrorOmit
 
-from google.genai import types
 from google.adk.agents import LlmAgent
-from google.adk.models.google_llm import Gemini
 from google.adk.sessions import DatabaseSessionService
 from google.adk.tools.agent_tool import AgentTool, ToolContext
 from google.adk.tools.function_tool import FunctionTool
 from google.adk.tools.google_search_tool import google_search
 from google.adk.runners import Runner
+from google.adk.apps import App
 from google.adk.plugins.logging_plugin import LoggingPlugin
 
 from schemas import (
@@ -22,6 +24,12 @@ from schemas import (
     PROFILE_SCHEMA,
     JOB_FILTER_OUTPUT_SCHEMA
 )
+from filters import build_chroma_filters, backfill_filter_fields
+from scoring import score_jobs, validate_filter_batch
+from profile_memo import text_hash, new_lines, profile_delta, merge_profiles, unwrap_profile
+from generation_cache import get_generation_cache, generation_key
+from jobs_version import get_jobs_version
+from metrics import metrics_plugin
 
 from kaggle_secrets import UserSecretsClient
 
@@ -30,35 +38,16 @@ api_key = user_secrets.get_secret("GOOGLE_API_KEY")
 
 os.environ["GOOGLE_API_KEY"] = api_key
 
-retry_config = types.HttpRetryOptions(
-    attempts=5,
-    exp_base=7,
-    initial_delay=1,
-    http_status_codes=[429, 500, 503, 504],
-)
-
-gemini_flash = Gemini(model="gemini-2.5-flash", retry_options=retry_config)
-gemini_lite = Gemini(model="gemini-2.5-flash-lite", retry_options=retry_config)
+# Per-call model routing with tier failover and latency budgets (see model_router.py).
+# Critical agents start on gemini-2.5-flash, standard ones on gemini-2.5-flash-lite.
+from model_router import critical_model, standard_model, record_models, TierRouter
 
 session_service = DatabaseSessionService(
     db_url="sqlite:////kaggle/working/autoapply_sessions.db"
 )
 
-from sentence_transformers import SentenceTransformer
-
-class LocalEmbeddingFunction:
-    def __init__(self):
-        self.model = SentenceTransformer("all-MiniLM-L6-v2")
-
-    def __call__(self, input):
-        if isinstance(input, str):
-            input = [input]
-        return self.model.encode(input, convert_to_numpy=True).tolist()
-
-    def name(self):
-        return "local-mini-lm-l6-v2"
-
-embedding_fn = LocalEmbeddingFunction()
+# Shared, lazily loaded embedding model (see embeddings.py).
+from embeddings import embedding_fn
 
 
 import chromadb
@@ -74,10 +63,87 @@ jobs_collection = client.get_or_create_collection(
     embedding_function=embedding_fn
 )
 
+# Jobs stored before the filter fields existed (one-time, see filters.py).
+backfill_filter_fields(jobs_collection)
+
+QUERY_CACHE_TTL_SECONDS = 15 * 60
+QUERY_CACHE_MAX_ENTRIES = 256
+
+
+class QueryResultCache:
+    """
+    TTL + LRU cache for chroma_query_tool results.
+
+    Keys are (normalised query_text, top_k, filters). Entries are tagged with the
+    collection's persisted version (jobs_version.py) at the time of the query;
+    when any writer bumps it (jobs ingested, re-embedded or deleted) the whole
+    cache is dropped.
+    """
+
+    def __init__(self, ttl: float = QUERY_CACHE_TTL_SECONDS, max_entries: int = QUERY_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.collection_version = None
+        self.stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    @staticmethod
+    def normalise(query_text: str) -> str:
+        text = re.sub(r"\s+", " ", query_text.strip().lower())
+        return text.strip(" .,;:!?\"'")
+
+    def check_version(self, version):
+        if version != self.collection_version:
+            if self.entries:
+                self.stats["invalidations"] += 1
+            self.entries.clear()
+            self.collection_version = version
+
+    def key(self, query_text: str, top_k: int, filters: Dict[str, Any] | None = None):
+        return (self.normalise(query_text), top_k, json.dumps(filters or {}, sort_keys=True))
+
+    def get(self, query_text: str, top_k: int, filters: Dict[str, Any] | None = None):
+        key = self.key(query_text, top_k, filters)
+        entry = self.entries.get(key)
+        if entry is None or time.monotonic() - entry[0] > self.ttl:
+            self.entries.pop(key, None)
+            self.stats["misses"] += 1
+            return None
+
+        self.entries.move_to_end(key)
+        self.stats["hits"] += 1
+        return copy.deepcopy(entry[1])
+
+    def put(self, query_text: str, top_k: int, result: Dict[str, Any], filters: Dict[str, Any] | None = None):
+        key = self.key(query_text, top_k, filters)
+        self.entries[key] = (time.monotonic(), copy.deepcopy(result))
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+        self.stats["invalidations"] += 1
+
+    def report(self) -> Dict[str, Any]:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "entries": len(self.entries),
+            "hit_rate": self.stats["hits"] / lookups if lookups else None,
+        }
+
+
+query_cache = QueryResultCache()
+
+
 def chroma_query_tool(
     tool_context: ToolContext,
     query_text: str,
-    top_k: int = 20
+    top_k: int = 20,
+    remote_only: bool = False,
+    employment_types: List[str] | None = None,
+    exclude_job_ids: List[str] | None = None
 ) -> Dict[str, Any]:
     """
     Performs a semantic search against the ChromaDB 'jobs' collection.
@@ -85,6 +151,12 @@ def chroma_query_tool(
     Inputs:
         query_text (str): Dense semantic query created by job_search_agent.
         top_k (int): Number of results to return from vector search.
+        remote_only (bool): Only return remote postings.
+        employment_types (list[str]): Acceptable employment types, e.g. ["full-time"].
+        exclude_job_ids (list[str]): job_ids to leave out (rejection_memory).
+
+    The filters are applied inside the vector query, so excluded jobs never
+    reach job_filter_agent. Location is scored, not filtered (see filters.py).
 
     Returns:
         {
@@ -92,7 +164,8 @@ def chroma_query_tool(
             "query_text": "<query used>",
             "top_k": <int>,
             "num_returned": <int>,
-            "error": None or <string>
+            "error": None or <string>,
+            "cache_hit": True        # only when served from query_cache
         }
     """
     if not isinstance(query_text, str) or len(query_text.strip()) == 0:
@@ -105,9 +178,25 @@ def chroma_query_tool(
         }
 
     try:
+        where = build_chroma_filters(
+            remote_only=remote_only,
+            employment_types=employment_types,
+            exclude_job_ids=exclude_job_ids
+        )
+        filters = {"where": where}
+
+        # Any insert, upsert or delete bumps the version and drops stale cached results.
+        query_cache.check_version(get_jobs_version().current())
+        cached = query_cache.get(query_text, top_k, filters)
+        if cached is not None:
+            cached["query_text"] = query_text
+            cached["cache_hit"] = True
+            return cached
+
         query_results = jobs_collection.query(
             query_texts=[query_text],
-            n_results=top_k
+            n_results=top_k,
+            where=where
         )
 
         documents = []
@@ -116,17 +205,23 @@ def chroma_query_tool(
             and "documents" in query_results
             and len(query_results["documents"]) > 0
         ):
+            distances = (query_results.get("distances") or [[]])[0]
             for idx, doc in enumerate(query_results["documents"][0]):
-                metadata = query_results["metadatas"][0][idx]
+                metadata = dict(query_results["metadatas"][0][idx])
+                # cosine space: similarity = 1 - distance (used by prescore_jobs_tool)
+                if idx < len(distances):
+                    metadata["similarity"] = round(1 - distances[idx], 4)
                 documents.append(metadata)
 
-        return {
+        result = {
             "results": documents,
             "query_text": query_text,
             "top_k": top_k,
             "num_returned": len(documents),
             "error": None
         }
+        query_cache.put(query_text, top_k, result, filters)
+        return result
 
     except Exception as e:
         return {
@@ -162,13 +257,74 @@ def rank_job_tool(tool_context: ToolContext, jobs: List[Dict[str, Any]], top_k:
 
 rank_job_tool_adk = FunctionTool(func=rank_job_tool)
 
-from instructions import instructions_json
+def prescore_jobs_tool(
+    tool_context: ToolContext,
+    jobs: List[Dict[str, Any]],
+    profile: Dict[str, Any],
+    rejection_memory: List[Any] | None = None
+) -> Dict[str, Any]:
+    """
+    Scores all candidate jobs locally in one pass (no LLM calls).
+
+    Each returned job is the input job plus "score" (0-100), "pass",
+    "rationale" and "borderline". Only borderline jobs need job_filter_agent.
+
+    Returns:
+        {
+            "jobs": [ job + score + pass + rationale + borderline ],
+            "num_scored": <int>,
+            "num_pass": <int>,
+            "num_borderline": <int>,
+            "error": None or <string>
+        }
+    """
+    if not isinstance(jobs, list):
+        return {
+            "jobs": [],
+            "num_scored": 0,
+            "num_pass": 0,
+            "num_borderline": 0,
+            "error": "Invalid input: jobs must be a list."
+        }
+
+    try:
+        scored = score_jobs(jobs, profile or {}, rejection_memory or [])
+    except Exception as e:
+        return {
+            "jobs": [],
+            "num_scored": 0,
+            "num_pass": 0,
+            "num_borderline": 0,
+            "error": f"PRESCORE_EXCEPTION: {str(e)}"
+        }
+
+    out = []
+    for job, result in zip(jobs, scored):
+        out.append({
+            **job,
+            "score": result["score"],
+            "pass": result["pass"],
+            "rationale": result["rationale"],
+            "borderline": result["borderline"],
+        })
+
+    return {
+        "jobs": out,
+        "num_scored": len(out),
+        "num_pass": sum(1 for j in out if j["pass"]),
+        "num_borderline": sum(1 for j in out if j["borderline"]),
+        "error": None
+    }
+
+prescore_jobs_tool_adk = FunctionTool(func=prescore_jobs_tool)
+
+from prompts import PROMPTS, context_cache_config, prompt_token_report
 
 orchestrator_agent = LlmAgent(
-    model=gemini_flash,
+    model=critical_model,
     name="orchestrator_agent",
     description="Top-level controller for the JobPilot multi-agent system.",
-    instruction=instructions_json['orchestrator_agent']
+    static_instruction=PROMPTS['orchestrator_agent']
 )
 
 class ProfileBuilderInput(BaseModel):
@@ -176,18 +332,45 @@ class ProfileBuilderInput(BaseModel):
     existing_profile: Dict[str, Any] | None = None
 
 profile_builder_agent = LlmAgent(
-    model=gemini_flash,
+    model=critical_model,
     name="profile_builder_agent",
     description="Parses the user's free-form background into PROFILE_SCHEMA.",
     input_schema=ProfileBuilderInput,
-    static_instruction=instructions_json['profile_builder_agent']
+    static_instruction=PROMPTS['profile_builder_agent']
 )
 
 job_filter_agent = LlmAgent(
-    model=gemini_lite,
+    model=standard_model,
     name="job_filter_agent",
     description="Evaluates user–job fit and produces a binary pass/fail and numeric score.",
-    static_instruction=instructions_json['job_filter_agent']
+    static_instruction=PROMPTS['job_filter_agent']
+)
+
+class JobFilterBatchInput(BaseModel):
+    jobs: List[Dict[str, Any]]
+    profile: Dict[str, Any]
+    rejection_memory: List[Any] = []
+
+# AgentTool validates the whole response against output_schema, so a single
+# malformed entry would fail the batch. Entries are kept loose here (nullable
+# pass/score, float scores) and invalid ones are omitted; validate_filter_batch
+# does the real checks per job, and omitted jobs fall back to job_filter_agent.
+class JobFilterResult(BaseModel):
+    job_id: str
+    pass_: bool | None = Field(alias="pass")
+    score: float | None
+    rationale: str | None = ""
+
+class JobFilterBatchOutput(BaseModel):
+    results: List[OnErrorOmit[JobFilterResult]]
+
+job_filter_batch_agent = LlmAgent(
+    model=standard_model,
+    name="job_filter_batch_agent",
+    description="Scores a batch of jobs against one profile; one pass/score/rationale per job_id.",
+    input_schema=JobFilterBatchInput,
+    output_schema=JobFilterBatchOutput,
+    static_instruction=PROMPTS['job_filter_batch_agent']
 )
 
 class JobSearchAgentInput(BaseModel):
@@ -195,83 +378,500 @@ class JobSearchAgentInput(BaseModel):
     rejection_memory: List[Any]
 
 job_search_agent = LlmAgent(
-    model=gemini_flash,
+    model=critical_model,
     name="job_search_agent",
     description="Searches for jobs in the existing database.",
     input_schema=JobSearchAgentInput,
-    instruction=instructions_json['job_search_agent']
+    static_instruction=PROMPTS['job_search_agent']
 )
 
 job_summarizer_agent = LlmAgent(
-    model=gemini_lite,
+    model=standard_model,
     name="job_summarizer_agent",
     description="Generates clear, concise summaries of job postings.",
-    static_instruction=instructions_json['job_summarizer_agent']
+    static_instruction=PROMPTS['job_summarizer_agent']
 )
 
 resume_generator_agent = LlmAgent(
-    model=gemini_flash,
+    model=critical_model,
     name="resume_generator_agent",
     description="Generates a fully tailored resume for a specific job.",
-    static_instruction=instructions_json['resume_generator_agent']
+    static_instruction=PROMPTS['resume_generator_agent']
 )
 
 cover_letter_agent = LlmAgent(
-    model=gemini_flash,
+    model=critical_model,
     name="cover_letter_generator_agent",
     description="Generates a tailored cover letter for a job.",
-    instruction=instructions_json['cover_letter_generator_agent']
+    static_instruction=PROMPTS['cover_letter_generator_agent']
 )
 
 application_builder_agent = LlmAgent(
-    model=gemini_flash,
+    model=critical_model,
     name="application_builder_agent",
     description="Agent 2 in JobPilot. Coordinates resume and cover letter generation.",
-    instruction=instructions_json['application_builder_agent']
+    static_instruction=PROMPTS['application_builder_agent']
 )
 
+JOB_FILTER_BATCH_SIZE = 10
+
+job_filter_batch_agent_adk = AgentTool(agent=job_filter_batch_agent)
+
+
+async def batch_filter_jobs_tool(
+    tool_context: ToolContext,
+    jobs: List[Dict[str, Any]],
+    profile: Dict[str, Any],
+    rejection_memory: List[Any] | None = None,
+    batch_size: int = JOB_FILTER_BATCH_SIZE
+) -> Dict[str, Any]:
+    """
+    Scores many jobs with job_filter_batch_agent, batch_size jobs per prompt.
+
+    The profile and rejection_memory are sent once per batch instead of once
+    per job. Batches run concurrently.
+
+    Returns:
+        {
+            "jobs": [ job + score + pass + rationale ],   # validated results only
+            "missing_job_ids": [ job_ids with no valid result ],
+            "num_batches": <int>,
+            "error": None or <string>
+        }
+    """
+    if not isinstance(jobs, list):
+        return {"jobs": [], "missing_job_ids": [], "num_batches": 0,
+                "error": "Invalid input: jobs must be a list."}
+
+    batch_size = max(1, int(batch_size or JOB_FILTER_BATCH_SIZE))
+    batches = [jobs[i:i + batch_size] for i in range(0, len(jobs), batch_size)]
+
+    async def run_batch(batch):
+        try:
+            output = await job_filter_batch_agent_adk.run_async(
+                args={
+                    "jobs": batch,
+                    "profile": profile,
+                    "rejection_memory": rejection_memory or [],
+                },
+                tool_context=tool_context
+            )
+        except Exception as e:
+            print(f"[WARN] job_filter_batch_agent failed on {len(batch)} jobs: {e}")
+            return {}
+        return validate_filter_batch(batch, output)
+
+    results = {}
+    for batch_results in await asyncio.gather(*[run_batch(b) for b in batches]):
+        results.update(batch_results)
+
+    scored = [{**job, **results[job.get("job_id")]} for job in jobs if job.get("job_id") in results]
+    missing = [job.get("job_id") for job in jobs if job.get("job_id") not in results]
+
+    return {
+        "jobs": scored,
+        "missing_job_ids": missing,
+        "num_batches": len(batches),
+        "error": None
+    }
+
+batch_filter_jobs_tool_adk = FunctionTool(func=batch_filter_jobs_tool)
+
 # === Attach Tools ===
 profile_builder_agent_adk = AgentTool(agent=profile_builder_agent)
 job_filter_agent_adk = AgentTool(agent=job_filter_agent)
 resume_generator_agent_adk = AgentTool(agent=resume_generator_agent)
 cover_letter_agent_adk = AgentTool(agent=cover_letter_agent)
+job_summarizer_agent_adk = AgentTool(agent=job_summarizer_agent)
+
+# === Parallel fan-out ===
+FAN_OUT_CONCURRENCY = 4
+FAN_OUT_TIMEOUT_SECONDS = 90
+
+# Sub-agents that fan_out_agent_tool may call, by agent name.
+FAN_OUT_AGENTS = {
+    "job_summarizer_agent": job_summarizer_agent_adk,
+    "resume_generator_agent": resume_generator_agent_adk,
+    "cover_letter_generator_agent": cover_letter_agent_adk,
+}
+
+
+def parse_agent_output(output: Any) -> Any:
+    """
+    Sub-agents without an output_schema return text. Decode it as JSON when
+    possible (tolerating ``` fences); otherwise return {"text": output}.
+    """
+    if not isinstance(output, str):
+        return output
+    text = output.strip()
+    if text.startswith("```"):
+        text = re.sub(r"^```[a-zA-Z]*\s*|\s*```$", "", text)
+    try:
+        return json.loads(text)
+    except ValueError:
+        return {"text": output}
+
 
+async def call_agent(
+    agent_tool: AgentTool,
+    payload: Dict[str, Any],
+    tool_context: ToolContext,
+    timeout: float = FAN_OUT_TIMEOUT_SECONDS
+) -> Dict[str, Any]:
+    """
+    Runs one sub-agent call with a timeout. Never raises; failures are
+    reported in the returned dict.
+    """
+    agent = agent_tool.agent
+    if isinstance(agent, LlmAgent) and agent.input_schema:
+        args = payload
+    else:
+        args = {"request": json.dumps(payload)}
+
+    start = time.perf_counter()
+    try:
+        output = await asyncio.wait_for(
+            agent_tool.run_async(args=args, tool_context=tool_context),
+            timeout=timeout
+        )
+        return {"ok": True, "output": parse_agent_output(output), "error": None,
+                "seconds": round(time.perf_counter() - start, 2)}
+    except asyncio.TimeoutError:
+        error = f"TIMEOUT after {timeout}s"
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    return {"ok": False, "output": None, "error": error,
+            "seconds": round(time.perf_counter() - start, 2)}
+
+
+async def fan_out_agent_tool(
+    tool_context: ToolContext,
+    agent_name: str,
+    inputs: List[Dict[str, Any]],
+    max_concurrency: int = FAN_OUT_CONCURRENCY,
+    timeout_seconds: float = FAN_OUT_TIMEOUT_SECONDS
+) -> Dict[str, Any]:
+    """
+    Calls one sub-agent for many independent inputs concurrently.
+
+    Inputs:
+        agent_name (str): "job_summarizer_agent", "resume_generator_agent"
+            or "cover_letter_generator_agent".
+        inputs (list[dict]): one input dict per call, exactly as the
+            sub-agent would receive it directly.
+        max_concurrency (int): maximum calls in flight.
+        timeout_seconds (float): per-call timeout.
+
+    Returns:
+        {
+            "agent_name": "<name>",
+            "results": [ {"index", "ok", "output", "error", "seconds"} ],  # same order as inputs
+            "num_ok": <int>,
+            "num_failed": <int>,
+            "elapsed_seconds": <float>,
+            "error": None or <string>
+        }
+    """
+    agent_tool = FAN_OUT_AGENTS.get(agent_name)
+    if agent_tool is None or not isinstance(inputs, list):
+        return {
+            "agent_name": agent_name,
+            "results": [],
+            "num_ok": 0,
+            "num_failed": 0,
+            "elapsed_seconds": 0.0,
+            "error": f"Invalid input: agent_name must be one of {sorted(FAN_OUT_AGENTS)} and inputs a list."
+        }
+
+    semaphore = asyncio.Semaphore(max(1, int(max_concurrency or FAN_OUT_CONCURRENCY)))
+
+    async def run(index, payload):
+        async with semaphore:
+            result = await call_agent(agent_tool, payload, tool_context, timeout_seconds)
+        return {"index": index, **result}
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*[run(i, p) for i, p in enumerate(inputs)])
+    num_ok = sum(1 for r in results if r["ok"])
+
+    return {
+        "agent_name": agent_name,
+        "results": list(results),
+        "num_ok": num_ok,
+        "num_failed": len(results) - num_ok,
+        "elapsed_seconds": round(time.perf_counter() - start, 2),
+        "error": None
+    }
+
+fan_out_agent_tool_adk = FunctionTool(func=fan_out_agent_tool)
+
+# === Application packages ===
+APPLICATION_CONCURRENCY = 6
+
+# Called as listener(job_id, kind, document) the moment a resume or cover
+# letter is ready, before the rest of the package finishes. Empty by default;
+# callers register their own with add_document_listener.
+DOCUMENT_LISTENERS = []
+
+
+def add_document_listener(listener):
+    DOCUMENT_LISTENERS.append(listener)
+
+
+def remove_document_listener(listener):
+    if listener in DOCUMENT_LISTENERS:
+        DOCUMENT_LISTENERS.remove(listener)
+
+
+def agent_fingerprint(agent: LlmAgent) -> tuple[str, str]:
+    """
+    (instruction text, model name) of an agent — the parts of a generation
+    cache key that change when the prompt or the model changes. For a
+    TierRouter this is the tier that answers without failover.
+    """
+    instruction = f"{agent.static_instruction or ''}\n{agent.instruction or ''}"
+    if isinstance(agent.model, TierRouter):
+        model = agent.model.primary_model
+    else:
+        model = agent.model if isinstance(agent.model, str) else getattr(agent.model, "model", "")
+    return instruction, model
+
+
+async def application_package_tool(
+    tool_context: ToolContext,
+    selected_jobs: List[Dict[str, Any]],
+    user_profile: Dict[str, Any],
+    max_concurrency: int = APPLICATION_CONCURRENCY,
+    timeout_seconds: float = FAN_OUT_TIMEOUT_SECONDS,
+    bypass_cache: bool = False
+) -> Dict[str, Any]:
+    """
+    Generates the resume and the cover letter for every selected job, all
+    concurrently. Each document is handed to DOCUMENT_LISTENERS as soon as
+    it is ready.
+
+    Documents are looked up in the generation cache first (keyed by profile,
+    job content, instruction version and model); set bypass_cache=True to
+    force regeneration.
+
+    Returns:
+        {
+            "applications": [ {"job_id", "resume_text", "cover_letter_text"} ],  # same order as selected_jobs
+            "errors": [ {"job_id", "kind", "error"} ],
+            "ready_order": [ {"job_id", "kind", "seconds"} ],
+            "num_cached": <int>,
+            "elapsed_seconds": <float>
+        }
+    """
+    if not isinstance(selected_jobs, list):
+        return {"applications": [], "errors": [], "ready_order": [], "elapsed_seconds": 0.0,
+                "error": "Invalid input: selected_jobs must be a list."}
+
+    generators = {
+        "resume": (resume_generator_agent_adk, "resume_text"),
+        "cover_letter": (cover_letter_agent_adk, "cover_letter_text"),
+    }
+    semaphore = asyncio.Semaphore(max(1, int(max_concurrency or APPLICATION_CONCURRENCY)))
+    cache = None if bypass_cache else get_generation_cache()
+
+    async def generate(job, kind):
+        agent_tool, field = generators[kind]
+        job_id = job.get("job_id", "")
+
+        key, model = None, None
+        if cache is not None:
+            instruction, model = agent_fingerprint(agent_tool.agent)
+            key = generation_key(kind, user_profile, job, instruction, model)
+            cached = cache.get(key)
+            if cached is not None:
+                return job_id, kind, {"ok": True, "output": cached, "error": None,
+                                      "seconds": 0.0, "cached": True}
+
+        async with semaphore:
+            with record_models() as answered:
+                result = await call_agent(
+                    agent_tool,
+                    {"user_profile": user_profile, "job": job},
+                    tool_context,
+                    timeout_seconds
+                )
+
+        output = result["output"]
+        # Output from a failover tier is not cached under the primary model's key.
+        from_key_model = set(answered) == {model}
+        if key is not None and from_key_model and result["ok"] and isinstance(output, dict) and output.get(field):
+            cache.put(key, kind, job_id, output)
+        return job_id, kind, result
+
+    start = time.perf_counter()
+    tasks = [
+        asyncio.ensure_future(generate(job, kind))
+        for job in selected_jobs
+        for kind in generators
+    ]
+
+    documents = {}
+    errors = []
+    ready_order = []
+    num_cached = 0
+    for finished in asyncio.as_completed(tasks):
+        job_id, kind, result = await finished
+        num_cached += bool(result.get("cached"))
+        if not result["ok"] or not isinstance(result["output"], dict):
+            errors.append({"job_id": job_id, "kind": kind, "error": result["error"] or "Invalid output."})
+            continue
+
+        documents[(job_id, kind)] = result["output"]
+        ready_order.append({"job_id": job_id, "kind": kind,
+                            "seconds": round(time.perf_counter() - start, 2)})
+        for listener in DOCUMENT_LISTENERS:
+            try:
+                listener(job_id, kind, result["output"])
+            except Exception as e:
+                print(f"[WARN] Document listener failed: {e}")
+
+    applications = []
+    for job in selected_jobs:
+        job_id = job.get("job_id", "")
+        application = {"job_id": job_id}
+        for kind, (_, field) in generators.items():
+            application[field] = documents.get((job_id, kind), {}).get(field, "")
+        applications.append(application)
+
+    return {
+        "applications": applications,
+        "errors": errors,
+        "ready_order": ready_order,
+        "num_cached": num_cached,
+        "elapsed_seconds": round(time.perf_counter() - start, 2)
+    }
+
+application_package_tool_adk = FunctionTool(func=application_package_tool)
+
+# === Profile memoisation ===
+async def profile_tool(tool_context: ToolContext, user_text: str) -> Dict[str, Any]:
+    """
+    Returns the user's profile, calling profile_builder_agent only when needed.
+
+    - No stored profile → full build.
+    - Text already seen, or no new profile content in it (job feedback,
+      chat, lines the profile was built from; see profile_memo) → stored
+      profile, no LLM call.
+    - Otherwise only the new profile lines are sent to profile_builder_agent
+      with the stored profile, and its updated profile replaces the stored
+      fields it fills in (see merge_profiles).
+
+    The profile is kept in session state under "user_profile".
+
+    Returns:
+        {
+            "profile": <PROFILE_SCHEMA>,
+            "source": "cache" | "update" | "build",
+            "error": None or <string>
+        }
+    """
+    state = tool_context.state
+    stored = state.get("user_profile")
+    seen = list(state.get("user_profile_text_hashes", []))
+    source_text = state.get("user_profile_source_text", "")
+
+    h = text_hash(user_text or "")
+    delta = profile_delta(new_lines(source_text, user_text or ""))
+
+    if stored and (h in seen or not delta):
+        return {"profile": stored, "source": "cache", "error": None}
+
+    if stored:
+        # Mark the stored profile stale until the update has been merged.
+        state["user_profile"] = {**stored, "update_required": True}
+        payload = {
+            "user_text": f"Here is new info to update my profile:\n{delta}",
+            "existing_profile": stored,
+        }
+    else:
+        delta = user_text
+        payload = {"user_text": user_text, "existing_profile": None}
+
+    result = await call_agent(profile_builder_agent_adk, payload, tool_context)
+    built = unwrap_profile(result["output"]) if result["ok"] else None
+    if built is None:
+        return {"profile": stored, "source": "cache" if stored else "build",
+                "error": result["error"] or "profile_builder_agent returned no profile."}
+
+    profile = merge_profiles(stored, built) if stored else built
+    profile["update_required"] = False
+    profile["last_update"] = int(time.time())
+
+    state["user_profile"] = profile
+    state["user_profile_text_hashes"] = (seen + [h])[-50:]
+    state["user_profile_source_text"] = f"{source_text}\n{delta}".strip()
+
+    return {"profile": profile, "source": "update" if stored else "build", "error": None}
+
+profile_tool_adk = FunctionTool(func=profile_tool)
+
+# profile_builder_agent is only reached through profile_tool.
 orchestrator_agent.tools = [
-    profile_builder_agent_adk,
+    profile_tool_adk,
     AgentTool(agent=job_search_agent),
-    AgentTool(agent=job_summarizer_agent),
+    job_summarizer_agent_adk,
+    fan_out_agent_tool_adk,
     AgentTool(agent=application_builder_agent),
 ]
 
 job_search_agent.tools = [
     chroma_query_tool_adk,
+    prescore_jobs_tool_adk,
+    batch_filter_jobs_tool_adk,
     job_filter_agent_adk,
     rank_job_tool_adk,
 ]
 
 job_filter_agent.tools = []
+job_filter_batch_agent.tools = []
 job_summarizer_agent.tools = []
 resume_generator_agent.tools = []
 cover_letter_agent.tools = []
 
 application_builder_agent.tools = [
+    application_package_tool_adk,
+    fan_out_agent_tool_adk,
     resume_generator_agent_adk,
     cover_letter_agent_adk,
 ]
 
+LLM_AGENTS = [
+    orchestrator_agent,
+    profile_builder_agent,
+    job_search_agent,
+    job_filter_agent,
+    job_filter_batch_agent,
+    job_summarizer_agent,
+    application_builder_agent,
+    resume_generator_agent,
+    cover_letter_agent,
+]
+
 APP_NAME = "JobPilot_AgentSystem"
 
+app = App(
+    name=APP_NAME,
+    root_agent=orchestrator_agent,
+    plugins=[LoggingPlugin(), metrics_plugin],
+    context_cache_config=context_cache_config,
+)
+
 runner = Runner(
-    agent=orchestrator_agent,
-    app_name=APP_NAME,
+    app=app,
     session_service=session_service,
-    plugins=[LoggingPlugin()],
 )
 
 load_dotenv()
 api_key = os.environ.get("GOOGLE_API_KEY")
 
 async def main():
+    prompt_token_report(LLM_AGENTS)
+
     test_input = """
 Hi, my name is Ofer Harpaz Vaizman.
 
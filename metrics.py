@@ -0,0 +1,319 @@
+"""
+Token and latency metrics for JobPilot.
+
+MetricsPlugin is an ADK plugin that records, per agent and per tool:
+
+    calls            number of runs / tool calls
+    errors           tool or model errors
+    seconds          total wall time (max_seconds: slowest single call)
+    model_calls      Gemini calls made by the agent, and their wall time
+    prompt_tokens    input tokens (cached_tokens: served from context cache)
+    response_tokens  output tokens, including thinking tokens
+    retries          HTTP retries (model_router.TIER_RETRY_CONFIG)
+    cache_hits       tool results served from a JobPilot cache
+
+AgentTool passes the root runner's plugins on to its sub-runners, so calls
+made by sub-agents are counted too, under the root session's id.
+
+Retries happen inside the google-genai client and never reach ADK. They are
+counted from the client's "Retrying ..." log records and attributed to the
+agent whose model call was in flight.
+
+Exports:
+    metrics_plugin.snapshot(session_id)     dict (json-serialisable)
+    metrics_plugin.to_json(session_id)      JSON text
+    metrics_plugin.to_prometheus()          Prometheus text exposition format
+    metrics_plugin.summary_table(session_id)
+"""
+
+import json
+import time
+import logging
+import contextvars
+from collections import defaultdict
+from typing import Any, Optional
+
+from google.adk.plugins.base_plugin import BasePlugin
+
+from model_router import router_report
+
+
+METRICS_PATH = "/kaggle/working/jobpilot_metrics.json"
+
+# Logger the google-genai client reports its retries on.
+RETRY_LOGGER_NAME = "google_genai._api_client"
+
+METRIC_FIELDS = [
+    "calls", "errors", "seconds", "max_seconds",
+    "model_calls", "model_seconds",
+    "prompt_tokens", "cached_tokens", "response_tokens",
+    "retries", "cache_hits",
+]
+
+# Fields that can be summed across agents and tools. Wall time cannot: a
+# sub-agent's time is already part of its caller's time.
+TOTAL_FIELDS = [
+    "errors", "model_calls", "model_seconds",
+    "prompt_tokens", "cached_tokens", "response_tokens",
+    "retries", "cache_hits",
+]
+
+# Root session of the current run, and the agent whose model call is in flight.
+_session_id = contextvars.ContextVar("jobpilot_metrics_session", default=None)
+_model_agent = contextvars.ContextVar("jobpilot_metrics_agent", default=None)
+
+
+def _new_stats() -> dict:
+    return {field: 0 for field in METRIC_FIELDS}
+
+
+def cache_hits_in(result: Any) -> int:
+    """
+    Cache hits reported in a JobPilot tool result:
+    profile_tool → source == "cache", application_package_tool → num_cached,
+    chroma_query_tool → cache_hit.
+    """
+    if not isinstance(result, dict):
+        return 0
+    hits = int(result.get("num_cached") or 0)
+    if result.get("source") == "cache" or result.get("cache_hit"):
+        hits += 1
+    return hits
+
+
+class _RetryCounter(logging.Handler):
+    def __init__(self, plugin: "MetricsPlugin"):
+        super().__init__(level=logging.INFO)
+        self.plugin = plugin
+
+    def emit(self, record):
+        if record.getMessage().startswith("Retrying"):
+            self.plugin.record("agent", _model_agent.get() or "unknown", retries=1)
+
+
+class MetricsPlugin(BasePlugin):
+    """
+    Aggregates per-agent and per-tool metrics, keyed by (session, kind, name).
+    """
+
+    def __init__(self, name: str = "jobpilot_metrics", print_summary: bool = True):
+        super().__init__(name)
+        self.print_summary = print_summary
+        self.stats = defaultdict(_new_stats)
+        self._starts = {}
+        self._root_runs = {}
+
+        retry_logger = logging.getLogger(RETRY_LOGGER_NAME)
+        retry_logger.addHandler(_RetryCounter(self))
+        if retry_logger.level == logging.NOTSET or retry_logger.level > logging.INFO:
+            retry_logger.setLevel(logging.INFO)
+
+    # -----------------------------------------------------------------
+    # Recording
+    # -----------------------------------------------------------------
+
+    def record(self, kind: str, name: str, seconds: float | None = None, **counts):
+        stats = self.stats[(_session_id.get() or "unknown", kind, name)]
+        if seconds is not None:
+            stats["seconds"] += seconds
+            stats["max_seconds"] = max(stats["max_seconds"], seconds)
+        for field, value in counts.items():
+            stats[field] += value
+
+    def _start(self, key):
+        self._starts[key] = time.perf_counter()
+
+    def _elapsed(self, key) -> float | None:
+        start = self._starts.pop(key, None)
+        return None if start is None else time.perf_counter() - start
+
+    # -----------------------------------------------------------------
+    # Runner callbacks
+    # -----------------------------------------------------------------
+
+    async def before_run_callback(self, *, invocation_context):
+        # Sub-runners started by AgentTool inherit the root session id.
+        if _session_id.get() is None:
+            self._root_runs[invocation_context.invocation_id] = _session_id.set(
+                invocation_context.session.id
+            )
+        return None
+
+    async def after_run_callback(self, *, invocation_context):
+        token = self._root_runs.pop(invocation_context.invocation_id, None)
+        if token is None:
+            return None
+        session_id = _session_id.get()
+        try:
+            _session_id.reset(token)
+        except ValueError:
+            _session_id.set(None)
+        if self.print_summary:
+            print(self.summary_table(session_id))
+        return None
+
+    # -----------------------------------------------------------------
+    # Agent callbacks
+    # -----------------------------------------------------------------
+
+    async def before_agent_callback(self, *, agent, callback_context):
+        self._start(("agent", callback_context.invocation_id, agent.name))
+        return None
+
+    async def after_agent_callback(self, *, agent, callback_context):
+        seconds = self._elapsed(("agent", callback_context.invocation_id, agent.name))
+        self.record("agent", agent.name, seconds, calls=1)
+        return None
+
+    # -----------------------------------------------------------------
+    # Model callbacks
+    # -----------------------------------------------------------------
+
+    async def before_model_callback(self, *, callback_context, llm_request):
+        _model_agent.set(callback_context.agent_name)
+        self._start(("model", callback_context.invocation_id, callback_context.agent_name))
+        return None
+
+    async def after_model_callback(self, *, callback_context, llm_response):
+        if llm_response.partial:
+            return None
+        seconds = self._elapsed(("model", callback_context.invocation_id, callback_context.agent_name))
+        usage = llm_response.usage_metadata
+        self.record(
+            "agent",
+            callback_context.agent_name,
+            model_calls=1,
+            model_seconds=seconds or 0.0,
+            prompt_tokens=(usage.prompt_token_count or 0) if usage else 0,
+            cached_tokens=(usage.cached_content_token_count or 0) if usage else 0,
+            response_tokens=((usage.candidates_token_count or 0)
+                             + (usage.thoughts_token_count or 0)) if usage else 0,
+        )
+        return None
+
+    async def on_model_error_callback(self, *, callback_context, llm_request, error):
+        seconds = self._elapsed(("model", callback_context.invocation_id, callback_context.agent_name))
+        self.record("agent", callback_context.agent_name, model_calls=1,
+                    model_seconds=seconds or 0.0, errors=1)
+        return None
+
+    # -----------------------------------------------------------------
+    # Tool callbacks
+    # -----------------------------------------------------------------
+
+    def _tool_key(self, tool, tool_context):
+        return ("tool", tool_context.invocation_id, tool_context.function_call_id or id(tool_context), tool.name)
+
+    async def before_tool_callback(self, *, tool, tool_args, tool_context):
+        self._start(self._tool_key(tool, tool_context))
+        return None
+
+    async def after_tool_callback(self, *, tool, tool_args, tool_context, result):
+        seconds = self._elapsed(self._tool_key(tool, tool_context))
+        self.record("tool", tool.name, seconds, calls=1, cache_hits=cache_hits_in(result))
+        return None
+
+    async def on_tool_error_callback(self, *, tool, tool_args, tool_context, error):
+        seconds = self._elapsed(self._tool_key(tool, tool_context))
+        self.record("tool", tool.name, seconds, calls=1, errors=1)
+        return None
+
+    # -----------------------------------------------------------------
+    # Export
+    # -----------------------------------------------------------------
+
+    def snapshot(self, session_id: Optional[str] = None) -> dict:
+        """
+        {"agents": {name: stats}, "tools": {name: stats}, "totals": {...}},
+        for one session or summed over all sessions.
+        """
+        out = {"session_id": session_id, "generated_at": time.time(),
+               "agents": {}, "tools": {}, "totals": {}}
+
+        for (sid, kind, name), stats in self.stats.items():
+            if session_id is not None and sid != session_id:
+                continue
+            target = out["agents" if kind == "agent" else "tools"].setdefault(name, _new_stats())
+            for field in METRIC_FIELDS:
+                if field == "max_seconds":
+                    target[field] = max(target[field], stats[field])
+                else:
+                    target[field] += stats[field]
+
+        totals = {field: 0 for field in TOTAL_FIELDS}
+        for group in ("agents", "tools"):
+            for stats in out[group].values():
+                for field in TOTAL_FIELDS:
+                    totals[field] += stats[field]
+                for field in ("seconds", "max_seconds", "model_seconds"):
+                    stats[field] = round(stats[field], 3)
+        totals["model_seconds"] = round(totals["model_seconds"], 3)
+        out["totals"] = totals
+        # Tier failovers are process-wide, not per session.
+        out["router"] = router_report()
+        return out
+
+    def to_json(self, session_id: Optional[str] = None) -> str:
+        return json.dumps(self.snapshot(session_id), indent=2)
+
+    def write_snapshot(self, path: str = METRICS_PATH, session_id: Optional[str] = None):
+        with open(path, "w") as f:
+            f.write(self.to_json(session_id))
+        print(f"[INFO] Metrics written to {path}")
+
+    def to_prometheus(self) -> str:
+        """
+        Prometheus text exposition of the all-session totals, one counter per
+        field, labelled by agent or tool name.
+        """
+        snap = self.snapshot()
+        lines = []
+        for group, label in (("agents", "agent"), ("tools", "tool")):
+            for field in METRIC_FIELDS:
+                metric = f"jobpilot_{label}_{field}" + ("" if field == "max_seconds" else "_total")
+                kind = "gauge" if field == "max_seconds" else "counter"
+                lines.append(f"# TYPE {metric} {kind}")
+                for name, stats in sorted(snap[group].items()):
+                    lines.append(f'{metric}{{{label}="{name}"}} {stats[field]}')
+
+        router = snap["router"]
+        for field in ("calls", "failovers", "timeouts", "rate_limited", "server_errors", "exhausted"):
+            lines.append(f"# TYPE jobpilot_router_{field}_total counter")
+            lines.append(f"jobpilot_router_{field}_total {router[field]}")
+        lines.append("# TYPE jobpilot_router_model_calls_total counter")
+        for model, count in sorted(router["by_model"].items()):
+            lines.append(f'jobpilot_router_model_calls_total{{model="{model}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+    def summary_table(self, session_id: Optional[str] = None) -> str:
+        snap = self.snapshot(session_id)
+        header = (f"  {'kind':<5} {'name':<32} {'calls':>5} {'err':>4} {'secs':>8} {'max':>7} "
+                  f"{'llm':>4} {'in_tok':>8} {'cached':>7} {'out_tok':>8} {'retry':>5} {'hits':>5}")
+        lines = [f"\n[INFO] Metrics for session {session_id or 'ALL'}", header]
+        for group, kind in (("agents", "agent"), ("tools", "tool")):
+            for name, s in sorted(snap[group].items(), key=lambda kv: -kv[1]["seconds"]):
+                lines.append(
+                    f"  {kind:<5} {name[:32]:<32} {s['calls']:>5} {s['errors']:>4} {s['seconds']:>8.2f} "
+                    f"{s['max_seconds']:>7.2f} {s['model_calls']:>4} {s['prompt_tokens']:>8} "
+                    f"{s['cached_tokens']:>7} {s['response_tokens']:>8} {s['retries']:>5} {s['cache_hits']:>5}"
+                )
+        t = snap["totals"]
+        lines.append(
+            f"  {'':<5} {'TOTAL':<32} {'':>5} {t['errors']:>4} {'':>8} {'':>7} {t['model_calls']:>4} "
+            f"{t['prompt_tokens']:>8} {t['cached_tokens']:>7} {t['response_tokens']:>8} "
+            f"{t['retries']:>5} {t['cache_hits']:>5}"
+        )
+        r = snap["router"]
+        lines.append(
+            f"  Model router: {r['calls']} calls, {r['failovers']} failovers "
+            f"({r['rate_limited']} rate-limited, {r['server_errors']} 5xx, {r['timeouts']} timeouts), "
+            f"{r['exhausted']} exhausted; by model {r['by_model']}"
+        )
+        return "\n".join(lines)
+
+    def reset(self):
+        self.stats.clear()
+        self._starts.clear()
+
+
+metrics_plugin = MetricsPlugin()
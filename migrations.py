@@ -0,0 +1,62 @@
+"""
+Record of one-time data migrations over the ChromaDB 'jobs' collection.
+
+Chroma cannot select records by a missing metadata key, so a migration that
+brings old jobs up to date has to scan the whole collection. Once a scan
+finishes, its name is recorded here and later runs skip it. An interrupted
+scan is not recorded and runs again in full.
+
+Migrations:
+
+    filter_fields   is_remote / employment_type_key (filters.py)
+    stored_jobs     legacy job_ids and near-duplicate index (ingest_jobs.py)
+"""
+
+import time
+import sqlite3
+import threading
+
+
+MIGRATIONS_PATH = "/kaggle/working/jobpilot_migrations.db"
+
+
+class MigrationLog:
+    """
+    SQLite table of finished migrations (see module docstring).
+    """
+
+    def __init__(self, path: str = MIGRATIONS_PATH):
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS migrations (name TEXT PRIMARY KEY, finished_at REAL NOT NULL)"
+        )
+        self.conn.commit()
+
+    def done(self, name: str) -> bool:
+        return self.conn.execute("SELECT 1 FROM migrations WHERE name = ?", (name,)).fetchone() is not None
+
+    def mark_done(self, name: str):
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO migrations (name, finished_at) VALUES (?, ?)", (name, time.time())
+            )
+            self.conn.commit()
+
+    def reset(self, name: str):
+        """
+        Makes the migration run again on the next call.
+        """
+        with self._lock:
+            self.conn.execute("DELETE FROM migrations WHERE name = ?", (name,))
+            self.conn.commit()
+
+
+_log = None
+
+
+def get_migration_log() -> MigrationLog:
+    global _log
+    if _log is None:
+        _log = MigrationLog()
+    return _log
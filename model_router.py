@@ -0,0 +1,251 @@
+"""
+Model-tier routing for JobPilot agents.
+
+Agents are given a TierRouter instead of a fixed Gemini model. For every
+model call the router:
+
+1. picks the tier order from the agent's criticality and the request size:
+   critical agents start on flash; standard agents start on flash-lite
+   unless the input is larger than LITE_MAX_INPUT_TOKENS;
+2. calls the first tier with a per-tier latency budget and a short HTTP
+   retry (TIER_RETRY_CONFIG: 2 attempts, at most 2s back-off), passing
+   response chunks on as they arrive;
+3. on a timeout, a 429 or a 5xx before the first chunk, fails over to the
+   next tier (after that the error is raised, since part of the answer has
+   already been passed on);
+4. gives up once CALL_DEADLINE_SECONDS have passed.
+
+Other errors (e.g. 400 for a bad request) are raised immediately since
+another tier would fail the same way.
+
+Gemini modifies the request in place (context caching strips the system
+instruction and tools and points it at a cache), so every attempt gets its
+own copy. Context caches belong to one model: cache metadata from another
+tier is dropped and the tier builds its own cache. The worst case for one call is
+bounded by the deadline instead of the old 5-attempt back-off with
+exp_base=7, which could wait for minutes on a 429.
+"""
+
+import copy
+import time
+import asyncio
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import AsyncGenerator
+
+from google.genai import types
+from google.genai.errors import APIError
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.google_llm import Gemini
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+
+
+TIER_MODELS = {
+    "flash": "gemini-2.5-flash",
+    "lite": "gemini-2.5-flash-lite",
+}
+
+# Tier order tried for each criticality.
+TIER_ORDER = {
+    "critical": ["flash", "lite"],
+    "standard": ["lite", "flash"],
+}
+
+# Standard requests with more estimated input tokens than this start on flash.
+LITE_MAX_INPUT_TOKENS = 8000
+
+# Wall-clock budget for one attempt on a tier, and for the whole call.
+TIER_LATENCY_BUDGET_SECONDS = {
+    "flash": 45,
+    "lite": 20,
+}
+CALL_DEADLINE_SECONDS = 90
+
+FAILOVER_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# One quick retry on the same tier before failing over.
+TIER_RETRY_CONFIG = types.HttpRetryOptions(
+    attempts=2,
+    initial_delay=0.5,
+    max_delay=2.0,
+    exp_base=2,
+    http_status_codes=[429, 500, 503, 504],
+)
+
+ROUTER_STATS = {
+    "calls": 0,
+    "failovers": 0,
+    "timeouts": 0,
+    "rate_limited": 0,
+    "server_errors": 0,
+    "exhausted": 0,
+    "by_model": {},
+}
+
+_tier_llms = {}
+
+# Context cache name → model it was created for.
+_cache_models = {}
+
+# Models that answered the calls made inside record_models().
+_answering_models = ContextVar("answering_models", default=None)
+
+
+@contextmanager
+def record_models():
+    """
+    Collects the models that answer the calls made in this block, including
+    calls from sub-agents. A caller that caches the output can check it came
+    from the model in its cache key and not from a failover tier.
+    """
+    models = []
+    token = _answering_models.set(models)
+    try:
+        yield models
+    finally:
+        _answering_models.reset(token)
+
+
+def get_tier_llm(tier: str) -> Gemini:
+    if tier not in _tier_llms:
+        _tier_llms[tier] = Gemini(model=TIER_MODELS[tier], retry_options=TIER_RETRY_CONFIG)
+    return _tier_llms[tier]
+
+
+def estimate_request_tokens(llm_request: LlmRequest) -> int:
+    """
+    ~4 characters per token over the system instruction and all text parts.
+    """
+    chars = 0
+    config = llm_request.config
+    if config is not None and isinstance(config.system_instruction, str):
+        chars += len(config.system_instruction)
+    for content in llm_request.contents or []:
+        for part in content.parts or []:
+            if part.text:
+                chars += len(part.text)
+            elif part.function_response is not None:
+                chars += len(str(part.function_response.response))
+    return chars // 4
+
+
+def request_for_tier(llm_request: LlmRequest, model: str, first_model: str) -> LlmRequest:
+    """
+    Copy of the request for one attempt on model. tools_dict holds live tool
+    objects and is shared; contents and config are copied since Gemini edits them.
+    """
+    attempt = llm_request.model_copy(update={
+        "model": model,
+        "contents": copy.deepcopy(llm_request.contents),
+        "config": llm_request.config.model_copy(deep=True) if llm_request.config is not None else None,
+        "cache_metadata": llm_request.cache_metadata.model_copy() if llm_request.cache_metadata else None,
+    })
+    cache_name = attempt.cache_metadata.cache_name if attempt.cache_metadata else None
+    if model != first_model or _cache_models.get(cache_name, model) != model:
+        attempt.cache_metadata = None
+        if attempt.config is not None:
+            attempt.config.cached_content = None
+    return attempt
+
+
+def _remember_cache(model: str, response: LlmResponse):
+    if response.cache_metadata is not None and response.cache_metadata.cache_name:
+        _cache_models[response.cache_metadata.cache_name] = model
+
+
+class TierRouter(BaseLlm):
+    """
+    BaseLlm that routes each call across Gemini tiers (see module docstring).
+    """
+
+    criticality: str = "standard"
+    deadline_seconds: float = CALL_DEADLINE_SECONDS
+
+    @property
+    def primary_model(self) -> str:
+        """
+        Model that answers when nothing fails over.
+        """
+        return TIER_MODELS[TIER_ORDER[self.criticality][0]]
+
+    def plan(self, llm_request: LlmRequest) -> list[str]:
+        order = list(TIER_ORDER[self.criticality])
+        if order[0] == "lite" and estimate_request_tokens(llm_request) > LITE_MAX_INPUT_TOKENS:
+            order.remove("flash")
+            order.insert(0, "flash")
+        return order
+
+    @staticmethod
+    def _record_answer(model: str):
+        ROUTER_STATS["by_model"][model] = ROUTER_STATS["by_model"].get(model, 0) + 1
+        models = _answering_models.get()
+        if models is not None:
+            models.append(model)
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        ROUTER_STATS["calls"] += 1
+        deadline = time.monotonic() + self.deadline_seconds
+        order = self.plan(llm_request)
+        last_error = None
+
+        for i, tier in enumerate(order):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            budget = min(TIER_LATENCY_BUDGET_SECONDS[tier], remaining)
+            attempt_deadline = time.monotonic() + budget
+            llm = get_tier_llm(tier)
+            attempt = request_for_tier(llm_request, llm.model, TIER_MODELS[order[0]])
+
+            # Chunks are passed on as they arrive. Once one has been yielded
+            # the answer is committed to this tier and errors are raised.
+            responses = llm.generate_content_async(attempt, stream=stream)
+            answered = False
+            try:
+                while True:
+                    try:
+                        response = await asyncio.wait_for(
+                            responses.__anext__(), timeout=max(0.0, attempt_deadline - time.monotonic())
+                        )
+                    except StopAsyncIteration:
+                        break
+                    if not answered:
+                        answered = True
+                        self._record_answer(llm.model)
+                    _remember_cache(llm.model, response)
+                    yield response
+            except asyncio.TimeoutError:
+                ROUTER_STATS["timeouts"] += 1
+                last_error = TimeoutError(f"{llm.model} exceeded its {budget:.1f}s latency budget")
+                if answered:
+                    raise last_error
+            except APIError as e:
+                if answered or e.code not in FAILOVER_STATUS_CODES:
+                    raise
+                ROUTER_STATS["rate_limited" if e.code == 429 else "server_errors"] += 1
+                last_error = e
+            else:
+                if not answered:
+                    self._record_answer(llm.model)
+                return
+            finally:
+                await responses.aclose()
+
+            if i + 1 < len(order):
+                ROUTER_STATS["failovers"] += 1
+                print(f"[WARN] {llm.model} failed ({last_error}); failing over to "
+                      f"{TIER_MODELS[order[i + 1]]}")
+
+        ROUTER_STATS["exhausted"] += 1
+        raise last_error or TimeoutError(f"No model answered within {self.deadline_seconds:.0f}s")
+
+
+def router_report() -> dict:
+    return {**ROUTER_STATS, "by_model": dict(ROUTER_STATS["by_model"])}
+
+
+critical_model = TierRouter(model="tier-router/critical", criticality="critical")
+standard_model = TierRouter(model="tier-router/standard", criticality="standard")
@@ -0,0 +1,248 @@
+"""
+Near-duplicate detection for the JobPilot ingestion pipeline.
+
+The same job is often cross-posted on several boards under different URLs.
+Each fetched page is reduced to its cleaned main text, shingled into word
+5-grams and summarised as a 128-value MinHash signature. Signatures are
+indexed with LSH (32 bands of 4 rows) in SQLite, so a new page is only
+compared with stored jobs that share at least one band; a candidate whose
+estimated Jaccard similarity is at least NEAR_DUPLICATE_THRESHOLD is a
+duplicate.
+
+The ingest pipeline checks every fetched page before LLM extraction. A
+duplicate is not extracted, embedded or stored; its URL is recorded as an
+alias of the canonical (first stored) job. If that job is later
+dead-lettered or expired, its aliases go back to the frontier as pending
+URLs, so a live copy can take its place.
+
+Index size is ~2 KB per job. The index persists across runs, so copies of
+jobs stored by earlier runs are caught too.
+"""
+
+import re
+import time
+import zlib
+import sqlite3
+import hashlib
+import threading
+
+import numpy as np
+
+from html_cleaning import clean_html
+
+
+NEAR_DUPLICATES_PATH = "/kaggle/working/jobpilot_near_duplicates.db"
+
+SHINGLE_SIZE = 5
+NUM_PERM = 128
+LSH_BANDS = 32
+LSH_ROWS = NUM_PERM // LSH_BANDS
+
+# Minimum estimated Jaccard similarity of two postings' shingle sets. Ten
+# edited words in a 400-word posting already give ~0.8. LSH with 32 × 4
+# finds pairs at 0.7 with probability > 0.999.
+NEAR_DUPLICATE_THRESHOLD = 0.7
+
+# Pages with fewer words cannot be compared reliably and are never collapsed.
+MIN_WORDS = 50
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_rng = np.random.RandomState(1)
+_PERM_A = _rng.randint(1, 1 << 32, size=NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.randint(0, 1 << 32, size=NUM_PERM, dtype=np.uint64)
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+DEDUP_STATS = {
+    "checked": 0,
+    "duplicates": 0,
+}
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> set[str]:
+    words = TOKEN_PATTERN.findall(text.lower())
+    if len(words) < MIN_WORDS:
+        return set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def minhash_signature(text: str) -> np.ndarray | None:
+    """
+    MinHash signature (NUM_PERM uint32 values) of the text's word shingles,
+    or None if the text is too short.
+    """
+    grams = shingles(text)
+    if not grams:
+        return None
+    hashes = np.fromiter((zlib.crc32(g.encode()) for g in grams), dtype=np.uint64, count=len(grams))
+    permuted = (_PERM_A[:, None] * hashes[None, :] + _PERM_B[:, None]) % _MERSENNE_PRIME
+    return (permuted & _MAX_HASH).min(axis=1).astype(np.uint32)
+
+
+def page_signature(html: str) -> np.ndarray | None:
+    return minhash_signature(clean_html(html))
+
+
+def signature_similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """
+    Estimated Jaccard similarity: share of equal signature values.
+    """
+    return float(np.mean(a == b))
+
+
+def lsh_keys(signature: np.ndarray) -> list[str]:
+    return [
+        hashlib.blake2b(signature[band * LSH_ROWS:(band + 1) * LSH_ROWS].tobytes(), digest_size=8).hexdigest()
+        for band in range(LSH_BANDS)
+    ]
+
+
+class NearDuplicateIndex:
+    """
+    SQLite-backed MinHash LSH index of stored jobs, plus the URL aliases of
+    collapsed duplicates.
+    """
+
+    def __init__(self, path: str = NEAR_DUPLICATES_PATH, threshold: float = NEAR_DUPLICATE_THRESHOLD):
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS signatures (
+                job_id TEXT PRIMARY KEY,
+                signature BLOB NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS lsh_buckets (
+                band INTEGER NOT NULL,
+                bucket TEXT NOT NULL,
+                job_id TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS lsh_buckets_key ON lsh_buckets (band, bucket);
+            CREATE INDEX IF NOT EXISTS lsh_buckets_job ON lsh_buckets (job_id);
+            CREATE TABLE IF NOT EXISTS aliases (
+                url TEXT PRIMARY KEY,
+                job_id TEXT NOT NULL,
+                similarity REAL NOT NULL,
+                created_at REAL NOT NULL
+            );
+        """)
+        self.conn.commit()
+
+    def _candidates(self, keys: list[str], exclude: str) -> set[str]:
+        found = set()
+        for band, key in enumerate(keys):
+            for (job_id,) in self.conn.execute(
+                "SELECT job_id FROM lsh_buckets WHERE band = ? AND bucket = ?", (band, key)
+            ):
+                if job_id != exclude:
+                    found.add(job_id)
+        return found
+
+    def _best_match(self, signature: np.ndarray, candidates: set[str]) -> tuple[str | None, float]:
+        best, best_sim = None, 0.0
+        for job_id in candidates:
+            row = self.conn.execute(
+                "SELECT signature FROM signatures WHERE job_id = ?", (job_id,)
+            ).fetchone()
+            if row is None:
+                continue
+            sim = signature_similarity(signature, np.frombuffer(row[0], dtype=np.uint32))
+            if sim > best_sim:
+                best, best_sim = job_id, sim
+        return best, best_sim
+
+    def _insert(self, job_id: str, signature: np.ndarray, keys: list[str]):
+        self.conn.execute("DELETE FROM lsh_buckets WHERE job_id = ?", (job_id,))
+        self.conn.execute(
+            "INSERT OR REPLACE INTO signatures (job_id, signature) VALUES (?, ?)",
+            (job_id, signature.tobytes())
+        )
+        self.conn.executemany(
+            "INSERT INTO lsh_buckets (band, bucket, job_id) VALUES (?, ?, ?)",
+            [(band, key, job_id) for band, key in enumerate(keys)]
+        )
+
+    def find_or_add(self, job_id: str, signature: np.ndarray | None) -> tuple[str | None, float]:
+        """
+        Returns (canonical job_id, similarity) if the signature duplicates an
+        indexed job; otherwise indexes it under job_id and returns (None, 0.0).
+
+        Check and insert happen under one lock, so two copies processed
+        concurrently cannot both be treated as new.
+        """
+        DEDUP_STATS["checked"] += 1
+        if signature is None:
+            return None, 0.0
+
+        keys = lsh_keys(signature)
+        with self._lock:
+            match, sim = self._best_match(signature, self._candidates(keys, job_id))
+            if match is not None and sim >= self.threshold:
+                DEDUP_STATS["duplicates"] += 1
+                return match, sim
+            self._insert(job_id, signature, keys)
+            self.conn.commit()
+        return None, 0.0
+
+    def replace(self, job_id: str, signature: np.ndarray | None):
+        """
+        Re-indexes a job whose content changed.
+        """
+        with self._lock:
+            if signature is None:
+                # Too short to compare now; its aliases stay with the stored job.
+                self.conn.execute("DELETE FROM lsh_buckets WHERE job_id = ?", (job_id,))
+                self.conn.execute("DELETE FROM signatures WHERE job_id = ?", (job_id,))
+            else:
+                self._insert(job_id, signature, lsh_keys(signature))
+            self.conn.commit()
+
+    def _remove(self, job_ids: list[str]) -> list[str]:
+        rows = [(job_id,) for job_id in job_ids]
+        urls = [
+            url for row in rows
+            for (url,) in self.conn.execute("SELECT url FROM aliases WHERE job_id = ?", row)
+        ]
+        self.conn.executemany("DELETE FROM lsh_buckets WHERE job_id = ?", rows)
+        self.conn.executemany("DELETE FROM signatures WHERE job_id = ?", rows)
+        self.conn.executemany("DELETE FROM aliases WHERE job_id = ?", rows)
+        return urls
+
+    def remove(self, job_ids: list[str]) -> list[str]:
+        """
+        Drops jobs that were never stored or have been deleted. Returns the
+        URLs that had been collapsed into them; they are the only copies left
+        and should be queued again (URLFrontier.requeue_duplicates).
+        """
+        if not job_ids:
+            return []
+        with self._lock:
+            urls = self._remove(job_ids)
+            self.conn.commit()
+        return urls
+
+    def indexed_ids(self) -> set[str]:
+        return {row[0] for row in self.conn.execute("SELECT job_id FROM signatures")}
+
+    def add_alias(self, url: str, job_id: str, similarity: float):
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO aliases (url, job_id, similarity, created_at) VALUES (?, ?, ?, ?)",
+                (url, job_id, similarity, time.time())
+            )
+            self.conn.commit()
+
+    def aliases(self, job_id: str) -> list[str]:
+        rows = self.conn.execute("SELECT url FROM aliases WHERE job_id = ?", (job_id,)).fetchall()
+        return [row[0] for row in rows]
+
+
+_index = None
+
+
+def get_near_duplicate_index() -> NearDuplicateIndex:
+    global _index
+    if _index is None:
+        _index = NearDuplicateIndex()
+    return _index
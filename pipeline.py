@@ -0,0 +1,293 @@
+"""
+Deterministic JobPilot pipeline.
+
+orchestrator_agent sequences the whole flow by reasoning over its prompt, so
+every step costs a Gemini round-trip with the full prompt and history. The
+steps themselves are fixed, so JobPilotPipeline runs them directly in code:
+
+    profile    profile_tool (profile_builder_agent only when needed)
+    search     query built from the profile → chroma_query_tool
+    score      prescore_jobs_tool → batch_filter_jobs_tool (borderline only)
+    rank       rank_job_tool
+    summarise  fan_out_agent_tool(job_summarizer_agent)
+
+The ranked jobs are kept in session state. On the next turn the user's
+selection and rejections are parsed in code (selection.py) and the application
+stage runs:
+
+    apply      application_package_tool (resume + cover letter per job)
+
+LLM agents are only called for the generative leaves. Every turn prints a
+per-stage timing table and stores it in session state under "pipeline_timings".
+
+Usage (same session service as main.py):
+
+    from pipeline import run_pipeline
+    await run_pipeline(test_input, session_id="my_session")
+    await run_pipeline("Apply to 1 and 3, reject 2 (too junior)", session_id="my_session")
+"""
+
+import time
+import asyncio
+from contextlib import contextmanager
+from typing import List, Dict, Any, AsyncGenerator
+
+from google.genai import types
+from google.adk.agents import BaseAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event
+from google.adk.tools.agent_tool import ToolContext
+from google.adk.runners import Runner
+
+from main import (
+    app,
+    session_service,
+    profile_tool,
+    chroma_query_tool,
+    prescore_jobs_tool,
+    batch_filter_jobs_tool,
+    rank_job_tool,
+    fan_out_agent_tool,
+    application_package_tool,
+)
+from selection import parse_selection
+
+
+PIPELINE_APP_NAME = "JobPilot_Pipeline"
+
+# Candidates pulled from the vector store before scoring.
+PIPELINE_SEARCH_TOP_K = 30
+
+# Profile skills included in the search query.
+QUERY_MAX_SKILLS = 8
+
+
+class StageTimer:
+    """
+    Collects wall-clock time per pipeline stage.
+    """
+
+    def __init__(self):
+        self.timings = []
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings.append({"stage": name, "seconds": round(time.perf_counter() - start, 3)})
+
+    def total(self) -> float:
+        return round(sum(t["seconds"] for t in self.timings), 3)
+
+    def report(self):
+        print("\n[INFO] Pipeline stage timings")
+        print(f"  {'stage':<12} {'seconds':>9}")
+        for t in self.timings:
+            print(f"  {t['stage']:<12} {t['seconds']:>9.3f}")
+        print(f"  {'total':<12} {self.total():>9.3f}")
+
+
+def build_search_query(profile: Dict[str, Any]) -> str:
+    """
+    Dense semantic query from the profile's preferred roles, industries,
+    remote preference, locations and top skills.
+    """
+    prefs = profile.get("job_preferences", {}) or {}
+    roles = [r for r in prefs.get("role_types", []) if r]
+    industries = [i for i in prefs.get("industries", []) if i]
+    locations = [l for l in prefs.get("locations", []) if l]
+    skills = [s for s in profile.get("skills", []) if s][:QUERY_MAX_SKILLS]
+
+    parts = [" or ".join(roles) + " roles" if roles else "roles matching my experience"]
+    if industries:
+        parts.append("in " + ", ".join(industries) + " companies")
+    if prefs.get("remote"):
+        parts.append("remote-friendly")
+    if locations:
+        parts.append("located in " + ", ".join(locations))
+    if skills:
+        parts.append("requiring " + ", ".join(skills))
+    return " ".join(parts)
+
+
+def rejected_job_ids(rejection_memory: List[Any]) -> List[str]:
+    ids = []
+    for item in rejection_memory or []:
+        job_id = item if isinstance(item, str) else (item or {}).get("job_id")
+        if job_id and job_id not in ids:
+            ids.append(job_id)
+    return ids
+
+
+def format_summaries(jobs: List[Dict[str, Any]], summaries: List[Dict[str, Any]]) -> str:
+    lines = ["Here are the best matching jobs:\n"]
+    for i, (job, summary) in enumerate(zip(jobs, summaries), start=1):
+        lines.append(f"{i}. {job.get('title', '')} at {job.get('company', '')} "
+                     f"({job.get('location', '') or 'location n/a'}) — score {job.get('score')}")
+        lines.append(f"   {summary.get('summary', '')}")
+        link = summary.get("link") or job.get("apply_url", "")
+        if link:
+            lines.append(f"   {link}")
+        lines.append(f"   job_id: {job.get('job_id', '')}\n")
+    lines.append("Tell me which jobs to apply to (e.g. \"apply to 1 and 3\") "
+                 "and which to reject, with a reason if you like.")
+    return "\n".join(lines)
+
+
+def format_applications(package: Dict[str, Any], jobs: List[Dict[str, Any]]) -> str:
+    titles = {j.get("job_id"): f"{j.get('title', '')} at {j.get('company', '')}" for j in jobs}
+    lines = []
+    for application in package["applications"]:
+        job_id = application["job_id"]
+        lines.append(f"=== {titles.get(job_id, job_id)} (job_id: {job_id}) ===\n")
+        lines.append("--- Resume ---")
+        lines.append(application["resume_text"] or "(not generated)")
+        lines.append("\n--- Cover letter ---")
+        lines.append(application["cover_letter_text"] or "(not generated)")
+        lines.append("")
+    for error in package["errors"]:
+        lines.append(f"[WARN] {error['kind']} for {error['job_id']} failed: {error['error']}")
+    return "\n".join(lines)
+
+
+class JobPilotPipeline(BaseAgent):
+    """
+    Root agent that runs the JobPilot steps in code (see module docstring).
+    """
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        tool_context = ToolContext(ctx)
+        state = tool_context.state
+        user_text = "".join(
+            part.text for part in (ctx.user_content.parts if ctx.user_content else []) if part.text
+        )
+        timer = StageTimer()
+
+        presented = state.get("pipeline_ranked_jobs") or []
+        feedback = parse_selection(user_text, presented) if presented else None
+
+        if feedback is not None:
+            reply = await self.apply(tool_context, timer, *feedback)
+        else:
+            reply = await self.search(tool_context, timer, user_text)
+
+        timer.report()
+        state["pipeline_timings"] = {"stages": timer.timings, "total_seconds": timer.total()}
+
+        yield Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            content=types.Content(role="model", parts=[types.Part(text=reply)]),
+            actions=tool_context.actions,
+        )
+
+    async def search(self, tool_context: ToolContext, timer: StageTimer, user_text: str) -> str:
+        state = tool_context.state
+
+        with timer.stage("profile"):
+            profile_result = await profile_tool(tool_context, user_text)
+        profile = profile_result["profile"]
+        if not profile:
+            return f"[ERROR] Could not build your profile: {profile_result['error']}"
+
+        prefs = profile.get("job_preferences", {}) or {}
+        rejection_memory = state.get("rejection_memory", [])
+
+        with timer.stage("search"):
+            query_text = build_search_query(profile)
+            search = await asyncio.to_thread(
+                chroma_query_tool,
+                tool_context,
+                query_text,
+                top_k=PIPELINE_SEARCH_TOP_K,
+                exclude_job_ids=rejected_job_ids(rejection_memory) or None,
+            )
+        if search["error"]:
+            return f"[ERROR] Job search failed: {search['error']}"
+        print(f"[INFO] Query: {query_text!r} → {search['num_returned']} candidates")
+
+        with timer.stage("score"):
+            scored = prescore_jobs_tool(tool_context, search["results"], profile, rejection_memory)
+            jobs = scored["jobs"]
+            borderline = [j for j in jobs if j["borderline"]]
+            if borderline:
+                judged = await batch_filter_jobs_tool(tool_context, borderline, profile, rejection_memory)
+                by_id = {j["job_id"]: j for j in judged["jobs"]}
+                # Borderline jobs without a valid LLM verdict keep their pre-score.
+                jobs = [by_id.get(j["job_id"], j) for j in jobs]
+            passing = [j for j in jobs if j["pass"]]
+        print(f"[INFO] Scored {len(jobs)} jobs: {len(borderline)} borderline, {len(passing)} passed")
+
+        with timer.stage("rank"):
+            wanted = int(prefs.get("number_of_jobs_wanted") or 3)
+            ranked = rank_job_tool(tool_context, passing, wanted)["jobs"]
+        if not ranked:
+            state["pipeline_ranked_jobs"] = []
+            return "No matching jobs found right now. Try widening your locations or roles."
+
+        with timer.stage("summarise"):
+            fan_out = await fan_out_agent_tool(
+                tool_context, "job_summarizer_agent", [{"job": j} for j in ranked]
+            )
+            summaries = []
+            for job, result in zip(ranked, fan_out["results"]):
+                output = result["output"] if result["ok"] and isinstance(result["output"], dict) else {}
+                if not output.get("summary"):
+                    # Fall back to the job's own description rather than retrying.
+                    output = {"summary": (job.get("job_description") or "")[:300]}
+                summaries.append(output)
+
+        state["pipeline_ranked_jobs"] = ranked
+        return format_summaries(ranked, summaries)
+
+    async def apply(
+        self,
+        tool_context: ToolContext,
+        timer: StageTimer,
+        selected: List[Dict[str, Any]],
+        rejections: List[Dict[str, Any]]
+    ) -> str:
+        state = tool_context.state
+        reply = []
+
+        if rejections:
+            state["rejection_memory"] = list(state.get("rejection_memory", [])) + rejections
+            reply.append(f"Noted {len(rejections)} rejected job(s); they will not be shown again.\n")
+
+        if not selected:
+            remaining = [j for j in state["pipeline_ranked_jobs"]
+                         if j["job_id"] not in {r["job_id"] for r in rejections}]
+            state["pipeline_ranked_jobs"] = remaining
+            return "\n".join(reply + ["Which of the remaining jobs should I apply to?"])
+
+        with timer.stage("apply"):
+            package = await application_package_tool(tool_context, selected, state["user_profile"])
+        print(f"[INFO] Built {len(package['applications'])} application(s), "
+              f"{package['num_cached']} document(s) from cache")
+
+        state["pipeline_ranked_jobs"] = []
+        return "\n".join(reply + [format_applications(package, selected)])
+
+
+pipeline_agent = JobPilotPipeline(
+    name="jobpilot_pipeline",
+    description="Runs the JobPilot steps deterministically; LLM agents only for generation."
+)
+
+# Same plugins and context caching as main.app, only the root agent differs.
+pipeline_app = app.model_copy(update={"name": PIPELINE_APP_NAME, "root_agent": pipeline_agent})
+
+pipeline_runner = Runner(
+    app=pipeline_app,
+    session_service=session_service,
+)
+
+
+async def run_pipeline(user_text: str, session_id: str, user_id: str = "debug_user_id"):
+    """
+    Sends one user message through the pipeline and returns the events.
+    """
+    return await pipeline_runner.run_debug(user_text, user_id=user_id, session_id=session_id)
@@ -0,0 +1,128 @@
+"""
+Profile memoisation helpers for profile_tool (main.py).
+
+Every orchestrator turn starts with profile_tool, but most turns are chat
+("apply to 1 and 3", "reject 2", "thanks") rather than profile text.
+profile_delta() picks the lines of a message that are worth sending to
+profile_builder_agent: lines the stored profile was not built from that
+carry profile content (skills, experience, education, contact details, job
+preferences) or an explicit update phrase. Feedback on presented jobs is
+never forwarded. If nothing is left, the stored profile is reused without
+an LLM call.
+"""
+
+import re
+import copy
+import difflib
+import hashlib
+
+from selection import FEEDBACK_MAX_CHARS, parse_selection
+
+
+# Same trigger phrases as the profile_builder_agent instruction.
+PROFILE_UPDATE_PHRASES = [
+    "update my profile", "change my profile", "modify my profile", "add new info",
+    "correct my profile", "here is new info", "updated details", "here is my resume",
+    "my updated resume", "new details",
+]
+
+# Words that mark a line as profile content.
+PROFILE_MARKERS = [
+    # background
+    "experience", "experienced", "years", "worked", "work as", "working as", "job title",
+    "skill", "skills", "proficient", "familiar with", "i know", "i use",
+    "degree", "bsc", "msc", "ba", "ma", "phd", "bachelor", "bachelor's", "master", "master's",
+    "graduated", "university", "college", "bootcamp", "certified", "certification",
+    "certifications", "studied", "studying", "languages",
+    # contact
+    "my name", "based in", "live in", "living in", "moved to", "moving to", "email",
+    "phone", "linkedin", "github", "portfolio",
+    # preferences
+    "looking for", "prefer", "preference", "preferences", "open to", "relocate",
+    "relocation", "remote", "hybrid", "on-site", "onsite", "in-office", "full-time",
+    "part-time", "contract", "internship", "salary", "industry", "industries",
+    "only", "i want", "i'd like", "i would like", "no longer", "no more", "anymore",
+]
+
+# Presented lists are never longer than this; used to recognise feedback.
+MAX_PRESENTED_JOBS = 50
+_FEEDBACK_JOBS = [{"job_id": f"#{i}"} for i in range(1, MAX_PRESENTED_JOBS + 1)]
+
+
+def _phrases_pattern(phrases: list[str]) -> re.Pattern:
+    alternatives = sorted(phrases, key=len, reverse=True)
+    return re.compile(r"(?<![\w’'-])(?:" + "|".join(re.escape(p) for p in alternatives) + r")(?![\w’'-])")
+
+
+UPDATE_PATTERN = _phrases_pattern(PROFILE_UPDATE_PHRASES)
+PROFILE_PATTERN = _phrases_pattern(PROFILE_MARKERS)
+CONTACT_PATTERN = re.compile(r"\S+@\S+\.\w+|\+?\d[\d\s().-]{7,}\d")
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(re.sub(r"\s+", " ", text.strip().lower()).encode()).hexdigest()
+
+
+def new_lines(old_text: str, new_text: str) -> str:
+    """
+    Lines of new_text that do not appear in old_text (line-level diff).
+    """
+    diff = difflib.ndiff(old_text.splitlines(), new_text.splitlines())
+    return "\n".join(line[2:] for line in diff if line.startswith("+ ") and line[2:].strip())
+
+
+def is_feedback(line: str) -> bool:
+    """
+    True if the line selects or rejects presented jobs by number.
+    """
+    return parse_selection(line, _FEEDBACK_JOBS) is not None
+
+
+def is_profile_line(line: str) -> bool:
+    lowered = line.lower()
+    if UPDATE_PATTERN.search(lowered):
+        return True
+    if is_feedback(line):
+        return False
+    return bool(PROFILE_PATTERN.search(lowered) or CONTACT_PATTERN.search(line))
+
+
+def profile_delta(added: str) -> str:
+    """
+    The lines of added (see new_lines) to send to profile_builder_agent.
+    A long block of new text is profile text as a whole, as in
+    selection.parse_selection; otherwise only profile lines are kept.
+    """
+    if len(added) > FEEDBACK_MAX_CHARS:
+        return added
+    return "\n".join(line for line in added.splitlines() if is_profile_line(line))
+
+
+def merge_profiles(stored: dict, update: dict) -> dict:
+    """
+    Merges the builder's updated profile into the stored one. The builder
+    gets existing_profile and returns the full updated profile, so non-empty
+    values (lists included) replace the stored ones; that is how "NYC only"
+    or "no remote roles" shrink a list. Empty values keep the stored value,
+    nested dicts are merged recursively.
+    """
+    merged = copy.deepcopy(stored)
+    for key, value in (update or {}).items():
+        old = merged.get(key)
+        if isinstance(old, dict) and isinstance(value, dict):
+            merged[key] = merge_profiles(old, value)
+        elif isinstance(value, list):
+            cleaned = [v for v in value if v not in ("", {}, None)]
+            if cleaned:
+                merged[key] = cleaned
+        elif value not in ("", None, {}):
+            merged[key] = value
+    return merged
+
+
+def unwrap_profile(output) -> dict | None:
+    if isinstance(output, dict) and isinstance(output.get("profile"), dict):
+        output = output["profile"]
+    if isinstance(output, dict) and "skills" in output:
+        return output
+    return None
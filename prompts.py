@@ -0,0 +1,179 @@
+"""
+Prompt assembly for JobPilot agents.
+
+instructions.py holds the prompt templates. Schema sections in them are
+written as <<PROFILE_SCHEMA>>, <<JOB_DETAILS_SCHEMA>>, ... placeholders and are
+rendered here, once, from schemas.py as compact single-line JSON. Changing a
+schema in schemas.py therefore updates every prompt that shows it. Rules that
+several prompts share (output format, filter scoring) are written once in
+instructions.prompt_blocks and filled in the same way.
+
+All agents get their prompt as static_instruction, so it is sent as the first,
+unchanging part of the system instruction. That stable prefix is what Gemini's
+implicit caching keys on; the metrics plugin reports the cached share as
+cached_tokens. The root runner additionally enables ADK explicit context
+caching (context_cache_config) for the orchestrator's multi-turn session.
+Sub-agents called through AgentTool run in a fresh session per call, so ADK
+could not reuse an explicit cache for them and they rely on implicit caching.
+
+prompt_token_report() shows the prompt size of each agent, counted with the
+Gemini tokenizer when possible (see count_tokens).
+"""
+
+import re
+import json
+import math
+
+from google.adk.agents.context_cache_config import ContextCacheConfig
+
+try:
+    # Offline Gemini tokenizer; needs sentencepiece and downloads the
+    # tokenizer model on first use.
+    from google.genai.local_tokenizer import LocalTokenizer
+except ImportError:
+    LocalTokenizer = None
+
+from schemas import schemas
+from instructions import instructions_json, prompt_blocks
+
+
+PLACEHOLDER_PATTERN = re.compile(r"<<([A-Z_]+)>>")
+
+# Schemas available to prompt templates.
+PROMPT_SCHEMAS = {
+    **schemas,
+    # A job as returned by job_search_agent: details plus the filter verdict.
+    # Only passing jobs are returned, so the example shows "pass": true.
+    "SCORED_JOB_SCHEMA": {**schemas["JOB_DETAILS_SCHEMA"], **schemas["JOB_FILTER_OUTPUT_SCHEMA"], "pass": True},
+}
+
+# Rough size of a Gemini token in characters, for offline estimates.
+CHARS_PER_TOKEN = 4
+
+# Explicit context caching for the root runner (see module docstring).
+CONTEXT_CACHE_MIN_TOKENS = 2048
+CONTEXT_CACHE_TTL_SECONDS = 30 * 60
+CONTEXT_CACHE_INTERVALS = 10
+
+context_cache_config = ContextCacheConfig(
+    min_tokens=CONTEXT_CACHE_MIN_TOKENS,
+    ttl_seconds=CONTEXT_CACHE_TTL_SECONDS,
+    cache_intervals=CONTEXT_CACHE_INTERVALS,
+)
+
+
+def schema_text(name: str) -> str:
+    """
+    Compact JSON rendering of a schema, e.g. {"pass": false, "score": 0, "rationale": ""}.
+    """
+    return json.dumps(PROMPT_SCHEMAS[name], ensure_ascii=False)
+
+
+def placeholder_text(name: str) -> str:
+    if name in prompt_blocks:
+        return prompt_blocks[name].rstrip("\n")
+    return schema_text(name)
+
+
+def render_instruction(template: str) -> str:
+    """
+    Replaces every <<NAME>> placeholder with the compact schema or the
+    shared prompt block. Unknown placeholders raise KeyError so typos fail
+    at import time.
+    """
+    return PLACEHOLDER_PATTERN.sub(lambda m: placeholder_text(m.group(1)), template)
+
+
+def compact_whitespace(text: str) -> str:
+    """
+    Drops trailing spaces and collapses runs of blank lines to one.
+    """
+    text = re.sub(r"[ \t]+\n", "\n", text)
+    return re.sub(r"\n{3,}", "\n\n", text).strip()
+
+
+def build_prompts(templates: dict = instructions_json) -> dict:
+    return {name: compact_whitespace(render_instruction(text)) for name, text in templates.items()}
+
+
+PROMPTS = build_prompts()
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text or "") / CHARS_PER_TOKEN)
+
+
+_local_tokenizers = {}
+
+
+def token_counter(client=None) -> str:
+    """
+    How count_tokens() counts: "api" (client given), "local" (Gemini
+    tokenizer installed) or "estimate".
+    """
+    if client is not None:
+        return "api"
+    return "local" if LocalTokenizer is not None else "estimate"
+
+
+def count_tokens(text: str, model: str, client=None) -> int:
+    """
+    Exact token count from the Gemini API when a google.genai client is
+    given, else from the local Gemini tokenizer, else the offline estimate.
+    """
+    if client is not None:
+        try:
+            return client.models.count_tokens(model=model, contents=text).total_tokens
+        except Exception as e:
+            print(f"[WARN] count_tokens failed ({e}); using estimate.")
+            return estimate_tokens(text)
+
+    if LocalTokenizer is not None and model not in _local_tokenizers:
+        try:
+            _local_tokenizers[model] = LocalTokenizer(model_name=model)
+        except Exception as e:
+            print(f"[WARN] No local tokenizer for {model} ({e}); using estimate.")
+            _local_tokenizers[model] = None
+    tokenizer = _local_tokenizers.get(model)
+    if tokenizer is None:
+        return estimate_tokens(text)
+    return tokenizer.count_tokens(text).total_tokens
+
+
+def _model_name(agent) -> str:
+    """
+    Name of the Gemini model behind an agent; for a TierRouter, its primary tier.
+    """
+    if isinstance(agent.model, str):
+        return agent.model
+    return getattr(agent.model, "primary_model", None) or getattr(agent.model, "model", "")
+
+
+def prompt_token_report(agents: list, client=None) -> list[dict]:
+    """
+    Prints and returns the instruction size of each LlmAgent: static prefix,
+    dynamic instruction and their total, in tokens (see count_tokens).
+    """
+    rows = []
+    for agent in agents:
+        model = _model_name(agent)
+        static = agent.static_instruction if isinstance(agent.static_instruction, str) else ""
+        dynamic = agent.instruction if isinstance(agent.instruction, str) else ""
+        static_tokens = count_tokens(static, model, client) if static else 0
+        dynamic_tokens = count_tokens(dynamic, model, client) if dynamic else 0
+        rows.append({
+            "agent": agent.name,
+            "model": model,
+            "static_tokens": static_tokens,
+            "dynamic_tokens": dynamic_tokens,
+            "total_tokens": static_tokens + dynamic_tokens,
+        })
+
+    counter = token_counter(client)
+    print(f"\n[INFO] Prompt size per agent ({'estimated' if counter == 'estimate' else 'exact, ' + counter} tokens)")
+    print(f"  {'agent':<32} {'model':<24} {'static':>7} {'dynamic':>8} {'total':>7}")
+    for r in rows:
+        print(f"  {r['agent']:<32} {r['model']:<24} {r['static_tokens']:>7} "
+              f"{r['dynamic_tokens']:>8} {r['total_tokens']:>7}")
+    print(f"  {'TOTAL':<32} {'':<24} {'':>7} {'':>8} {sum(r['total_tokens'] for r in rows):>7}")
+    return rows
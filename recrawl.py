@@ -0,0 +1,306 @@
+"""
+JobPilot — incremental re-crawl scheduler.
+
+Keeps the 'jobs' collection fresh at a cost proportional to what changed:
+
+1. Backfill crawl state for jobs stored before freshness tracking existed.
+2. Re-fetch only postings whose next_due has passed (crawl_state.py),
+   with conditional GETs and per-host politeness.
+3. 304 or same content hash → no extraction, no embedding; the re-crawl
+   interval backs off.
+4. Changed content → re-extract (JSON-LD or LLM), re-embed and upsert,
+   and refresh the job's near-duplicate signature.
+5. 404/410, empty postings, repeated failures, or postings not seen alive
+   for EXPIRE_AFTER_DAYS → deleted from Chroma in bulk; their frontier rows
+   are marked expired so discovery can bring them back.
+
+Run periodically, e.g.:
+
+    python recrawl.py --limit 500
+"""
+
+import time
+import asyncio
+import argparse
+
+from ingest_jobs import (
+    CLEAN_TEXT_MAX_CHARS,
+    FETCH_CONCURRENCY,
+    EXTRACT_CONCURRENCY,
+    PER_HOST_CONCURRENCY,
+    HOST_DELAY_SECONDS,
+    WRITE_BATCH_SIZE,
+    EXTRACTION_STATS,
+    FETCH_STATS,
+    HostLimiter,
+    HtmlBlobStore,
+    JobWriter,
+    connect_to_chromadb,
+    fetch_page,
+    parse_job_html,
+)
+from crawl_state import CrawlStateStore, get_crawl_state, content_hash
+from near_duplicates import NearDuplicateIndex, get_near_duplicate_index, page_signature
+from url_frontier import URLFrontier, get_frontier, canonicalize_url
+from cpu_pool import CpuPool, CPU_WORKERS, ENCODER_MODES
+from jobs_version import get_jobs_version
+
+
+# Postings not seen alive for this long are deleted.
+EXPIRE_AFTER_DAYS = 30
+
+# Maximum postings re-fetched per run (None → all due postings).
+RECRAWL_LIMIT = 500
+
+# HTTP statuses that mean the posting was taken down.
+GONE_STATUSES = {404, 410}
+
+DELETE_BATCH_SIZE = 500
+
+
+def backfill_crawl_state(collection, crawl_state: CrawlStateStore, page_size: int = 1000) -> int:
+    """
+    Tracks jobs that are in Chroma but not in the crawl state yet. Their
+    content hash is unknown, so the first re-fetch only records a baseline.
+    """
+    tracked = crawl_state.tracked_ids()
+    entries = []
+    offset = 0
+    while True:
+        page = collection.get(include=["metadatas"], limit=page_size, offset=offset)
+        ids = page.get("ids", [])
+        if not ids:
+            break
+        for job_id, meta in zip(ids, page.get("metadatas") or []):
+            if job_id not in tracked and (meta or {}).get("apply_url"):
+                entries.append((job_id, meta["apply_url"], None))
+        offset += len(ids)
+
+    crawl_state.record_stored(entries)
+    if entries:
+        print(f"[INFO] Backfilled crawl state for {len(entries)} jobs.")
+    return len(entries)
+
+
+async def recheck_job(
+    row: dict,
+    fetch_sem: asyncio.Semaphore,
+    extract_sem: asyncio.Semaphore,
+    write_lock: asyncio.Lock,
+    writer: JobWriter,
+    hosts: HostLimiter,
+    crawl_state: CrawlStateStore,
+    dedup: NearDuplicateIndex,
+    stats: dict,
+    pool: CpuPool | None = None
+):
+    """
+    Re-fetches one due posting and only re-extracts / re-embeds it if its
+    content hash changed. With a pool, hashing and parsing run in its processes.
+    """
+    job_id, url = row["job_id"], row["url"]
+
+    # Host turn first, then a global slot (as in process_url_async).
+    async with hosts.semaphore(url):
+        await hosts.wait_turn(url)
+        async with fetch_sem:
+            status, html = await asyncio.to_thread(fetch_page, url)
+
+    if status in GONE_STATUSES:
+        crawl_state.mark_failed(job_id, gone=True)
+        stats["gone"] += 1
+        return
+    if html is None:
+        crawl_state.mark_failed(job_id)
+        stats["failed"] += 1
+        return
+
+    # 304 with a known hash: nothing to hash or parse.
+    if status == 304 and row["content_hash"]:
+        crawl_state.mark_unchanged(job_id, None)
+        stats["unchanged"] += 1
+        return
+
+    prepared = await pool.prepare(html) if pool is not None else None
+    if prepared is not None:
+        page_hash = prepared["content_hash"]
+    else:
+        page_hash = await asyncio.to_thread(content_hash, html)
+    if row["content_hash"] is None or page_hash == row["content_hash"]:
+        crawl_state.mark_unchanged(job_id, page_hash)
+        stats["unchanged"] += 1
+        return
+
+    try:
+        async with extract_sem:
+            parsed = await asyncio.to_thread(parse_job_html, html, url, CLEAN_TEXT_MAX_CHARS, prepared)
+    except Exception as e:
+        print(f"[ERROR] Re-extraction failed for {url}: {e}")
+        crawl_state.mark_failed(job_id)
+        stats["failed"] += 1
+        return
+
+    # Jobs stored before URL canonicalisation keep their original job_id.
+    parsed["job_id"] = job_id
+
+    if not parsed.get("title") and not parsed.get("job_description"):
+        # The page is still up but no longer holds a posting.
+        crawl_state.mark_failed(job_id, gone=True)
+        stats["gone"] += 1
+        return
+
+    async with write_lock:
+        await asyncio.to_thread(writer.add, parsed, html, page_hash)
+    if prepared is not None:
+        dedup.replace(job_id, prepared["signature"])
+    else:
+        dedup.replace(job_id, await asyncio.to_thread(page_signature, html))
+    stats["changed"] += 1
+    print(f"[INFO] Changed, queued for re-embedding: {job_id}")
+
+
+def expire_jobs(
+    collection,
+    crawl_state: CrawlStateStore,
+    blob_store: HtmlBlobStore,
+    dedup: NearDuplicateIndex,
+    frontier: URLFrontier,
+    expire_after_days: float = EXPIRE_AFTER_DAYS
+) -> int:
+    """
+    Deletes expired postings from Chroma, the blob store, the near-duplicate
+    index and the crawl state in batches of DELETE_BATCH_SIZE, and marks
+    their frontier rows expired.
+    """
+    ids = crawl_state.expired(expire_after_days * 24 * 3600)
+    deleted = 0
+    for i in range(0, len(ids), DELETE_BATCH_SIZE):
+        chunk = ids[i:i + DELETE_BATCH_SIZE]
+        urls = crawl_state.urls(chunk)
+        try:
+            collection.delete(ids=chunk)
+        except Exception as e:
+            print(f"[ERROR] Bulk delete of {len(chunk)} jobs failed: {e}")
+            continue
+        for job_id in chunk:
+            blob_store.delete(job_id)
+        # Copies collapsed into an expired job may still be live.
+        frontier.requeue_duplicates(dedup.remove(chunk))
+        # Legacy jobs are matched by job_id, the others by canonical URL.
+        frontier.expire([canonicalize_url(url) for url in urls.values()], job_ids=chunk)
+        crawl_state.delete(chunk)
+        deleted += len(chunk)
+
+    if deleted:
+        get_jobs_version().bump()
+        print(f"[SUCCESS] Deleted {deleted} expired jobs.")
+    return deleted
+
+
+def print_recrawl_summary(stats: dict, crawl_state: CrawlStateStore):
+    print("\n======== RECRAWL SUMMARY ========")
+    print(f"Due: {stats['due']}")
+    print(f"Unchanged: {stats['unchanged']}")
+    print(f"Changed (re-embedded): {stats['changed']}")
+    print(f"Gone: {stats['gone']}")
+    print(f"Failed: {stats['failed']}")
+    print(f"Expired and deleted: {stats['expired']}")
+    if FETCH_STATS["requests"]:
+        print(f"HTTP requests: {FETCH_STATS['requests']} "
+              f"({FETCH_STATS['not_modified']} not modified, "
+              f"{FETCH_STATS['bytes_fetched']:,} bytes fetched)")
+    print(f"LLM extractions: {EXTRACTION_STATS['llm_calls']}")
+    state = crawl_state.report()
+    print(f"Tracked: {state['active']} active, {state['due']} still due")
+    print(f"Elapsed: {stats['elapsed']:.1f}s")
+    print("=================================\n")
+
+
+async def recrawl_async(
+    limit: int | None = RECRAWL_LIMIT,
+    expire_after_days: float = EXPIRE_AFTER_DAYS,
+    fetch_concurrency: int = FETCH_CONCURRENCY,
+    extract_concurrency: int = EXTRACT_CONCURRENCY,
+    per_host: int = PER_HOST_CONCURRENCY,
+    host_delay: float = HOST_DELAY_SECONDS,
+    batch_size: int = WRITE_BATCH_SIZE,
+    processes: int = 0,
+    encoder_mode: str = "per_worker"
+) -> dict:
+    collection = connect_to_chromadb()
+    crawl_state = get_crawl_state()
+    blob_store = HtmlBlobStore()
+    dedup = get_near_duplicate_index()
+    frontier = get_frontier()
+
+    start = time.perf_counter()
+    backfill_crawl_state(collection, crawl_state)
+
+    due = crawl_state.due(limit=limit)
+    stats = {"due": len(due), "unchanged": 0, "changed": 0, "gone": 0, "failed": 0, "expired": 0}
+    print(f"[INFO] {len(due)} postings due for re-crawl.")
+
+    fetch_sem = asyncio.Semaphore(fetch_concurrency)
+    extract_sem = asyncio.Semaphore(extract_concurrency)
+    write_lock = asyncio.Lock()
+    hosts = HostLimiter(per_host=per_host, delay=host_delay)
+    pool = CpuPool(processes, encoder_mode) if processes > 0 else None
+    writer = JobWriter(collection, batch_size=batch_size, blob_store=blob_store,
+                       upsert=True, crawl_state=crawl_state,
+                       encoder=pool.encode if pool is not None else None)
+
+    try:
+        await asyncio.gather(*[
+            recheck_job(row, fetch_sem, extract_sem, write_lock, writer, hosts, crawl_state, dedup, stats, pool)
+            for row in due
+        ])
+    finally:
+        await asyncio.to_thread(writer.close)
+        if pool is not None:
+            pool.close()
+
+    stats["failed"] += writer.failed
+    stats["expired"] = expire_jobs(collection, crawl_state, blob_store, dedup, frontier, expire_after_days)
+    stats["elapsed"] = time.perf_counter() - start
+    print_recrawl_summary(stats, crawl_state)
+    return stats
+
+
+def recrawl(**kwargs) -> dict:
+    return asyncio.run(recrawl_async(**kwargs))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="JobPilot incremental re-crawl")
+    parser.add_argument("--limit", type=int, default=RECRAWL_LIMIT,
+                        help="Maximum postings to re-fetch this run (0 = all due).")
+    parser.add_argument("--expire-after-days", type=float, default=EXPIRE_AFTER_DAYS)
+    parser.add_argument("--fetch-concurrency", type=int, default=FETCH_CONCURRENCY)
+    parser.add_argument("--extract-concurrency", type=int, default=EXTRACT_CONCURRENCY)
+    parser.add_argument("--per-host", type=int, default=PER_HOST_CONCURRENCY)
+    parser.add_argument("--host-delay", type=float, default=HOST_DELAY_SECONDS)
+    parser.add_argument("--batch-size", type=int, default=WRITE_BATCH_SIZE)
+    parser.add_argument("--processes", type=int, default=0,
+                        help=f"CPU-bound stages in a process pool of this size "
+                             f"(0 = off, -1 = {CPU_WORKERS} cores).")
+    parser.add_argument("--encoder-mode", choices=ENCODER_MODES, default="per_worker")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    recrawl(
+        limit=args.limit or None,
+        expire_after_days=args.expire_after_days,
+        fetch_concurrency=args.fetch_concurrency,
+        extract_concurrency=args.extract_concurrency,
+        per_host=args.per_host,
+        host_delay=args.host_delay,
+        batch_size=args.batch_size,
+        processes=CPU_WORKERS if args.processes < 0 else args.processes,
+        encoder_mode=args.encoder_mode
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,14 @@
+"""
+Launcher for ingest_jobs.py; takes the same arguments.
+
+Use it for runs with --processes. Pool workers are spawned, and a spawned
+process re-imports the script that started the run. This file imports
+nothing at module level, so workers do not load chromadb or google.adk or
+build the Gemini agents.
+
+    python run_ingest.py --concurrent --processes -1
+"""
+
+if __name__ == "__main__":
+    from ingest_jobs import main
+    main()
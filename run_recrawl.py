@@ -0,0 +1,9 @@
+"""
+Launcher for recrawl.py; takes the same arguments. See run_ingest.py.
+
+    python run_recrawl.py --processes -1
+"""
+
+if __name__ == "__main__":
+    from recrawl import main
+    main()
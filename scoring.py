@@ -0,0 +1,306 @@
+"""
+Deterministic job pre-scorer for JobPilot.
+
+Scores every candidate returned by chroma_query_tool in one vectorised pass
+and produces the same fields as job_filter_agent (JOB_FILTER_OUTPUT_SCHEMA:
+pass, score, rationale). Only candidates whose score lands close to the pass
+threshold are flagged as borderline and still need an LLM opinion.
+
+The score (0–100) is a weighted sum of:
+
+    similarity   embedding similarity from the vector query
+    skills       share of the job's skills covered by profile.skills
+    location     location / remote match against job_preferences
+    role         job title matches one of job_preferences.role_types
+
+minus penalties for companies the user rejected before. Jobs whose job_id is
+in rejection_memory always fail.
+"""
+
+import re
+import numpy as np
+
+
+PASS_THRESHOLD = 60
+BORDERLINE_MARGIN = 10
+
+SCORE_WEIGHTS = {
+    "similarity": 0.35,
+    "skills": 0.30,
+    "location": 0.20,
+    "role": 0.15,
+}
+
+# Cosine similarities from all-MiniLM-L6-v2 mostly fall in this range;
+# they are rescaled to 0–1 before weighting.
+SIMILARITY_RANGE = (0.2, 0.7)
+
+REJECTED_COMPANY_PENALTY = 30
+
+# US state names by abbreviation, so a "United States" or "California"
+# preference matches "San Francisco, CA".
+US_STATES = {
+    "al": "alabama", "ak": "alaska", "az": "arizona", "ar": "arkansas", "ca": "california",
+    "co": "colorado", "ct": "connecticut", "de": "delaware", "fl": "florida", "ga": "georgia",
+    "hi": "hawaii", "id": "idaho", "il": "illinois", "in": "indiana", "ia": "iowa",
+    "ks": "kansas", "ky": "kentucky", "la": "louisiana", "me": "maine", "md": "maryland",
+    "ma": "massachusetts", "mi": "michigan", "mn": "minnesota", "ms": "mississippi",
+    "mo": "missouri", "mt": "montana", "ne": "nebraska", "nv": "nevada", "nh": "new hampshire",
+    "nj": "new jersey", "nm": "new mexico", "ny": "new york", "nc": "north carolina",
+    "nd": "north dakota", "oh": "ohio", "ok": "oklahoma", "or": "oregon", "pa": "pennsylvania",
+    "ri": "rhode island", "sc": "south carolina", "sd": "south dakota", "tn": "tennessee",
+    "tx": "texas", "ut": "utah", "vt": "vermont", "va": "virginia", "wa": "washington",
+    "wv": "west virginia", "wi": "wisconsin", "wy": "wyoming", "dc": "district of columbia",
+}
+US_STATE_NAMES = set(US_STATES.values())
+
+LOCATION_ALIASES = {
+    "us": "united states", "usa": "united states", "u.s.": "united states",
+    "u.s.a.": "united states", "united states of america": "united states",
+    "uk": "united kingdom", "u.k.": "united kingdom",
+    "nyc": "new york", "sf": "san francisco",
+}
+
+
+def _tokens(text: str) -> set[str]:
+    return set(re.findall(r"[a-z0-9+#.]+", (text or "").lower()))
+
+
+def _phrase_pattern(phrase: str) -> re.Pattern:
+    """
+    Matches phrase as whole tokens: "r" does not match "pytorch" or "years",
+    "java" does not match "javascript"; "c++" and "node.js" still match.
+    """
+    return re.compile(r"(?<![a-z0-9+#])" + re.escape(phrase) + r"(?![a-z0-9+#])")
+
+
+def _lower_list(values) -> list[str]:
+    return [str(v).strip().lower() for v in (values or []) if str(v).strip()]
+
+
+def _rejections(rejection_memory) -> tuple[set[str], set[str]]:
+    """
+    Splits rejection_memory into rejected job_ids and rejected companies.
+    Entries may be plain job_id strings or dicts with job_id/company keys.
+    """
+    ids, companies = set(), set()
+    for item in rejection_memory or []:
+        if isinstance(item, str):
+            ids.add(item)
+        elif isinstance(item, dict):
+            if item.get("job_id"):
+                ids.add(item["job_id"])
+            if item.get("company"):
+                companies.add(str(item["company"]).strip().lower())
+    return ids, companies
+
+
+def _skill_matrix(jobs: list[dict], skills: list[str]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Returns (matches, covered, job_skill_counts):
+
+    matches[i, j] is True when profile skill j appears as a whole phrase in
+    job i's skills or requirements; covered[i] is the number of job i's
+    listed skills that a profile skill matches (either phrase inside the
+    other); job_skill_counts[i] is the number of skills job i lists.
+    """
+    patterns = [_phrase_pattern(skill) for skill in skills]
+    matches = np.zeros((len(jobs), len(skills)), dtype=bool)
+    covered = np.zeros(len(jobs), dtype=float)
+    counts = np.zeros(len(jobs), dtype=float)
+
+    for i, job in enumerate(jobs):
+        listed = _lower_list(job.get("skills_mentioned"))
+        counts[i] = len(listed)
+        haystack = " | ".join(listed + _lower_list(job.get("requirements")))
+        for j, pattern in enumerate(patterns):
+            matches[i, j] = pattern.search(haystack) is not None
+        covered[i] = sum(
+            any(p.search(item) or _phrase_pattern(item).search(skill) for p, skill in zip(patterns, skills))
+            for item in listed
+        )
+
+    return matches, covered, counts
+
+
+def _location_terms(location: str, expand: bool) -> set[str]:
+    """
+    Comma/slash separated parts of a location, with aliases resolved. With
+    expand, US states also add their name/abbreviation and "united states".
+    """
+    terms = set()
+    for part in re.split(r"[,/;|()]|\s-\s", (location or "").lower()):
+        part = " ".join(part.split())
+        if not part:
+            continue
+        part = LOCATION_ALIASES.get(part, part)
+        terms.add(part)
+        if not expand:
+            continue
+        if part in US_STATES:
+            terms.update({US_STATES[part], "united states"})
+        elif part in US_STATE_NAMES:
+            terms.add("united states")
+    return terms
+
+
+def location_matches(preference: str, job_location: str) -> bool:
+    """
+    True if a preferred location and a job location share a part, one being
+    a whole-word phrase of the other ("New York" ~ "New York, NY",
+    "United States" ~ "Chicago, IL", but "Georgia" !~ "Georgian Bay").
+    """
+    wanted = _location_terms(preference, expand=False)
+    offered = _location_terms(job_location, expand=True)
+    return any(
+        _phrase_pattern(w).search(o) or _phrase_pattern(o).search(w)
+        for w in wanted for o in offered
+    )
+
+
+def score_jobs(jobs: list[dict], profile: dict, rejection_memory=None) -> list[dict]:
+    """
+    Scores all jobs at once. Returns one dict per job (same order) with
+    job_id, score, pass, borderline and rationale.
+    """
+    if not jobs:
+        return []
+
+    prefs = (profile or {}).get("job_preferences", {}) or {}
+    skills = _lower_list((profile or {}).get("skills"))
+    locations = _lower_list(prefs.get("locations"))
+    role_types = _lower_list(prefs.get("role_types"))
+    wants_remote = bool(prefs.get("remote"))
+    rejected_ids, rejected_companies = _rejections(rejection_memory)
+
+    n = len(jobs)
+
+    # --- embedding similarity ---
+    similarity = np.array(
+        [float(job.get("similarity", 0.5) or 0.0) for job in jobs], dtype=float
+    )
+    lo, hi = SIMILARITY_RANGE
+    similarity_score = np.clip((similarity - lo) / (hi - lo), 0.0, 1.0)
+
+    # --- skill overlap ---
+    if skills:
+        matches, covered, job_skill_counts = _skill_matrix(jobs, skills)
+        matched = matches.sum(axis=1)
+        # Share of the job's listed skills the profile covers; if the job lists
+        # no skills, fall back to a neutral 0.5 bumped by any profile skills
+        # found in requirements.
+        skills_score = np.where(
+            job_skill_counts > 0,
+            covered / np.maximum(job_skill_counts, 1),
+            np.minimum(0.5 + 0.1 * matched, 1.0)
+        )
+    else:
+        matches = np.zeros((n, 0), dtype=bool)
+        skills_score = np.full(n, 0.5)
+
+    # --- location / remote ---
+    job_locations = [(job.get("location") or "").lower() for job in jobs]
+    is_remote = np.array(
+        [bool(job.get("is_remote")) or "remote" in loc for job, loc in zip(jobs, job_locations)]
+    )
+    in_location = np.array(
+        [any(location_matches(pref, loc) for pref in locations) if loc else False for loc in job_locations]
+    )
+    if locations or wants_remote:
+        location_score = (in_location | (is_remote & wants_remote)).astype(float)
+        location_conflict = location_score == 0
+    else:
+        location_score = np.full(n, 0.5)
+        location_conflict = np.zeros(n, dtype=bool)
+
+    # --- role title ---
+    if role_types:
+        title_tokens = [_tokens(job.get("title")) for job in jobs]
+        role_score = np.array([
+            max(len(_tokens(role) & tokens) / max(len(_tokens(role)), 1) for role in role_types)
+            for tokens in title_tokens
+        ])
+    else:
+        role_score = np.full(n, 0.5)
+
+    # --- combine ---
+    components = np.vstack([similarity_score, skills_score, location_score, role_score])
+    weights = np.array([
+        SCORE_WEIGHTS["similarity"],
+        SCORE_WEIGHTS["skills"],
+        SCORE_WEIGHTS["location"],
+        SCORE_WEIGHTS["role"],
+    ])
+    scores = 100 * (weights @ components) / weights.sum()
+
+    company_rejected = np.array(
+        [(job.get("company") or "").strip().lower() in rejected_companies for job in jobs]
+    )
+    id_rejected = np.array([job.get("job_id") in rejected_ids for job in jobs])
+
+    scores = scores - REJECTED_COMPANY_PENALTY * company_rejected
+    scores = np.where(id_rejected, 0, scores)
+    scores = np.clip(np.rint(scores), 0, 100).astype(int)
+
+    passed = (scores >= PASS_THRESHOLD) & ~id_rejected
+    borderline = (np.abs(scores - PASS_THRESHOLD) <= BORDERLINE_MARGIN) & ~id_rejected
+
+    out = []
+    for i, job in enumerate(jobs):
+        matched_skills = [skills[j] for j in np.flatnonzero(matches[i])] if skills else []
+        reasons = [f"similarity {similarity[i]:.2f}"]
+        if skills:
+            reasons.append(f"{len(matched_skills)} profile skills matched"
+                           + (f" ({', '.join(matched_skills[:5])})" if matched_skills else ""))
+        if location_conflict[i]:
+            reasons.append("location/remote mismatch")
+        elif locations or wants_remote:
+            reasons.append("location/remote match")
+        if role_types:
+            reasons.append(f"role match {role_score[i]:.0%}")
+        if company_rejected[i]:
+            reasons.append("company previously rejected")
+        if id_rejected[i]:
+            reasons = ["job previously rejected"]
+
+        out.append({
+            "job_id": job.get("job_id", ""),
+            "score": int(scores[i]),
+            "pass": bool(passed[i]),
+            "borderline": bool(borderline[i]),
+            "rationale": "; ".join(reasons) + ".",
+        })
+    return out
+
+
+def validate_filter_batch(jobs: list[dict], output) -> dict[str, dict]:
+    """
+    Checks a job_filter_batch_agent response against the jobs that were sent.
+
+    Returns {job_id: JOB_FILTER_OUTPUT_SCHEMA} for valid entries only:
+    unknown or duplicate job_ids are dropped, scores are clamped to 0-100
+    and "pass" must be consistent with PASS_THRESHOLD.
+    """
+    expected = {j.get("job_id") for j in jobs}
+    results = {}
+
+    entries = (output.get("results") or []) if isinstance(output, dict) else []
+    for entry in entries:
+        if not isinstance(entry, dict):
+            continue
+        job_id = entry.get("job_id")
+        if job_id not in expected or job_id in results:
+            continue
+        try:
+            score = max(0, min(100, int(entry.get("score"))))
+        except (TypeError, ValueError):
+            continue
+        passed = entry.get("pass", entry.get("pass_"))
+        if not isinstance(passed, bool):
+            continue
+        results[job_id] = {
+            "pass": passed and score >= PASS_THRESHOLD,
+            "score": score,
+            "rationale": str(entry.get("rationale") or ""),
+        }
+    return results
@@ -0,0 +1,126 @@
+"""
+Parses the user's feedback on the jobs presented by the JobPilot pipeline.
+
+A message such as "Apply to 1 and 3, reject 2 (too junior)" is split into
+sentences (newlines, ";", ".", "but") and each sentence into segments that
+start at a select or reject marker ("apply", "reject", "skip", ...).
+Markers only count as whole words or phrases.
+
+A job reference only belongs to a marker if it directly follows it, with
+nothing but connectives in between ("to", "and", "job", "#", ","); the
+first other word ends the marker's references. So in "Yes, I have 2 years
+of Python" the number 2 is not a job selection, and in "interested in all
+remote roles" the word "all" is not "all jobs". A negation in front of a
+select marker ("don't apply to 2") turns it into a rejection.
+"""
+
+import re
+
+
+# A follow-up message is read as feedback on the presented jobs only if it is
+# short and contains one of these markers (or nothing but job numbers).
+# Longer messages are treated as new profile text and start a new search.
+FEEDBACK_MAX_CHARS = 500
+SELECT_MARKERS = ["apply", "select", "choose", "go with", "interested", "yes"]
+REJECT_MARKERS = ["reject", "not interested", "skip", "pass on", "don't", "don’t", "do not", "no to", "not"]
+
+# Words allowed between a marker and the job references it owns.
+CONNECTIVES = {
+    "to", "for", "on", "in", "with", "the", "job", "jobs", "number", "numbers",
+    "#", "and", "&", "or", "both", "of", "them", "please", ",",
+}
+
+SENTENCE_SPLIT = re.compile(r"\n|;|\.(?=\s|$)|\bbut\b", re.IGNORECASE)
+TOKEN_PATTERN = re.compile(r"[\w’'-]+|[#&,]")
+ONLY_NUMBERS = re.compile(r"(?:[\s\d,&#]|\band\b)+")
+
+
+def _marker_pattern(markers: list[str]) -> re.Pattern:
+    # Longest first, so "not interested" wins over "not" and "interested".
+    alternatives = sorted(markers, key=len, reverse=True)
+    return re.compile(r"(?<![\w’'])(?:" + "|".join(re.escape(m) for m in alternatives) + r")(?![\w’'])")
+
+
+MARKER_PATTERN = _marker_pattern(SELECT_MARKERS + REJECT_MARKERS)
+
+
+def _references(text: str, jobs: list[dict]) -> tuple[list[dict], bool]:
+    """
+    Jobs referred to at the start of text, by 1-based number or job_id.
+    Returns (jobs, runs_to_end); runs_to_end is True if nothing but
+    references and connectives follow.
+    """
+    ids = {(j.get("job_id") or "").lower(): j for j in jobs if j.get("job_id")}
+    found, wants_all = [], False
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        if token.isdigit() and 1 <= int(token) <= len(jobs):
+            found.append(jobs[int(token) - 1])
+        elif token in ids:
+            found.append(ids[token])
+        elif token == "all":
+            wants_all = True
+        elif token not in CONNECTIVES:
+            # "all" only means every job if it ends the references ("apply to all").
+            return found, False
+    return (list(jobs) if wants_all else found), True
+
+
+def _segments(sentence: str) -> list[tuple[bool, str, str]]:
+    """
+    Splits a sentence at its markers into (is_reject, segment text,
+    text after the marker) tuples. Text before the first marker is dropped.
+    """
+    lowered = sentence.lower()
+    hits = list(MARKER_PATTERN.finditer(lowered))
+    out = []
+    negated = False
+    for k, hit in enumerate(hits):
+        end = hits[k + 1].start() if k + 1 < len(hits) else len(sentence)
+        after = sentence[hit.end():end]
+        is_reject = hit.group(0) in REJECT_MARKERS or negated
+        # "don't apply to 2": a bare negation right before the next marker
+        # carries over to it.
+        negated = hit.group(0) in REJECT_MARKERS and not after.strip()
+        out.append((is_reject, sentence[hit.start():end], after))
+    return out
+
+
+def parse_selection(text: str, jobs: list[dict]) -> tuple[list, list] | None:
+    """
+    Reads the user's feedback on the presented jobs (see module docstring).
+
+    Jobs are referred to by their number in the presented list (1-based) or
+    by job_id. A message of nothing but numbers selects those jobs.
+
+    Returns (selected_jobs, rejections) or None if the text is not feedback.
+    rejections are {"job_id", "company", "reason"} dicts for rejection_memory.
+    """
+    text = text or ""
+    if len(text) > FEEDBACK_MAX_CHARS:
+        return None
+
+    selected, rejections = [], []
+
+    if ONLY_NUMBERS.fullmatch(text.lower()):
+        selected = _references(text, jobs)[0]
+    elif not MARKER_PATTERN.search(text.lower()):
+        return None
+
+    for sentence in SENTENCE_SPLIT.split(text):
+        for is_reject, segment, after in _segments(sentence):
+            mentioned, _ = _references(after, jobs)
+            if is_reject:
+                for job in mentioned:
+                    if job["job_id"] not in [r["job_id"] for r in rejections]:
+                        rejections.append({"job_id": job["job_id"], "company": job.get("company", ""),
+                                           "reason": segment.strip(" ,")})
+            else:
+                for job in mentioned:
+                    if job not in selected:
+                        selected.append(job)
+
+    rejected = {r["job_id"] for r in rejections}
+    selected = [j for j in selected if j["job_id"] not in rejected]
+    if not selected and not rejections:
+        return None
+    return selected, rejections
@@ -0,0 +1,74 @@
+import pytest
+
+import jobs_version
+import migrations
+from filters import add_filter_fields, backfill_filter_fields, build_chroma_filters, normalise_employment_type
+
+
+class FakeCollection:
+    def __init__(self, metadatas):
+        self.metadatas = dict(metadatas)
+
+    def get(self, include=None, limit=None, offset=0):
+        ids = sorted(self.metadatas)[offset:offset + limit]
+        return {"ids": ids, "metadatas": [self.metadatas[i] for i in ids]}
+
+    def update(self, ids, metadatas):
+        for job_id, meta in zip(ids, metadatas):
+            self.metadatas[job_id] = {**self.metadatas[job_id], **meta}
+
+
+@pytest.fixture(autouse=True)
+def stores(tmp_path, monkeypatch):
+    monkeypatch.setattr(migrations, "_log", migrations.MigrationLog(str(tmp_path / "migrations.db")))
+    monkeypatch.setattr(jobs_version, "_version", jobs_version.JobsVersion(str(tmp_path / "version.db")))
+
+
+def test_no_filters():
+    assert build_chroma_filters() is None
+
+
+def test_single_clause_is_not_wrapped():
+    assert build_chroma_filters(remote_only=True) == {"is_remote": True}
+
+
+def test_all_clauses():
+    where = build_chroma_filters(
+        remote_only=True,
+        employment_types=["Full-time", "FULL_TIME", "contract", ""],
+        exclude_job_ids=["a", "b"],
+    )
+    assert where == {"$and": [
+        {"job_id": {"$nin": ["a", "b"]}},
+        {"employment_type_key": {"$in": ["contract", "full_time"]}},
+        {"is_remote": True},
+    ]}
+
+
+def test_normalise_employment_type():
+    assert normalise_employment_type("Full-time") == "full_time"
+    assert normalise_employment_type(" full time ") == "full_time"
+    assert normalise_employment_type(None) == ""
+
+
+def test_add_filter_fields():
+    job = add_filter_fields({"location": "Remote (US)", "employment_type": "Part-time"})
+    assert job["is_remote"] is True
+    assert job["employment_type_key"] == "part_time"
+
+
+def test_backfill_adds_missing_fields_once():
+    collection = FakeCollection({
+        "old": {"job_id": "old", "location": "Remote", "employment_type": "Full-time"},
+        "new": {"job_id": "new", "location": "Boston, MA", "is_remote": False, "employment_type_key": ""},
+    })
+    before = jobs_version.get_jobs_version().current()
+
+    assert backfill_filter_fields(collection, page_size=1) == 1
+    assert collection.metadatas["old"]["is_remote"] is True
+    assert collection.metadatas["old"]["employment_type_key"] == "full_time"
+    assert jobs_version.get_jobs_version().current() == before + 1
+
+    collection.metadatas["older"] = {"job_id": "older", "location": "Remote"}
+    assert backfill_filter_fields(collection) == 0
+    assert "is_remote" not in collection.metadatas["older"]
@@ -0,0 +1,32 @@
+from generation_cache import generation_key
+
+
+PROFILE = {"name": "Ada", "skills": ["Python"], "update_required": False, "last_update": 1}
+JOB = {"job_id": "j1", "title": "Data Analyst", "job_description": "SQL and Python"}
+
+
+def key(**changes):
+    args = {"kind": "resume", "profile": PROFILE, "job": JOB,
+            "instruction": "Write a resume.", "model_name": "gemini-2.5-flash"}
+    args.update(changes)
+    return generation_key(args["kind"], args["profile"], args["job"], args["instruction"], args["model_name"])
+
+
+def test_same_inputs_same_key():
+    assert key() == key()
+
+
+def test_every_input_changes_the_key():
+    base = key()
+    assert key(kind="cover_letter") != base
+    assert key(profile={**PROFILE, "skills": ["Go"]}) != base
+    assert key(job={**JOB, "job_description": "Go"}) != base
+    assert key(job={**JOB, "job_id": "j2"}) != base
+    assert key(instruction="Write a short resume.") != base
+    assert key(model_name="gemini-2.5-flash-lite") != base
+
+
+def test_volatile_fields_do_not_change_the_key():
+    base = key()
+    assert key(profile={**PROFILE, "update_required": True, "last_update": 99}) == base
+    assert key(job={**JOB, "score": 80, "pass": True, "rationale": "fit", "similarity": 0.5}) == base
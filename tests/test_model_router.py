@@ -0,0 +1,106 @@
+import asyncio
+
+import pytest
+from google.genai import types
+from google.genai.errors import APIError
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+
+import model_router
+from model_router import TierRouter, record_models
+
+
+def text_response(text):
+    return LlmResponse(content=types.Content(role="model", parts=[types.Part(text=text)]))
+
+
+class FakeTier:
+    def __init__(self, model, fail=None, chunks=1, fail_after=None):
+        self.model = model
+        self.fail = fail
+        self.chunks = chunks
+        self.fail_after = fail_after
+        self.calls = 0
+        self.sent = 0
+
+    async def generate_content_async(self, llm_request, stream=False):
+        self.calls += 1
+        if self.fail is not None:
+            raise self.fail
+        for i in range(self.chunks):
+            if self.fail_after is not None and i == self.fail_after:
+                raise APIError(503, {"error": {"message": "unavailable"}})
+            self.sent += 1
+            yield text_response(self.model if self.chunks == 1 else f"chunk {i}")
+            await asyncio.sleep(0)
+
+
+@pytest.fixture
+def tiers(monkeypatch):
+    tiers = {
+        "flash": FakeTier("gemini-2.5-flash"),
+        "lite": FakeTier("gemini-2.5-flash-lite"),
+    }
+    monkeypatch.setattr(model_router, "get_tier_llm", lambda tier: tiers[tier])
+    return tiers
+
+
+def request():
+    return LlmRequest(contents=[types.Content(role="user", parts=[types.Part(text="hi")])])
+
+
+def run(router):
+    async def collect():
+        return [r async for r in router.generate_content_async(request())]
+    return asyncio.run(collect())
+
+
+def test_primary_model():
+    assert TierRouter(model="r", criticality="critical").primary_model == "gemini-2.5-flash"
+    assert TierRouter(model="r", criticality="standard").primary_model == "gemini-2.5-flash-lite"
+
+
+def test_record_models_sees_the_answering_tier(tiers):
+    with record_models() as answered:
+        run(TierRouter(model="r", criticality="critical"))
+    assert answered == ["gemini-2.5-flash"]
+
+
+def test_record_models_sees_failover(tiers):
+    tiers["flash"].fail = APIError(429, {"error": {"message": "rate limited"}})
+    router = TierRouter(model="r", criticality="critical")
+    with record_models() as answered:
+        responses = run(router)
+    assert answered == ["gemini-2.5-flash-lite"]
+    assert answered != [router.primary_model]
+    assert responses[0].content.parts[0].text == "gemini-2.5-flash-lite"
+
+
+def test_non_failover_errors_are_raised(tiers):
+    tiers["flash"].fail = APIError(400, {"error": {"message": "bad request"}})
+    with pytest.raises(APIError):
+        run(TierRouter(model="r", criticality="critical"))
+    assert tiers["lite"].calls == 0
+
+
+def test_chunks_are_yielded_as_they_arrive(tiers):
+    tiers["flash"].chunks = 3
+
+    async def first_chunk():
+        stream = TierRouter(model="r", criticality="critical").generate_content_async(request(), stream=True)
+        first = await stream.__anext__()
+        sent = tiers["flash"].sent
+        await stream.aclose()
+        return first, sent
+
+    first, sent = asyncio.run(first_chunk())
+    assert first.content.parts[0].text == "chunk 0"
+    assert sent == 1
+
+
+def test_no_failover_after_the_first_chunk(tiers):
+    tiers["flash"].chunks = 3
+    tiers["flash"].fail_after = 1
+    with pytest.raises(APIError):
+        run(TierRouter(model="r", criticality="critical"))
+    assert tiers["lite"].calls == 0
@@ -0,0 +1,86 @@
+import random
+
+import pytest
+
+import near_duplicates
+from near_duplicates import (
+    NEAR_DUPLICATE_THRESHOLD,
+    NearDuplicateIndex,
+    minhash_signature,
+    signature_similarity,
+)
+
+
+def posting(seed: int, words: int = 400) -> list[str]:
+    rng = random.Random(seed)
+    vocabulary = [f"word{i}" for i in range(2000)]
+    return [rng.choice(vocabulary) for _ in range(words)]
+
+
+def edited(words: list[str], count: int) -> str:
+    words = list(words)
+    for i in range(0, len(words), len(words) // count):
+        words[i] = "edited"
+    return " ".join(words)
+
+
+@pytest.fixture(autouse=True)
+def stats(monkeypatch):
+    monkeypatch.setattr(near_duplicates, "DEDUP_STATS", {"checked": 0, "duplicates": 0})
+
+
+@pytest.fixture
+def index(tmp_path):
+    return NearDuplicateIndex(str(tmp_path / "near_duplicates.db"))
+
+
+def test_short_text_has_no_signature():
+    assert minhash_signature(" ".join(posting(1, words=near_duplicates.MIN_WORDS - 1))) is None
+
+
+def test_small_edits_stay_above_threshold():
+    words = posting(1)
+    sim = signature_similarity(minhash_signature(" ".join(words)), minhash_signature(edited(words, 10)))
+    assert sim >= NEAR_DUPLICATE_THRESHOLD
+
+
+def test_different_postings_stay_below_threshold():
+    sim = signature_similarity(minhash_signature(" ".join(posting(1))), minhash_signature(" ".join(posting(2))))
+    assert sim < 0.1
+
+
+def test_near_identical_copy_is_collapsed(index):
+    words = posting(1)
+    assert index.find_or_add("first", minhash_signature(" ".join(words))) == (None, 0.0)
+
+    match, sim = index.find_or_add("copy", minhash_signature(edited(words, 10)))
+    assert match == "first"
+    assert sim >= NEAR_DUPLICATE_THRESHOLD
+    assert index.indexed_ids() == {"first"}
+    assert near_duplicates.DEDUP_STATS == {"checked": 2, "duplicates": 1}
+
+
+def test_different_posting_is_indexed(index):
+    index.find_or_add("first", minhash_signature(" ".join(posting(1))))
+    assert index.find_or_add("second", minhash_signature(" ".join(posting(2)))) == (None, 0.0)
+    assert index.indexed_ids() == {"first", "second"}
+
+
+def test_heavily_edited_copy_is_not_collapsed(index):
+    words = posting(1)
+    index.find_or_add("first", minhash_signature(" ".join(words)))
+    match, _ = index.find_or_add("rewrite", minhash_signature(edited(words, 100)))
+    assert match is None
+
+
+def test_short_text_is_never_collapsed(index):
+    assert index.find_or_add("short", None) == (None, 0.0)
+    assert index.indexed_ids() == set()
+
+
+def test_removed_job_returns_its_aliases(index):
+    index.find_or_add("first", minhash_signature(" ".join(posting(1))))
+    index.add_alias("https://b.com/1", "first", 0.9)
+    assert index.remove(["first"]) == ["https://b.com/1"]
+    assert index.indexed_ids() == set()
+    assert index.aliases("first") == []
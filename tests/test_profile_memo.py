@@ -0,0 +1,73 @@
+from profile_memo import merge_profiles, new_lines, profile_delta
+
+
+STORED = {
+    "name": "Ada",
+    "skills": ["Python", "SQL"],
+    "contact": {"email": "ada@example.com", "phone": ""},
+    "job_preferences": {"locations": ["NYC", "Boston"], "remote": True},
+}
+
+
+def test_new_lines_only_returns_added_lines():
+    old = "I know Python\nI live in Boston"
+    new = "I know Python\nI live in Boston\nI also know Rust"
+    assert new_lines(old, new) == "I also know Rust"
+
+
+def test_new_lines_ignores_blank_lines():
+    assert new_lines("a", "a\n\n   \n") == ""
+
+
+def test_merge_lists_are_replaced():
+    update = {"job_preferences": {"locations": ["NYC"]}}
+    merged = merge_profiles(STORED, update)
+    assert merged["job_preferences"]["locations"] == ["NYC"]
+    assert merged["job_preferences"]["remote"] is True
+
+
+def test_merge_empty_values_keep_stored():
+    merged = merge_profiles(STORED, {"name": "", "skills": [], "contact": {"email": None}})
+    assert merged["name"] == "Ada"
+    assert merged["skills"] == ["Python", "SQL"]
+    assert merged["contact"]["email"] == "ada@example.com"
+
+
+def test_merge_false_replaces_true():
+    merged = merge_profiles(STORED, {"job_preferences": {"remote": False}})
+    assert merged["job_preferences"]["remote"] is False
+
+
+def test_merge_does_not_mutate_stored():
+    merge_profiles(STORED, {"skills": ["Go"], "job_preferences": {"locations": ["LA"]}})
+    assert STORED["skills"] == ["Python", "SQL"]
+    assert STORED["job_preferences"]["locations"] == ["NYC", "Boston"]
+
+
+def test_job_feedback_is_not_profile_content():
+    assert profile_delta("Apply to 1 and 3, reject 2 (too junior)") == ""
+    assert profile_delta("reject 2, not remote") == ""
+    assert profile_delta("thanks!") == ""
+
+
+def test_profile_lines_are_kept():
+    assert profile_delta("I have 3 years of experience with Rust") == "I have 3 years of experience with Rust"
+    assert profile_delta("No longer interested in remote roles") == "No longer interested in remote roles"
+
+
+def test_only_profile_lines_of_mixed_message_are_kept():
+    text = "apply to 2\nI have used Kubernetes for 2 years\ncan you hurry?"
+    assert profile_delta(text) == "I have used Kubernetes for 2 years"
+
+
+def test_explicit_update_phrase_is_kept():
+    assert profile_delta("Please update my profile: NYC") == "Please update my profile: NYC"
+
+
+def test_resume_request_is_not_an_update():
+    assert profile_delta("write the resume for job 2 first") == ""
+
+
+def test_long_new_text_is_sent_whole():
+    text = "x " * 300
+    assert profile_delta(text) == text
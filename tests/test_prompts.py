@@ -0,0 +1,42 @@
+import json
+
+import prompts
+from prompts import PROMPTS, PROMPT_SCHEMAS, count_tokens, estimate_tokens
+
+
+def test_every_placeholder_is_rendered():
+    for name, text in PROMPTS.items():
+        assert "<<" not in text and ">>" not in text, name
+
+
+def test_scored_job_example_passes():
+    assert PROMPT_SCHEMAS["SCORED_JOB_SCHEMA"]["pass"] is True
+    assert '"pass": true' in PROMPTS["application_builder_agent"]
+
+
+def test_shared_blocks_are_filled_in():
+    for name in ("job_filter_agent", "job_filter_batch_agent"):
+        assert "SCORING RULES" in PROMPTS[name]
+    assert "OUTPUT RULES" in PROMPTS["resume_generator_agent"]
+
+
+def test_schemas_render_as_compact_json():
+    rendered = prompts.schema_text("JOB_FILTER_OUTPUT_SCHEMA")
+    assert json.loads(rendered) == {"pass": False, "score": 0, "rationale": ""}
+    assert "\n" not in rendered
+
+
+def test_count_tokens_without_tokenizer_estimates(monkeypatch):
+    monkeypatch.setattr(prompts, "LocalTokenizer", None)
+    assert prompts.token_counter() == "estimate"
+    assert count_tokens("abcdefgh", "gemini-2.5-flash") == estimate_tokens("abcdefgh") == 2
+
+
+def test_count_tokens_uses_the_client():
+    class Models:
+        def count_tokens(self, model, contents):
+            return type("Count", (), {"total_tokens": 7})()
+
+    client = type("Client", (), {"models": Models()})()
+    assert prompts.token_counter(client) == "api"
+    assert count_tokens("anything", "gemini-2.5-flash", client) == 7
@@ -0,0 +1,73 @@
+from scoring import PASS_THRESHOLD, location_matches, score_jobs
+
+
+PROFILE = {
+    "skills": ["Python", "SQL", "R"],
+    "job_preferences": {"locations": ["New York"], "remote": False, "role_types": ["Data Engineer"]},
+}
+
+
+def job(job_id, **fields):
+    base = {
+        "job_id": job_id,
+        "title": "Data Engineer",
+        "company": "Acme",
+        "location": "New York, NY",
+        "similarity": 0.7,
+        "skills_mentioned": ["Python", "SQL"],
+        "requirements": [],
+    }
+    return {**base, **fields}
+
+
+def test_location_matches():
+    assert location_matches("New York", "New York, NY")
+    assert location_matches("NYC", "New York, NY")
+    assert location_matches("United States", "Chicago, IL")
+    assert location_matches("California", "San Francisco, CA")
+    assert not location_matches("Georgia", "Georgian Bay, ON")
+    assert not location_matches("Boston", "New York, NY")
+    assert not location_matches("New York", "")
+
+
+def test_strong_match_passes():
+    [result] = score_jobs([job("a")], PROFILE)
+    assert result["job_id"] == "a"
+    assert result["pass"] is True
+    assert result["score"] >= PASS_THRESHOLD
+    assert "location/remote match" in result["rationale"]
+
+
+def test_results_keep_job_order():
+    jobs = [job("a"), job("b", similarity=0.1), job("c")]
+    assert [r["job_id"] for r in score_jobs(jobs, PROFILE)] == ["a", "b", "c"]
+    assert score_jobs([], PROFILE) == []
+
+
+def test_skills_match_whole_words():
+    r_job = job("a", skills_mentioned=["R"])
+    pytorch_job = job("b", skills_mentioned=["PyTorch", "years of experience"])
+    r_result, pytorch_result = score_jobs([r_job, pytorch_job], PROFILE)
+    assert "(r)" in r_result["rationale"]
+    assert "0 profile skills matched" in pytorch_result["rationale"]
+    assert r_result["score"] > pytorch_result["score"]
+
+
+def test_location_mismatch_lowers_score():
+    here, elsewhere = score_jobs([job("a"), job("b", location="Austin, TX")], PROFILE)
+    assert elsewhere["score"] < here["score"]
+    assert "location/remote mismatch" in elsewhere["rationale"]
+
+
+def test_remote_preference_accepts_remote_jobs():
+    profile = {**PROFILE, "job_preferences": {**PROFILE["job_preferences"], "remote": True}}
+    [result] = score_jobs([job("a", location="Remote")], profile)
+    assert "location/remote match" in result["rationale"]
+
+
+def test_rejections():
+    jobs = [job("a"), job("b", company="Initech")]
+    rejected, penalised = score_jobs(jobs, PROFILE, rejection_memory=["a", {"company": "initech"}])
+    [clean] = score_jobs([job("b", company="Initech")], PROFILE)
+    assert rejected["score"] == 0 and rejected["pass"] is False and rejected["borderline"] is False
+    assert penalised["score"] < clean["score"]
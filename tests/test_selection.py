@@ -0,0 +1,76 @@
+import pytest
+
+from selection import parse_selection
+
+
+JOBS = [
+    {"job_id": "id1", "company": "Acme"},
+    {"job_id": "id2", "company": "Globex"},
+    {"job_id": "id3", "company": "Initech"},
+]
+
+
+def ids(jobs):
+    return [j["job_id"] for j in jobs]
+
+
+def test_docstring_example():
+    selected, rejections = parse_selection("Apply to 1 and 3, reject 2 (too junior)", JOBS)
+    assert ids(selected) == ["id1", "id3"]
+    assert ids(rejections) == ["id2"]
+    assert rejections[0]["company"] == "Globex"
+    assert "too junior" in rejections[0]["reason"]
+
+
+def test_and_before_verb_starts_new_clause():
+    selected, rejections = parse_selection("apply to 1 and reject 2", JOBS)
+    assert ids(selected) == ["id1"]
+    assert ids(rejections) == ["id2"]
+
+
+def test_comma_list_stays_with_its_verb():
+    selected, rejections = parse_selection("Apply to 1, 2 and 3", JOBS)
+    assert ids(selected) == ["id1", "id2", "id3"]
+    assert rejections == []
+
+
+def test_negation_inside_other_words_is_not_a_rejection():
+    selected, rejections = parse_selection("I don't need a cover letter, apply to 1", JOBS)
+    assert ids(selected) == ["id1"]
+    assert rejections == []
+
+
+def test_negated_verb_rejects():
+    selected, rejections = parse_selection("don't apply to 2, apply to 3", JOBS)
+    assert ids(selected) == ["id3"]
+    assert ids(rejections) == ["id2"]
+
+
+@pytest.mark.parametrize("text", [
+    "Yes, I have 2 years of Python",
+    "interested in all remote roles",
+    "I have 3 years experience and I'm not sure yet",
+])
+def test_stray_numbers_and_words_are_not_feedback(text):
+    assert parse_selection(text, JOBS) is None
+
+
+def test_all_selects_every_job():
+    selected, rejections = parse_selection("apply to all of them", JOBS)
+    assert ids(selected) == ["id1", "id2", "id3"]
+
+
+def test_only_numbers_selects():
+    selected, rejections = parse_selection("1 and 3", JOBS)
+    assert ids(selected) == ["id1", "id3"]
+
+
+def test_job_id_reference():
+    selected, rejections = parse_selection("skip id3. I'm interested in id1", JOBS)
+    assert ids(selected) == ["id1"]
+    assert ids(rejections) == ["id3"]
+
+
+def test_markers_match_whole_words_only():
+    # "skipper" and "applyance" must not count as "skip" / "apply".
+    assert parse_selection("the skipper of job 2 is applyance 1", JOBS) is None
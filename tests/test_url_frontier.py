@@ -0,0 +1,33 @@
+from url_frontier import URLFrontier, canonicalize_url
+
+
+def test_tracking_params_are_dropped():
+    url = "https://Boards.Example.com/jobs/42/?utm_source=x&gclid=abc&fbclid=def&b=2&a=1#apply"
+    assert canonicalize_url(url) == "https://boards.example.com/jobs/42?a=1&b=2"
+
+
+def test_generic_keys_identify_the_posting():
+    first = canonicalize_url("https://ats.example.com/job?ref=A100")
+    second = canonicalize_url("https://ats.example.com/job?ref=B200")
+    assert first != second
+    assert canonicalize_url("https://x.com/p?src=7&source=abc") == "https://x.com/p?source=abc&src=7"
+
+
+def test_default_port_and_trailing_slash():
+    assert canonicalize_url("HTTPS://x.com:443/a/") == "https://x.com/a"
+    assert canonicalize_url("http://x.com:8080/") == "http://x.com:8080/"
+
+
+def test_redirect_wrapper_is_unwrapped():
+    url = "https://www.google.com/url?q=https%3A%2F%2Fjobs.example.com%2F1%3Futm_medium%3Demail"
+    assert canonicalize_url(url) == "https://jobs.example.com/1"
+
+
+def test_requeue_duplicates_counts_moved_rows(tmp_path):
+    frontier = URLFrontier(str(tmp_path / "frontier.db"))
+    frontier.add(["https://a.com/1", "https://b.com/2"])
+    frontier.finish(["https://a.com/1"], status="duplicate")
+
+    assert frontier.requeue_duplicates(["https://a.com/1", "https://b.com/2", "https://c.com/3"]) == 1
+    assert frontier.report().get("duplicate", 0) == 0
+    assert frontier.requeue_duplicates([]) == 0
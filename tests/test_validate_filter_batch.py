@@ -0,0 +1,51 @@
+from scoring import validate_filter_batch
+
+
+JOBS = [{"job_id": "a"}, {"job_id": "b"}, {"job_id": "c"}]
+
+
+def test_valid_entries_are_kept():
+    output = {"results": [
+        {"job_id": "a", "pass": True, "score": 80, "rationale": "good fit"},
+        {"job_id": "b", "pass": False, "score": 20, "rationale": None},
+    ]}
+    assert validate_filter_batch(JOBS, output) == {
+        "a": {"pass": True, "score": 80, "rationale": "good fit"},
+        "b": {"pass": False, "score": 20, "rationale": ""},
+    }
+
+
+def test_malformed_entries_only_drop_their_job():
+    output = {"results": [
+        "not a dict",
+        {"job_id": "a", "pass": None, "score": 80},
+        {"job_id": "b", "pass": True, "score": "high"},
+        {"job_id": "c", "pass_": True, "score": 70.6},
+    ]}
+    assert validate_filter_batch(JOBS, output) == {"c": {"pass": True, "score": 70, "rationale": ""}}
+
+
+def test_unknown_and_duplicate_job_ids_are_dropped():
+    output = {"results": [
+        {"job_id": "zzz", "pass": True, "score": 90},
+        {"job_id": "a", "pass": True, "score": 90},
+        {"job_id": "a", "pass": False, "score": 10},
+    ]}
+    assert validate_filter_batch(JOBS, output) == {"a": {"pass": True, "score": 90, "rationale": ""}}
+
+
+def test_scores_are_clamped_and_pass_follows_threshold():
+    output = {"results": [
+        {"job_id": "a", "pass": True, "score": 140},
+        {"job_id": "b", "pass": True, "score": 40},
+        {"job_id": "c", "pass": False, "score": -5},
+    ]}
+    results = validate_filter_batch(JOBS, output)
+    assert results["a"] == {"pass": True, "score": 100, "rationale": ""}
+    assert results["b"]["pass"] is False
+    assert results["c"]["score"] == 0
+
+
+def test_non_dict_output():
+    assert validate_filter_batch(JOBS, None) == {}
+    assert validate_filter_batch(JOBS, {"results": None}) == {}
@@ -0,0 +1,380 @@
+"""
+Persistent URL frontier for JobPilot ingestion.
+
+Discovery runs many search queries; every URL they return is canonicalised
+and added to a SQLite frontier keyed by the canonical URL, so the same
+posting found by several queries, in several runs, or with different
+tracking parameters is fetched once.
+
+Canonicalisation (canonicalize_url):
+
+    - redirect wrappers are unwrapped (google.com/url?q=..., l.facebook.com);
+      pure redirector hosts (search grounding links, t.co, lnkd.in) are
+      resolved with a HEAD request when an HTTP session is given
+    - scheme and host are lowercased, default ports dropped
+    - tracking parameters (utm_*, gclid, fbclid, ...) and fragments removed
+    - remaining query parameters sorted, trailing slash dropped
+
+Each URL's priority is the sum of 1 / (1 + rank) over the queries that
+returned it, so postings found high up by several queries are fetched first.
+
+The frontier is also the ingest work queue. Each URL moves through
+
+    discovered → fetched → extracted → embedded → stored
+
+and the row records the last completed stage. The fetched HTML is kept in
+the HTML blob store and the extracted job is journalled in the row, so a run
+that is interrupted resumes every URL from its last completed stage and never
+repeats an LLM extraction. A failed stage is retried on later runs; after
+MAX_ATTEMPTS the URL moves to the dead-letter list (status "dead"), from
+where requeue_dead() puts it back.
+
+Jobs stored before canonicalisation have a job_id hashed from the raw URL.
+mark_known() records their canonical URL with that legacy_job_id, so
+discovery does not fetch them again. When the re-crawler deletes an expired
+job, expire() marks its row "expired"; if discovery finds the URL again it
+goes back in the queue from the start.
+
+One ingest process should drain the queue at a time.
+"""
+
+import json
+import time
+import sqlite3
+import threading
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+
+FRONTIER_PATH = "/kaggle/working/jobpilot_frontier.db"
+
+STAGES = ("discovered", "fetched", "extracted", "embedded", "stored")
+
+# Statuses of URLs that left the queue; "pending" ones are in it, "dead" ones
+# are on the dead-letter list. "expired" ones return when discovered again.
+FINAL_STATUSES = ("stored", "known", "duplicate", "expired")
+
+# Failed attempts (at any stage) before a URL is dead-lettered.
+MAX_ATTEMPTS = 3
+
+# Query parameters that only track where a click came from.
+# Only keys that are known to be tracking-only. Generic keys such as "ref",
+# "src" or "source" identify the posting on some job boards and are kept.
+TRACKING_PARAMS = {
+    "gclid", "gclsrc", "dclid", "fbclid", "msclkid", "yclid", "igshid",
+    "mc_cid", "mc_eid", "_ga", "_gl", "_hsenc", "_hsmi", "mkt_tok",
+    "ref_src", "trk", "trkinfo", "trackingid", "lipi", "gh_src", "lever-source",
+}
+TRACKING_PREFIXES = ("utm_", "pk_", "hsa_")
+
+# Hosts whose links only redirect elsewhere, with the parameter holding the
+# target (None → the target is only known by following the redirect).
+REDIRECT_HOSTS = {
+    "www.google.com": "q",
+    "google.com": "q",
+    "l.facebook.com": "u",
+    "lm.facebook.com": "u",
+    "vertexaisearch.cloud.google.com": None,
+    "t.co": None,
+    "lnkd.in": None,
+}
+
+DEFAULT_PORTS = {"http": "80", "https": "443"}
+
+_resolved = {}
+
+
+def unwrap_redirect(url: str, session=None, timeout: float = 8) -> str:
+    """
+    Returns the target of a redirect-wrapper URL, or url unchanged.
+    Redirector hosts without a target parameter need a session to resolve.
+    """
+    parts = urlsplit(url)
+    host = parts.netloc.lower()
+    if host not in REDIRECT_HOSTS:
+        return url
+
+    param = REDIRECT_HOSTS[host]
+    if param is not None:
+        target = dict(parse_qsl(parts.query)).get(param, "")
+        return target if target.startswith("http") else url
+
+    if session is None:
+        return url
+    if url not in _resolved:
+        try:
+            resp = session.head(url, allow_redirects=True, timeout=timeout)
+            _resolved[url] = resp.url or url
+        except Exception as e:
+            print(f"[WARN] Could not resolve redirect {url}: {e}")
+            return url
+    return _resolved[url]
+
+
+def canonicalize_url(url: str, session=None) -> str:
+    """
+    Canonical form of a job URL (see module docstring).
+    """
+    url = unwrap_redirect(url.strip(), session)
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+
+    host = (parts.hostname or "").lower()
+    if parts.port and str(parts.port) != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if k.lower() not in TRACKING_PARAMS and not k.lower().startswith(TRACKING_PREFIXES)
+    )
+
+    path = parts.path or "/"
+    if len(path) > 1:
+        path = path.rstrip("/")
+
+    return urlunsplit((scheme, host, path, urlencode(query), ""))
+
+
+class URLFrontier:
+    """
+    Durable SQLite work queue of canonical URLs (see module docstring).
+    """
+
+    def __init__(self, path: str = FRONTIER_PATH):
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS url_frontier (
+                url TEXT PRIMARY KEY,
+                priority REAL NOT NULL,
+                hits INTEGER NOT NULL,
+                first_query TEXT,
+                discovered_at REAL NOT NULL,
+                stage TEXT NOT NULL DEFAULT 'discovered',
+                status TEXT NOT NULL DEFAULT 'pending',
+                job_json TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                last_error TEXT,
+                updated_at REAL NOT NULL,
+                legacy_job_id TEXT
+            )
+        """)
+        columns = {row["name"] for row in self.conn.execute("PRAGMA table_info(url_frontier)")}
+        if "legacy_job_id" not in columns:
+            self.conn.execute("ALTER TABLE url_frontier ADD COLUMN legacy_job_id TEXT")
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS url_frontier_pending ON url_frontier (status, priority)"
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS url_frontier_legacy ON url_frontier (legacy_job_id)"
+        )
+        self.conn.commit()
+
+    def _write(self, sql: str, rows: list) -> int:
+        if not rows:
+            return 0
+        with self._lock:
+            cursor = self.conn.executemany(sql, rows)
+            self.conn.commit()
+        return cursor.rowcount
+
+    def add(self, urls: list[str], query: str = "", session=None) -> int:
+        """
+        Adds ranked search results for one query. URLs already in the
+        frontier only gain priority; expired ones go back in the queue.
+        Returns the number of new URLs.
+        """
+        now = time.time()
+        rows = {}
+        for rank, url in enumerate(urls):
+            canonical = canonicalize_url(url, session)
+            if canonical.startswith("http"):
+                rows[canonical] = rows.get(canonical, 0.0) + 1.0 / (1 + rank)
+
+        with self._lock:
+            known = {
+                row["url"] for url in rows
+                for row in self.conn.execute("SELECT url FROM url_frontier WHERE url = ?", (url,))
+            }
+            self.conn.executemany(
+                "INSERT INTO url_frontier (url, priority, hits, first_query, discovered_at, updated_at) "
+                "VALUES (?, ?, 1, ?, ?, ?)",
+                [(url, p, query, now, now) for url, p in rows.items() if url not in known]
+            )
+            self.conn.executemany(
+                "UPDATE url_frontier SET priority = priority + ?, hits = hits + 1, updated_at = ?, "
+                "status = CASE WHEN status = 'expired' THEN 'pending' ELSE status END "
+                "WHERE url = ?",
+                [(p, now, url) for url, p in rows.items() if url in known]
+            )
+            self.conn.commit()
+        return len(rows) - len(known)
+
+    def next_batch(self, limit: int | None = None) -> list[dict]:
+        """
+        Pending work items, highest priority first, as dicts with url,
+        stage (last completed stage) and job (extracted details or None).
+        """
+        rows = self.conn.execute(
+            "SELECT url, stage, job_json FROM url_frontier WHERE status = 'pending' "
+            "ORDER BY priority DESC, discovered_at LIMIT ?",
+            (-1 if limit is None else limit,)
+        ).fetchall()
+        return [
+            {"url": row["url"], "stage": row["stage"],
+             "job": json.loads(row["job_json"]) if row["job_json"] else None}
+            for row in rows
+        ]
+
+    def advance(self, url: str, stage: str, job: dict | None = None):
+        """
+        Records that url completed stage. The extracted job is journalled
+        with the "extracted" stage so a resumed run does not call the LLM again.
+        """
+        self.advance_many([url], stage, job)
+
+    def advance_many(self, urls: list[str], stage: str, job: dict | None = None):
+        assert stage in STAGES, stage
+        job_json = json.dumps(job) if job is not None else None
+        self._write(
+            "UPDATE url_frontier SET stage = ?, job_json = COALESCE(?, job_json), updated_at = ? "
+            "WHERE url = ?",
+            [(stage, job_json, time.time(), url) for url in urls]
+        )
+
+    def finish(self, urls: list[str], status: str = "stored"):
+        """
+        Takes URLs out of the queue: stored, known (already in Chroma) or
+        duplicate (near-duplicate of a stored job). The journalled job is dropped.
+        """
+        assert status in FINAL_STATUSES, status
+        stage = "stored" if status == "stored" else None
+        self._write(
+            "UPDATE url_frontier SET status = ?, stage = COALESCE(?, stage), job_json = NULL, "
+            "updated_at = ? WHERE url = ?",
+            [(status, stage, time.time(), url) for url in urls]
+        )
+
+    def mark_known(self, entries: list[tuple[str, str | None]]):
+        """
+        Records canonical URLs of jobs already in Chroma, as (url,
+        legacy_job_id), so they are never fetched again. legacy_job_id is the
+        job_id the job is stored under if it is not the canonical one.
+        """
+        now = time.time()
+        self._write(
+            """
+            INSERT INTO url_frontier
+                (url, priority, hits, first_query, discovered_at, stage, status, updated_at, legacy_job_id)
+            VALUES (?, 0, 0, NULL, ?, 'stored', 'known', ?, ?)
+            ON CONFLICT(url) DO UPDATE SET
+                status = CASE WHEN status IN ('pending', 'dead') THEN 'known' ELSE status END,
+                job_json = NULL,
+                legacy_job_id = COALESCE(excluded.legacy_job_id, legacy_job_id),
+                updated_at = excluded.updated_at
+            """,
+            [(url, now, now, legacy_id) for url, legacy_id in entries]
+        )
+
+    def legacy_job_ids(self, urls: list[str] | None = None) -> dict[str, str]:
+        """
+        canonical URL → legacy job_id, for the given URLs (or all).
+        """
+        sql = "SELECT url, legacy_job_id FROM url_frontier WHERE legacy_job_id IS NOT NULL"
+        if urls is None:
+            rows = self.conn.execute(sql).fetchall()
+        else:
+            rows = [row for url in set(urls) for row in self.conn.execute(sql + " AND url = ?", (url,))]
+        return {row["url"]: row["legacy_job_id"] for row in rows}
+
+    def expire(self, urls: list[str], job_ids: list[str] | None = None):
+        """
+        The jobs behind these canonical URLs (or legacy job_ids) were deleted.
+        Their rows are reset to "discovered" with status "expired", so the next
+        discovery that finds them again queues them from the start.
+        """
+        now = time.time()
+        reset = (
+            "UPDATE url_frontier SET status = 'expired', stage = 'discovered', job_json = NULL, "
+            "attempts = 0, last_error = NULL, legacy_job_id = NULL, updated_at = ? WHERE "
+        )
+        self._write(reset + "url = ?", [(now, url) for url in urls])
+        self._write(reset + "legacy_job_id = ?", [(now, job_id) for job_id in job_ids or []])
+
+    def fail(self, url: str, error: str = "") -> bool:
+        """
+        Counts a failed attempt at the URL's next stage. After MAX_ATTEMPTS
+        the URL moves to the dead-letter list. Returns True if it did.
+        """
+        with self._lock:
+            self.conn.execute(
+                """
+                UPDATE url_frontier SET
+                    attempts = attempts + 1,
+                    last_error = ?,
+                    status = CASE WHEN attempts + 1 >= ? THEN 'dead' ELSE status END,
+                    updated_at = ?
+                WHERE url = ?
+                """,
+                (error[:500], MAX_ATTEMPTS, time.time(), url)
+            )
+            self.conn.commit()
+            row = self.conn.execute("SELECT status FROM url_frontier WHERE url = ?", (url,)).fetchone()
+        return row is not None and row["status"] == "dead"
+
+    def requeue_duplicates(self, urls: list[str]) -> int:
+        """
+        Puts near-duplicates back in the queue from the start, after the job
+        they were collapsed into was dead-lettered or deleted.
+        """
+        requeued = self._write(
+            "UPDATE url_frontier SET status = 'pending', stage = 'discovered', job_json = NULL, "
+            "attempts = 0, last_error = NULL, updated_at = ? WHERE url = ? AND status = 'duplicate'",
+            [(time.time(), url) for url in urls]
+        )
+        if requeued:
+            print(f"[INFO] Requeued {requeued} near-duplicate URLs of removed jobs.")
+        return requeued
+
+    def dead_letters(self) -> list[dict]:
+        rows = self.conn.execute(
+            "SELECT url, stage, attempts, last_error, updated_at FROM url_frontier "
+            "WHERE status = 'dead' ORDER BY updated_at DESC"
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def requeue_dead(self, urls: list[str] | None = None) -> int:
+        """
+        Puts dead-lettered URLs (all, or the given ones) back in the queue at
+        the stage they reached, with a fresh retry budget.
+        """
+        urls = urls if urls is not None else [row["url"] for row in self.dead_letters()]
+        self._write(
+            "UPDATE url_frontier SET status = 'pending', attempts = 0, updated_at = ? "
+            "WHERE url = ? AND status = 'dead'",
+            [(time.time(), url) for url in urls]
+        )
+        return len(urls)
+
+    def report(self) -> dict:
+        """
+        Counts by status, with pending items broken down by stage.
+        """
+        out = {}
+        for row in self.conn.execute(
+            "SELECT status, stage, COUNT(*) AS n FROM url_frontier GROUP BY status, stage"
+        ):
+            out[row["status"]] = out.get(row["status"], 0) + row["n"]
+            if row["status"] == "pending":
+                out[f"pending_{row['stage']}"] = row["n"]
+        return out
+
+
+_frontier = None
+
+
+def get_frontier() -> URLFrontier:
+    global _frontier
+    if _frontier is None:
+        _frontier = URLFrontier()
+    return _frontier